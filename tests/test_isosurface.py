@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from wxgl import util
+
+def test_isosurfaces_match_single_level():
+    x, y, z = np.mgrid[-1:1:40j, -1:1:40j, -1:1:40j]
+    data = np.float32(x*x + y*y + z*z + 0.2*np.sin(5*x))
+    levels = [0.6, 0.2, 0.6, 5.0]
+    result = util._isosurfaces(data, levels)
+
+    for level, (vs, faces, normal) in zip(levels, result):
+        v, f = util._isosurface(data, level)
+        assert np.allclose(vs, v) and (faces == f).all()
+        assert normal.shape == vs.shape
+
+    # 数据值由内向外递增，法向量（负梯度）指向球心
+    vs, faces, normal = result[0]
+    c = vs - 19.5
+    assert (np.sum(normal * c, axis=1) < 0).mean() > 0.99
+    assert result[3][0].shape == (0, 3) and result[3][1].shape == (0, 3)
+
+def test_isosurfaces_unsigned_data():
+    data = np.random.RandomState(0).randint(0, 255, (12, 10, 14)).astype(np.uint8)
+    for level, (vs, faces, normal) in zip([200, 50], util._isosurfaces(data, [200, 50])):
+        v, f = util._isosurface(data, level)
+        assert np.allclose(vs, v) and (faces == f).all()
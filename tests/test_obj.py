@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from wxgl.pointcloud import PointCloudData
+
+HEAD = 'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 1 1\nvn 0 0 1\n'
+
+def load(tmp_path, text):
+    path = str(tmp_path / 'mesh.obj')
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+    pc = PointCloudData(path)
+    assert pc.ok, pc.info
+
+    return pc
+
+@pytest.mark.parametrize('text', [
+    HEAD + 'f 1 2 3\nf 1 3 4\n',
+    '# mesh\nv 0 0 0 # origin\nv 1 0 0\nv 1 1 0#\nv 0 1 0\nf 1 2 3 # first\nf 1 3 4#second\n',
+    HEAD + '  f 1 2 3\n\tf 1 3 4\n   # f 4 3 2\n',
+    HEAD + '  v 0 0 5\nf 1 2 3\nf 1 3 4'
+])
+def test_obj_comments_and_indent(tmp_path, text):
+    pc = load(tmp_path, text)
+    assert pc.indices.reshape(-1, 3).tolist() == [[0, 1, 2], [0, 2, 3]]
+
+def test_obj_mixed_corner_formats(tmp_path):
+    pc = load(tmp_path, HEAD + 'f 1 2 3\nf 1/1 3/2 4/3\nf 1//1 2/1/1 3 4/2\n')
+    faces = pc.indices.reshape(-1, 3)
+    xyz = pc.xyz[faces]
+
+    assert faces.shape[0] == 4
+    assert np.allclose(xyz[1], [[0,0,0], [1,1,0], [0,1,0]])
+    assert np.allclose(pc.texcoord[faces[1]], [[0,0], [1,0], [1,1]])
+    assert np.allclose(xyz[3], [[0,0,0], [1,1,0], [0,1,0]])
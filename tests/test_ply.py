@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from wxgl.pointcloud import PointCloudData
+
+FACES = [[0,1,2], [2,3,4,5], [5,6,7], [1,2,3,4,5], [7,8,9]]
+TRIANGLES = [[0,1,2], [2,3,4], [2,4,5], [5,6,7], [1,2,3], [1,3,4], [1,4,5], [7,8,9]]
+
+def write_ply(path, encoding):
+    """写入顶点数量不一的多边形网格，face元素在列表属性之后另有一个标量属性"""
+
+    vs = np.random.RandomState(0).random((10,3)).astype('<f4')
+    header = 'ply\nformat %s 1.0\nelement vertex 10\nproperty float x\nproperty float y\nproperty float z\n' % encoding
+    header += 'element face %d\nproperty list uchar int vertex_indices\nproperty uchar flag\nend_header\n' % len(FACES)
+
+    with open(path, 'wb') as fp:
+        fp.write(header.encode())
+        if encoding == 'ascii':
+            fp.write(b''.join([b'%f %f %f\n' % tuple(v) for v in vs]))
+            fp.write(b''.join([(' '.join(map(str, [len(f)] + f + [7])) + '\n').encode() for f in FACES]))
+        else:
+            fp.write(vs.tobytes())
+            fp.write(b''.join([bytes([len(f)]) + np.array(f, dtype='<i4').tobytes() + b'\x07' for f in FACES]))
+
+@pytest.mark.parametrize('encoding', ['ascii', 'binary_little_endian'])
+def test_ply_variable_length_faces(tmp_path, encoding):
+    path = str(tmp_path / 'mesh.ply')
+    write_ply(path, encoding)
+    pc = PointCloudData(path)
+
+    assert pc.ok
+    assert pc.indices.reshape(-1, 3).tolist() == TRIANGLES
+
+def test_ply_truncated_binary_faces(tmp_path):
+    path = str(tmp_path / 'mesh.ply')
+    write_ply(path, 'binary_little_endian')
+    with open(path, 'rb+') as fp:
+        fp.truncate(len(fp.read()) - 3)
+
+    assert not PointCloudData(path).ok
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import time
+import numpy as np
+from wxgl import util
+
+def grid(n):
+    """返回n×n个顶点的起伏网格"""
+
+    x, y = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n))
+    vs = np.stack((x, y, 0.05*np.sin(8*x)*np.cos(6*y)), axis=2).reshape(-1, 3)
+    idx = np.arange(n*n).reshape(n, n)
+    a, b, c, d = idx[:-1,:-1].ravel(), idx[:-1,1:].ravel(), idx[1:,1:].ravel(), idx[1:,:-1].ravel()
+
+    return vs, np.stack((a, b, c, a, c, d), axis=1).reshape(-1, 3)
+
+def check(vs, indices):
+    """返回非流形边（属于两个以上三角面的边）数量和翻转的三角面数量"""
+
+    f = indices.reshape(-1, 3)
+    e = np.sort(f[:,[0,1,1,2,2,0]].reshape(-1, 2), axis=1).astype(np.int64)
+    _, counts = np.unique(e[:,0] * vs.shape[0] + e[:,1], return_counts=True)
+    nz = np.cross(vs[f[:,1]]-vs[f[:,0]], vs[f[:,2]]-vs[f[:,0]])[:,2]
+
+    return int((counts > 2).sum()), int((nz <= 0).sum())
+
+def test_simplify_small_grid():
+    vs, faces = grid(60)
+    v, i, (c,) = util.simplify(vs, faces, 0.2, attrs=[vs[:,2]])
+    assert abs(i.size//3 - faces.shape[0]*0.2) < 4
+    assert check(v, i) == (0, 0)
+    assert np.allclose(c[:,0], v[:,2], atol=1e-6)
+
+def test_simplify_two_million_faces():
+    vs, faces = grid(1000)
+    t0 = time.time()
+    v, i, _ = util.simplify(vs, faces, 0.1)
+    dt = time.time() - t0
+    print('simplify %d -> %d faces: %.2fs' % (faces.shape[0], i.size//3, dt))
+
+    assert abs(i.size//3 - faces.shape[0]//10) < 4
+    assert check(v, i) == (0, 0)
+    assert np.abs(v[:,2] - 0.05*np.sin(8*v[:,0])*np.cos(6*v[:,1])).max() < 1e-4
+    assert dt < 60
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+from wxgl import util
+
+CASES = [
+    [(0,1,0,30), (1,2,3), 2.0],
+    [np.array(2.0)],
+    [[2.0], (1,2,3)],
+    [np.float32(0.5), np.array([0,0,1,45])],
+    [(1,0,0,90), np.array([[1,2,3]]), [1.5]]
+]
+
+@pytest.mark.parametrize('args', CASES)
+def test_compiled_transform_matches_model_matrix(args):
+    ct = util.CompiledTransform(lambda t: args)
+    assert np.allclose(ct(0), util.model_matrix(*args), atol=1e-6)
+
+def test_compiled_transform_follows_changing_layout():
+    seq = [[(1,2,3)], [(0,1,0,30)], [(1,2,3)], [2.0], [(0,1,0,30), 3.0], [(1,2,3)]]
+    ct = util.CompiledTransform(lambda t: seq[t])
+    for t, args in enumerate(seq):
+        assert np.allclose(ct(t), util.model_matrix(*args), atol=1e-6)
+
+def test_compiled_transform_rejects_bad_item():
+    ct = util.CompiledTransform(lambda t: [(1,2)])
+    with pytest.raises(ValueError):
+        ct(0)
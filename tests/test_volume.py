@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pytest
+import wxgl
+
+@pytest.mark.parametrize('mode', ['composite', 'mip', 'iso'])
+@pytest.mark.parametrize('data', [np.zeros((8,8,8)), np.full((8,8,8), 7, dtype=np.uint8)])
+def test_volume_constant_data(mode, data):
+    sch = wxgl.Scheme()
+    sch.volume(data, mode=mode)
+    sch.volume(data, mode=mode, drange=(3,3), level=lambda t: 3.0)
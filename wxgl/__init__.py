@@ -3,10 +3,10 @@
 from OpenGL.GL import *
 from wxgl.app import App
 from wxgl.scheme import Scheme
-from wxgl.texture import Texture
+from wxgl.texture import Texture, texture_report
 from wxgl.model import Model
 from wxgl.light import BaseLight, SunLight, LampLight, SkyLight, SphereLight
-from wxgl.util import font_list, color_list, cm_list, cmap, read_pcfile
+from wxgl.util import font_list, color_list, cm_list, cmap, read_pcfile, build_octree
 
 name = 'wxgl'
 version = '0.9.14'
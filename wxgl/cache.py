@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+VERSION = 1                                                         # 缓存格式版本，几何算法变化时递增，使旧的缓存失效
+
+class GeometryCache:
+    """几何数据的磁盘缓存
+
+    以函数及其参数内容的哈希值为键，将函数返回的numpy数组逐个存为npy文件，命中时以内存映射方式读取。
+    缓存总大小超过上限时，按最近使用时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, path, capacity=1073741824):
+        """构造函数
+
+        path        - 缓存目录
+        capacity    - 缓存总大小的上限（字节）
+        """
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.path = path
+        self.capacity = capacity
+        self.total = None                                               # 缓存总大小的估计值，首次写入时扫描目录得到
+
+    def digest(self, h, obj):
+        """将对象的内容写入哈希对象，不支持的类型抛出TypeError"""
+
+        if isinstance(obj, np.ndarray):
+            obj = np.ascontiguousarray(obj)
+            h.update(('a%s%s'%(obj.dtype.str, obj.shape)).encode())
+            h.update(obj.reshape(-1).view(np.uint8))
+        elif isinstance(obj, (tuple, list)):
+            h.update(('%s%d'%(type(obj).__name__, len(obj))).encode())
+            for item in obj:
+                self.digest(h, item)
+        elif isinstance(obj, dict):
+            h.update(('d%d'%len(obj)).encode())
+            for key in sorted(obj):
+                self.digest(h, key)
+                self.digest(h, obj[key])
+        elif isinstance(obj, (set, frozenset)):
+            h.update(('s%r'%sorted(repr(item) for item in obj)).encode())
+        elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+            h.update(('v%r'%obj).encode())
+        elif hasattr(obj, '__code__'): # 函数以其源码所在模块、名称、字节码，以及闭包变量和默认参数的内容计算哈希值
+            h.update(('f%s.%s'%(obj.__module__, obj.__qualname__)).encode())
+            h.update(obj.__code__.co_code)
+            self.digest(h, obj.__code__.co_consts)
+            self.digest(h, obj.__defaults__)
+            self.digest(h, [cell.cell_contents for cell in obj.__closure__ or ()])
+        elif hasattr(obj, 'co_code'): # 嵌套函数的代码对象
+            h.update(obj.co_code)
+            self.digest(h, obj.co_consts)
+        else:
+            raise TypeError('不支持的缓存参数类型：%s'%type(obj).__name__)
+
+    def key(self, func, *args):
+        """返回函数及其参数的哈希值，参数包含不支持的类型时返回None"""
+
+        h = hashlib.blake2b(digest_size=20)
+        h.update(('wxgl-geometry-%d'%VERSION).encode())
+
+        try:
+            self.digest(h, func)
+            self.digest(h, args)
+        except (TypeError, ValueError):
+            return None
+
+        return h.hexdigest()
+
+    def pack(self, obj, arrays):
+        """将返回值转为可存为json的结构，其中的numpy数组依次存入arrays"""
+
+        if isinstance(obj, np.ndarray):
+            arrays.append(obj)
+            return {'a': len(arrays) - 1}
+        if isinstance(obj, (tuple, list)):
+            return {'t' if isinstance(obj, tuple) else 'l': [self.pack(item, arrays) for item in obj]}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+
+        raise TypeError('不支持的缓存数据类型：%s'%type(obj).__name__)
+
+    def unpack(self, tree, folder):
+        """由json结构和npy文件还原返回值，数组以只读的内存映射方式读取"""
+
+        if isinstance(tree, dict):
+            if 'a' in tree:
+                return np.load(os.path.join(folder, '%d.npy'%tree['a']), mmap_mode='r')
+            if 't' in tree:
+                return tuple(self.unpack(item, folder) for item in tree['t'])
+            return [self.unpack(item, folder) for item in tree['l']]
+
+        return tree
+
+    def get(self, key):
+        """读取缓存，未命中时返回None"""
+
+        folder = os.path.join(self.path, key)
+        fn = os.path.join(folder, 'tree.json')
+
+        try:
+            with open(fn, 'r') as fp:
+                tree = json.load(fp)
+            os.utime(fn) # 以tree.json的修改时间记录最近使用时间
+            return self.unpack(tree, folder),
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        """写入缓存，然后按需淘汰最久未使用的条目"""
+
+        arrays = list()
+        try:
+            tree = self.pack(value, arrays)
+        except TypeError:
+            return
+
+        # 先写入临时目录再整体改名，其他进程不会读到写了一半的条目
+        folder = os.path.join(self.path, key)
+        temp = '%s.%d.tmp'%(folder, os.getpid())
+
+        try:
+            os.makedirs(temp, exist_ok=True)
+            for i, a in enumerate(arrays):
+                np.save(os.path.join(temp, '%d.npy'%i), np.ascontiguousarray(a))
+            with open(os.path.join(temp, 'tree.json'), 'w') as fp:
+                json.dump(tree, fp)
+            size = sum(item.stat().st_size for item in os.scandir(temp))
+            os.rename(temp, folder)
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+
+        # 只在估计的总大小超过上限时才扫描目录，其他进程写入的条目在扫描时一并计入
+        if self.total is None or self.total + size > self.capacity:
+            self.evict()
+        else:
+            self.total += size
+
+    def evict(self):
+        """扫描缓存目录，总大小超过上限时按最近使用时间淘汰最久未使用的条目，并更新总大小的估计值"""
+
+        entries, total = list(), 0
+        for entry in os.scandir(self.path):
+            fn = os.path.join(entry.path, 'tree.json')
+            if not entry.is_dir() or entry.name.endswith('.tmp') or not os.path.isfile(fn):
+                continue
+
+            size = sum(item.stat().st_size for item in os.scandir(entry.path))
+            entries.append((os.stat(fn).st_mtime, size, entry.path))
+            total += size
+
+        # 超过上限时淘汰至上限的90%，留出余量，避免此后每次写入都要扫描目录
+        entries.sort()
+        limit = self.capacity * 0.9 if total > self.capacity else self.capacity
+        while total > limit and len(entries) > 1: # 至少保留最近写入的条目
+            t, size, folder = entries.pop(0)
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
+
+        self.total = total
+
+    def call(self, func, *args):
+        """返回func(*args)，命中缓存时读取缓存，否则计算后写入缓存"""
+
+        key = self.key(func, *args)
+        if key is None:
+            return func(*args)
+
+        hit = self.get(key)
+        if hit:
+            return hit[0]
+
+        value = func(*args)
+        self.put(key, value)
+
+        return value
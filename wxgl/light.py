@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
+import re
 import sys
+import numpy as np
 from OpenGL.GL import *
 from . model import Model
+from . import util
 
 class _Light:
     """光照模型基类"""
@@ -121,6 +124,32 @@ class _Light:
         fill = kwds.get('fill')
         slide = kwds.get('slide')
         transform = kwds.get('transform')
+        reorder = kwds.get('reorder', False)
+        density = kwds.get('density', 40.0)
+        cache = kwds.get('cache')
+
+        # 按需将索引网格按顶点缓存友好的顺序重排图元和顶点，逐顶点数据随之重排
+        if reorder and not indices is None and gltype in (GL_TRIANGLES, GL_QUADS) and np.ndim(vs) == 2:
+            vs = np.asarray(vs)
+            n = vs.shape[0]
+            if cache is None:
+                indices, order = util.optimize_indices(vs, indices, gltype)
+            else:
+                indices, order = cache.call(util.optimize_indices, vs, indices, gltype)
+            vs = vs[order]
+
+            def permute(item, ndim):
+                """逐顶点数据随顶点重排：至少ndim维且除末维外恰有n项，单一的颜色、法向量等保持不变"""
+
+                if item is None or np.ndim(item) < ndim:
+                    return item
+                item = np.asarray(item)
+                if item.ndim == 1:
+                    return item[order] if item.shape[0] == n else item
+                return item.reshape(n, -1)[order] if np.prod(item.shape[:-1]) == n else item
+
+            color, normal = permute(color, 2), permute(normal, 2)
+            texcoord, psize, vid = permute(texcoord, 1), permute(psize, 1), permute(vid, 1)
 
         if texture:
             if texture.ttype == GL_TEXTURE_1D:
@@ -149,7 +178,17 @@ class _Light:
         vshader = self.get_vshader(texture)
         fshader = self.get_fshader(texture)
  
-        m = Model(gltype, vshader, fshader, visible=visible, opacity=opacity, inside=inside)
+        if gltype == GL_PATCHES: # 面片由细分着色器求值生成顶点和法向量
+            vshader, tcshader, teshader = self.get_tshaders(vshader, texture)
+            normal = None
+
+            m = Model(gltype, vshader, fshader, visible=visible, opacity=opacity, inside=inside, patch=16)
+            m.add_shader(tcshader, GL_TESS_CONTROL_SHADER)
+            m.add_shader(teshader, GL_TESS_EVALUATION_SHADER)
+            m.set_argument('u_TessDensity', float(density))
+        else:
+            m = Model(gltype, vshader, fshader, visible=visible, opacity=opacity, inside=inside)
+
         m.set_vertex('a_Position', vs, indices)
         m.set_picked('u_Picked')
 
@@ -218,6 +257,119 @@ class _Light:
  
         return ''
 
+    def get_tshaders(self, vshader, texture):
+        """返回双三次Catmull-Rom曲面片的顶点着色器、细分控制着色器和细分估值着色器源码
+
+        vshader     - 光照模型的顶点着色器源码，在细分估值着色器中对曲面片求值后执行
+        texture     - 纹理对象，None表示使用颜色
+        """
+
+        if texture is None:
+            var, var_type = 'Color', 'vec4'
+        else:
+            var, var_type = 'Texcoord', self.texcoodr_type
+
+        vs_src = """#version 400 core
+
+            in vec4 a_Position;
+            in %s a_%s;
+            out vec4 c_Position;
+            out %s c_%s;
+
+            void main() {
+                c_Position = a_Position;
+                c_%s = a_%s;
+            }
+        """ % (var_type, var, var_type, var, var, var)
+
+        # 细分级别取决于网格单元的边在屏幕上的投影长度，相邻面片共享的边级别相同，不会产生裂缝
+        tc_src = """#version 400 core
+
+            layout (vertices = 16) out;
+            in vec4 c_Position[];
+            in %s c_%s[];
+            out vec4 t_Position[];
+            out %s t_%s[];
+            uniform mat4 u_ProjMatrix;
+            uniform mat4 u_ViewMatrix;
+            uniform mat4 u_ModelMatrix;
+            uniform float u_TessDensity; // 每单位NDC长度的细分段数
+
+            float edge_level(vec4 a, vec4 b) {
+                mat4 mvp = u_ProjMatrix * u_ViewMatrix * u_ModelMatrix;
+                vec4 pa = mvp * a;
+                vec4 pb = mvp * b;
+                if (pa.w <= 0.0 || pb.w <= 0.0) return 64.0;
+                return clamp(distance(pa.xy/pa.w, pb.xy/pb.w) * u_TessDensity, 1.0, 64.0);
+            }
+
+            void main() {
+                t_Position[gl_InvocationID] = c_Position[gl_InvocationID];
+                t_%s[gl_InvocationID] = c_%s[gl_InvocationID];
+
+                if (gl_InvocationID == 0) {
+                    gl_TessLevelOuter[0] = edge_level(c_Position[5], c_Position[9]);
+                    gl_TessLevelOuter[1] = edge_level(c_Position[5], c_Position[6]);
+                    gl_TessLevelOuter[2] = edge_level(c_Position[6], c_Position[10]);
+                    gl_TessLevelOuter[3] = edge_level(c_Position[9], c_Position[10]);
+                    gl_TessLevelInner[0] = max(gl_TessLevelOuter[1], gl_TessLevelOuter[3]);
+                    gl_TessLevelInner[1] = max(gl_TessLevelOuter[0], gl_TessLevelOuter[2]);
+                }
+            }
+        """ % (var_type, var, var_type, var, var, var)
+
+        # 光照模型的顶点着色器改写为细分估值着色器的函数：attribute变量由曲面片求值得到，varying变量改为输出
+        body = vshader.replace(self.glsl_version, '', 1) if self.glsl_version else vshader
+        body = re.sub(r'\battribute\s+', '', body)
+        body = re.sub(r'\bvarying\b', 'out', body)
+        body = re.sub(r'void\s+main\s*\(\s*\)', 'void light_main()', body)
+        normal = 'a_Normal = length(n) > 0.0 ? normalize(n) : vec3(0.0, 0.0, 1.0);' if re.search(r'\ba_Normal\b', body) else ''
+
+        te_src = """#version 400 core
+
+            layout (quads, fractional_odd_spacing, ccw) in;
+            in vec4 t_Position[];
+            in %s t_%s[];
+            """ % (var_type, var) + body + """
+
+            vec4 catmull_rom(float t) {
+                return 0.5 * vec4(((2.0 - t) * t - 1.0) * t, (3.0 * t - 5.0) * t * t + 2.0, ((4.0 - 3.0 * t) * t + 1.0) * t, (t - 1.0) * t * t);
+            }
+
+            vec4 catmull_rom_d(float t) {
+                return 0.5 * vec4((4.0 - 3.0 * t) * t - 1.0, (9.0 * t - 10.0) * t, (8.0 - 9.0 * t) * t + 1.0, (3.0 * t - 2.0) * t);
+            }
+
+            void main() {
+                float u = gl_TessCoord.x;
+                float v = gl_TessCoord.y;
+                vec4 bu = catmull_rom(u);
+                vec4 bv = catmull_rom(v);
+                vec4 du = catmull_rom_d(u);
+                vec4 dv = catmull_rom_d(v);
+
+                vec3 p = vec3(0.0);
+                vec3 pu = vec3(0.0);
+                vec3 pv = vec3(0.0);
+                for (int k=0; k<4; k++) {
+                    for (int l=0; l<4; l++) {
+                        vec3 c = t_Position[k*4+l].xyz;
+                        p += bv[k] * bu[l] * c;
+                        pu += bv[k] * du[l] * c;
+                        pv += dv[k] * bu[l] * c;
+                    }
+                }
+
+                vec3 n = cross(pu, pv);
+                a_Position = vec4(p, 1.0);
+                %s
+                a_%s = mix(mix(t_%s[5], t_%s[6], u), mix(t_%s[9], t_%s[10], u), v);
+                light_main();
+            }
+        """ % (normal, var, var, var, var, var)
+
+        return vs_src, tc_src, te_src
+
 class ScatterLight(_Light):
     """散列点专用的光照模型"""
  
@@ -1300,3 +1452,164 @@ class SphereLight(_Light):
                 } 
             """ % (self.texcoodr_type, self.parameter, self.sampler_type, self.texture_func)
         
+
+class VolumeLight(_Light):
+    """体绘制（光线投射）专用的光照模型"""
+ 
+    def __init__(self, ambient=(0.3,0.3,0.3)):
+        """构造函数"""
+ 
+        _Light.__init__(self, ambient=ambient, cpos=True)
+ 
+    def get_model(self, gltype, vs, **kwds):
+        """返回模型对象
+
+        kwds中除_Light._get_model支持的关键字外，还包括：
+            transfer    - 传递函数（调色板）1D纹理
+            mode        - 绘制模式：0-合成，1-最大密度投影，2-等值面；或以时间t为参数返回模式的函数
+            level       - 归一化的等值面阈值，或以时间t为参数返回阈值的函数
+            steps       - 沿包围盒对角线的采样步数
+            box         - 包围盒的最小点和最大点
+            res         - 数据体最大边长（体素数）
+        """
+
+        transfer = kwds.pop('transfer')
+        mode = kwds.pop('mode')
+        level = kwds.pop('level')
+        steps = kwds.pop('steps')
+        box = kwds.pop('box')
+        res = kwds.pop('res')
+        kwds.update({'normal':None, 'texcoord':None, 'color':None})
+
+        m = self._get_model(gltype, vs, **kwds)
+        m.add_texture('u_Transfer', transfer)
+        m.set_argument('u_Mode', mode)
+        m.set_argument('u_Level', level)
+        m.set_argument('u_Steps', steps)
+        m.set_argument('u_BoxMin', box[0])
+        m.set_argument('u_BoxMax', box[1])
+        m.set_argument('u_Res', res)
+
+        return m
+ 
+    def get_vshader(self, texture):
+        """返回顶点着色器源码"""
+ 
+        return self.glsl_version + """
+            attribute vec4 a_Position;
+            uniform mat4 u_ProjMatrix;
+            uniform mat4 u_ViewMatrix;
+            uniform mat4 u_ModelMatrix;
+            varying vec3 v_Pos;
+ 
+            void main() { 
+                v_Pos = a_Position.xyz;
+                gl_Position = u_ProjMatrix * u_ViewMatrix * u_ModelMatrix * a_Position; 
+            }
+        """
+ 
+    def get_fshader(self, texture):
+        """返回片元着色器源码"""
+ 
+        tf_func = 'texture1D' if self.platform == 'darwin' else 'texture'
+        return self.glsl_version + """
+            varying vec3 v_Pos;
+            uniform mat4 u_ModelMatrix;
+            uniform vec3 u_CamPos;
+            uniform vec3 u_AmbientColor;
+            uniform vec3 u_BoxMin;
+            uniform vec3 u_BoxMax;
+            uniform sampler3D u_Texture;
+            uniform sampler1D u_Transfer;
+            uniform int u_Mode;
+            uniform float u_Level;
+            uniform int u_Steps;
+            uniform float u_Res;
+            uniform int u_Picked;
+ 
+            """ + self.glsl_functions + """
+
+            float sample_at(vec3 p) {
+                return %s(u_Texture, p.zyx).r;
+            }
+
+            vec3 gradient_at(vec3 p, float d) {
+                return vec3(
+                    sample_at(p + vec3(d, 0.0, 0.0)) - sample_at(p - vec3(d, 0.0, 0.0)),
+                    sample_at(p + vec3(0.0, d, 0.0)) - sample_at(p - vec3(0.0, d, 0.0)),
+                    sample_at(p + vec3(0.0, 0.0, d)) - sample_at(p - vec3(0.0, 0.0, d))
+                );
+            }
+
+            void main() { 
+                // 相机位置变换到模型空间，求视线与包围盒的交点
+                vec3 cam = vec3(inverse(u_ModelMatrix) * vec4(u_CamPos, 1.0));
+                vec3 dir = normalize(v_Pos - cam);
+                vec3 t0 = (u_BoxMin - cam) / dir;
+                vec3 t1 = (u_BoxMax - cam) / dir;
+                vec3 tmin = min(t0, t1);
+                vec3 tmax = max(t0, t1);
+                float t_near = max(max(max(tmin.x, tmin.y), tmin.z), 0.0);
+                float t_far = min(min(tmax.x, tmax.y), tmax.z);
+                if (t_far <= t_near) discard;
+
+                // 在归一化的纹理空间中步进采样
+                vec3 size = u_BoxMax - u_BoxMin;
+                vec3 p0 = (cam + dir * t_near - u_BoxMin) / size;
+                vec3 p1 = (cam + dir * t_far - u_BoxMin) / size;
+                float dt = 1.7320508 / float(u_Steps);
+                int n = int(length(p1 - p0) / dt) + 1;
+                vec3 delta = normalize(p1 - p0) * dt;
+                float k = dt * u_Res; // 不透明度校正系数：传递函数的不透明度以一个体素为单位长度
+
+                vec4 acc = vec4(0.0);
+                float v_max = 0.0;
+                float v_last = 0.0;
+                vec3 p = p0;
+                bool hit = false;
+
+                for (int i=0; i<4096; i++) {
+                    if (i >= n) break;
+
+                    float v = sample_at(p);
+                    if (u_Mode == 0) {
+                        vec4 c = %s(u_Transfer, v);
+                        float a = 1.0 - pow(1.0 - c.a, k);
+                        acc.rgb += (1.0 - acc.a) * a * c.rgb;
+                        acc.a += (1.0 - acc.a) * a;
+                        if (acc.a > 0.98) break;
+                    } else if (u_Mode == 1) {
+                        v_max = max(v_max, v);
+                    } else if (v >= u_Level) {
+                        if (i > 0)
+                            p -= delta * (v - u_Level) / max(v - v_last, 1e-6); // 线性插值逼近等值面
+                        hit = true;
+                        break;
+                    }
+
+                    v_last = v;
+                    p += delta;
+                }
+
+                vec4 color;
+                if (u_Mode == 0) {
+                    if (acc.a < 0.01) discard;
+                    color = acc;
+                } else if (u_Mode == 1) {
+                    color = %s(u_Transfer, v_max);
+                    color.a = v_max;
+                    if (color.a < 0.01) discard;
+                } else {
+                    if (!hit) discard;
+                    vec3 normal = -gradient_at(p, 1.0/u_Res);
+                    float lambert = length(normal) > 0.0 ? abs(dot(normalize(normal), dir)) : 1.0;
+                    vec3 c = %s(u_Transfer, u_Level).rgb;
+                    color = vec4(c * (u_AmbientColor + (1.0 - u_AmbientColor) * lambert), 1.0);
+                }
+
+                if (u_Picked == 0)
+                    gl_FragColor = color;
+                else
+                    gl_FragColor = vec4(min(color.rgb*1.5, vec3(1.0)), color.a);
+            } 
+        """ % (self.texture_func, tf_func, tf_func, tf_func)
@@ -19,9 +19,10 @@ class Model:
             inside      - 模型显示在视锥体内，默认True
             sprite      - 开启点精灵，默认False
             alive       - 启动渲染计时器，默认False
+            patch       - 每个面片的顶点数，仅用于GL_PATCHES，默认3
         """
  
-        keys = ['visible', 'opacity', 'inside', 'sprite', 'alive']
+        keys = ['visible', 'opacity', 'inside', 'sprite', 'alive', 'patch']
         for key in kwds:
             if key not in keys:
                 raise KeyError('不支持的关键字参数：%s'%key)
@@ -35,7 +36,8 @@ class Model:
             GL_TRIANGLE_STRIP,	# 绘制连续三角形
             GL_TRIANGLE_FAN,    # 绘制多个三角形组成的扇形
             GL_QUADS,	        # 绘制一个或多个四边形
-            GL_QUAD_STRIP       # 四边形条带
+            GL_QUAD_STRIP,      # 四边形条带
+            GL_PATCHES          # 面片（由细分着色器生成图元）
         )
  
         if gltype not in gltypes:
@@ -49,6 +51,7 @@ class Model:
         self.inside = kwds.get('inside', True)          # 模型顶点是否影响模型空间，默认True
         self.sprite = kwds.get('sprite', False)         # 开启点精灵，默认False
         self.alive = kwds.get('alive', False)           # 启动渲染计时器，默认False
+        self.patch = kwds.get('patch', 3)               # 每个面片的顶点数，仅用于GL_PATCHES
         self.slide = None                               # 幻灯片函数
         self.depth = dict()                             # 深度轴均值
         self.picked = False                             # 模型被拾取
@@ -65,6 +68,11 @@ class Model:
         self.r_x = None                                 # 顶点坐标x的动态范围
         self.r_y = None                                 # 顶点坐标y的动态范围
         self.r_z = None                                 # 顶点坐标z的动态范围
+        self.lods = list()                              # 细节层次：按几何误差升序排列的顶点数据
+        self.lod = 0                                    # 当前使用的细节层次
+        self.bound = None                               # 包围球的球心和半径
+        self.stream = None                              # 流式加载顶点数据的数据源（如八叉树点云）
+        self.ranges = None                              # 分段绘制的起始顶点和顶点数量，None表示绘制全部顶点
  
         self.before = list()                            # 绘制前执行的GL命令
         self.after = list()                             # 绘制后执行的GL命令
@@ -78,6 +86,9 @@ class Model:
             self.before.append((glEnable, (GL_PROGRAM_POINT_SIZE,)))
             self.after.append((glPopAttrib, ()))
  
+        if self.gltype == GL_PATCHES:
+            self.before.append((glPatchParameteri, (GL_PATCH_VERTICES, self.patch)))
+ 
     def add_shader(self, shader_src, shader_type):
         """添加着色器
  
@@ -176,6 +187,56 @@ class Model:
             self.before.append((glEnable, (GL_PROGRAM_POINT_SIZE,)))
             self.after.append((glPopAttrib, ()))
  
+    def set_lod(self, lods):
+        """设置细节层次
+ 
+        lods        - 由几何误差、逐顶点数据和顶点索引组成的元组列表，按几何误差升序排列，几何误差为模型空间中的长度
+                      第一项为当前模型自身，其逐顶点数据和顶点索引均为None
+                      逐顶点数据是以attribute类别（vertex、normal、color等）为键的numpy数组字典，须覆盖当前模型的全部attribute变量
+                      各层次只保存顶点数据，共用当前模型的着色器
+        """
+ 
+        self.lods = list()
+        for error, data, indices in lods:
+            if data is None:
+                self.lods.append({'error':error, 'attribute':self.attribute, 'indices':self.indices, 'vshape':self.vshape})
+                continue
+
+            attribute, vshape = dict(), None
+            for key in self.attribute:
+                tag, un = self.attribute[key]['tag'], self.attribute[key]['un']
+                if tag not in data:
+                    raise ValueError('细节层次缺少%s数据'%tag)
+
+                value = np.array(data[tag], dtype=np.float32).reshape(-1, un)
+                attribute.update({key: {'tag':tag, 'data':value, 'un':un, 'usize':value.itemsize}})
+                if tag == 'vertex':
+                    vshape = value.shape
+
+            if not indices is None:
+                indices = np.array(indices, dtype=np.int32)
+                indices = {'data':indices, 'n':indices.size}
+
+            self.lods.append({'error':error, 'attribute':attribute, 'indices':indices, 'vshape':vshape})
+ 
+        for key in self.attribute:
+            if self.attribute[key]['tag'] == 'vertex':
+                data = self.attribute[key]['data']
+                lo, hi = data.min(axis=0), data.max(axis=0)
+                self.bound = ((lo+hi)/2, np.linalg.norm(hi-lo)/2)
+ 
+        self.lod = 0
+ 
+    def switch_lod(self, level):
+        """切换细节层次
+ 
+        level       - 细节层次的序号，0为最高精度
+        """
+ 
+        lod = self.lods[level]
+        self.attribute, self.indices, self.vshape = lod['attribute'], lod['indices'], lod['vshape']
+        self.lod = level
+ 
     def add_texture(self, var_name, texture):
         """添加纹理
  
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+
+import os
+import heapq
+import queue
+import threading
+import collections
+import numpy as np
+from . pointcloud import PointCloudData
+
+NODE_DTYPE = np.dtype([('xyz', '<f4', 3), ('rgba', 'u1', 4)])     # 节点文件中每个点的存储格式
+MAX_LEVEL = 20                                                      # 八叉树的最大深度
+
+class OctreeBuilder:
+    """点云八叉树构建器：将点云文件预处理为磁盘上分层分块存储的节点文件
+
+    每个节点保存其子树全部点的一个空间均匀的抽稀子集，子节点只保存父节点未选中的点，
+    各层节点叠加即为完整点云。构建过程分块读取源文件，内存占用与点云规模无关。
+    """
+
+    def __init__(self, capacity=32768, grid=128, chunk=4194304, bucket=8388608):
+        """构造函数
+
+        capacity    - 每个节点的最大点数
+        grid        - 节点内抽稀网格的分辨率
+        chunk       - 分块读取源文件的点数
+        bucket      - 分桶构建子树时，每个分桶的期望点数
+        """
+
+        self.capacity = capacity
+        self.grid = grid
+        self.chunk = chunk
+        self.bucket = bucket
+        self.rng = np.random.default_rng(0)
+
+    def build(self, pcfile, outdir, colorize=None):
+        """构建八叉树，返回索引文件名
+
+        pcfile      - 点云文件，支持ply、pcd、las等格式
+        outdir      - 输出目录
+        colorize    - 无颜色数据时将强度映射为颜色的函数，参数为强度数组和强度范围，返回值域范围[0,1]的RGBA颜色
+        """
+
+        ds = PointCloudData(pcfile)
+        if not ds.ok:
+            raise RuntimeError(ds.info)
+
+        head = next(ds.chunks(1), None)
+        if head is None or head.xyz is None:
+            raise RuntimeError('错误：文件不包含坐标数据')
+
+        os.makedirs(outdir, exist_ok=True)
+
+        # 第一遍：坐标和强度的范围
+        lo, hi, irange, total = None, None, None, 0
+        for part in ds.chunks(self.chunk):
+            xyz = part.xyz
+            lo = xyz.min(axis=0) if lo is None else np.minimum(lo, xyz.min(axis=0))
+            hi = xyz.max(axis=0) if hi is None else np.maximum(hi, xyz.max(axis=0))
+            total += xyz.shape[0]
+
+            if head.rgb is None and not part.intensity is None:
+                imin, imax = float(part.intensity.min()), float(part.intensity.max())
+                irange = (imin, imax) if irange is None else (min(irange[0], imin), max(irange[1], imax))
+
+        center = (lo + hi) / 2
+        half = max((hi - lo).max() / 2, 1e-6) * (1 + 1e-6)
+
+        # 第二遍：按第depth层的节点分桶写入临时文件，每个分桶的点数与内存相称
+        depth = 0
+        while depth < 4 and total > self.bucket * 8**depth:
+            depth += 1
+
+        n = 1 << depth
+        buckets = set()
+        for part in ds.chunks(self.chunk):
+            pts = self.points(part, center, irange, colorize)
+            cell = np.clip(np.int64((pts['xyz'] + half) * (n / (2 * half))), 0, n-1)
+            code = (cell[:,0] * n + cell[:,1]) * n + cell[:,2]
+
+            order = np.argsort(code, kind='stable')
+            codes, starts = np.unique(code[order], return_index=True)
+            for c, rows in zip(codes, np.split(order, starts[1:])):
+                with open(os.path.join(outdir, 'bucket_%d.tmp'%c), 'ab') as fp:
+                    pts[rows].tofile(fp)
+                buckets.add(int(c))
+
+        # 第三遍：每个分桶在内存中自顶向下构建子树
+        nodes = dict()
+        size = 2 * half / n
+        for c in sorted(buckets):
+            tmpfile = os.path.join(outdir, 'bucket_%d.tmp'%c)
+            pts = np.fromfile(tmpfile, dtype=NODE_DTYPE)
+            os.remove(tmpfile)
+
+            cell = np.array([c // (n*n), c // n % n, c % n])
+            name = 'r' + ''.join([str(((cell >> (depth-i) & 1) * (4, 2, 1)).sum()) for i in range(1, depth+1)])
+            self.split(outdir, nodes, name, pts, cell * size - half, size)
+
+        # 第四遍：自底向上由子节点的点抽稀生成上层节点
+        for level in range(depth-1, -1, -1):
+            for parent in sorted(set([name[:-1] for name in nodes if len(name) == level + 2])):
+                self.merge(outdir, nodes, parent)
+
+        names = sorted(nodes, key=lambda name:(len(name), name))
+        index = os.path.join(outdir, 'octree.npz')
+        np.savez(index,
+            names       = np.array(names),
+            counts      = np.array([nodes[name][0] for name in names], dtype=np.int64),
+            lo          = np.array([nodes[name][1] for name in names], dtype=np.float64),
+            size        = np.array([nodes[name][2] for name in names], dtype=np.float64),
+            center      = center,
+            bound       = np.stack((lo - center, hi - center)),
+            capacity    = self.capacity,
+            grid        = self.grid
+        )
+
+        return index
+
+    def points(self, part, center, irange, colorize):
+        """将一块源数据转为节点存储格式：相对于中心的float32坐标和uint8的RGBA颜色"""
+
+        pts = np.empty(part.count, dtype=NODE_DTYPE)
+        pts['xyz'] = part.xyz - center
+
+        rgb = part.get_rgb(np.uint8)
+        if not rgb is None:
+            pts['rgba'][:,:3] = rgb
+            pts['rgba'][:,3] = 255
+        elif not part.intensity is None and not colorize is None:
+            pts['rgba'] = np.uint8(np.clip(np.asarray(colorize(part.intensity, irange)) * 255 + 0.5, 0, 255))
+        else:
+            pts['rgba'] = 255
+
+        return pts
+
+    def sample(self, pts, lo, size):
+        """在节点内的抽稀网格中每个被占据的单元随机选取一个点，返回选中点的掩码"""
+
+        q = np.clip(np.int64((pts['xyz'] - lo) * (self.grid / size)), 0, self.grid-1)
+        key = (q[:,0] * self.grid + q[:,1]) * self.grid + q[:,2]
+
+        order = self.rng.permutation(key.shape[0])
+        chosen = order[np.unique(key[order], return_index=True)[1]]
+        if chosen.shape[0] > self.capacity:
+            chosen = self.rng.choice(chosen, self.capacity, replace=False)
+
+        mask = np.zeros(key.shape[0], dtype=bool)
+        mask[chosen] = True
+
+        return mask
+
+    def split(self, outdir, nodes, name, pts, lo, size):
+        """自顶向下构建子树：节点保留抽稀子集，其余的点按八分体分给子节点"""
+
+        if pts.shape[0] <= self.capacity:
+            rest = None
+        elif len(name) > MAX_LEVEL: # 大量重合的点无法继续细分，超出容量的部分舍弃
+            pts, rest = pts[:self.capacity], None
+        else:
+            mask = self.sample(pts, lo, size)
+            pts, rest = pts[mask], pts[~mask]
+
+        np.save(os.path.join(outdir, '%s.npy'%name), pts)
+        nodes.update({name: (pts.shape[0], np.float64(lo), size)})
+
+        if not rest is None:
+            bits = rest['xyz'] >= lo + size/2
+            octant = bits[:,0] * 4 + bits[:,1] * 2 + bits[:,2]
+            for i in range(8):
+                part = rest[octant == i]
+                if part.shape[0]:
+                    offset = np.array([i >> 2 & 1, i >> 1 & 1, i & 1]) * size / 2
+                    self.split(outdir, nodes, name + str(i), part, lo + offset, size/2)
+
+    def merge(self, outdir, nodes, parent):
+        """自底向上生成节点：从子节点的点中抽稀出父节点的点，并从子节点中移除"""
+
+        children = [parent + str(i) for i in range(8) if parent + str(i) in nodes]
+        data = [np.load(os.path.join(outdir, '%s.npy'%name)) for name in children]
+
+        i = int(children[0][-1])
+        size = nodes[children[0]][2] * 2
+        lo = nodes[children[0]][1] - np.array([i >> 2 & 1, i >> 1 & 1, i & 1]) * size / 2
+
+        union = np.concatenate(data)
+        mask = self.sample(union, lo, size)
+        pts = union[mask]
+        np.save(os.path.join(outdir, '%s.npy'%parent), pts)
+        nodes.update({parent: (pts.shape[0], lo, size)})
+
+        start = 0
+        for name, item in zip(children, data):
+            rest = item[~mask[start:start+item.shape[0]]]
+            start += item.shape[0]
+
+            np.save(os.path.join(outdir, '%s.npy'%name), rest)
+            nodes.update({name: (rest.shape[0], *nodes[name][1:])})
+
+class OctreeStream:
+    """八叉树点云的流式加载器
+
+    按当前相机下节点点间距的屏幕投影大小（屏幕空间误差）自根节点向下选择节点，
+    后台线程读取节点文件，读入的节点存入固定大小的显存池，显存池满时淘汰最久未使用的节点。
+    """
+
+    def __init__(self, path, budget=4194304, error=2.0, uploads=8):
+        """构造函数
+
+        path        - 八叉树目录
+        budget      - 显存池可容纳的点数
+        error       - 允许的最大屏幕空间误差（像素），节点点间距的投影大于此值时加载其子节点
+        uploads     - 每帧最多上传的节点数量
+        """
+
+        index = np.load(os.path.join(path, 'octree.npz'))
+
+        self.path = path
+        self.names = [str(name) for name in index['names']]
+        self.counts = index['counts']
+        self.capacity = int(index['capacity'])
+        self.center = index['center']
+        self.bound = index['bound']
+        self.error = error
+        self.uploads = uploads
+
+        size = index['size']
+        self.spacing = size / int(index['grid'])                        # 节点的点间距
+        self.centers = np.hstack((index['lo'] + size[:,None]/2, np.ones((size.shape[0], 1)))) # 节点中心的齐次坐标
+        self.radius = size * np.sqrt(3) / 2                             # 节点包围球半径
+
+        ids = {name: i for i, name in enumerate(self.names)}
+        self.children = [list() for name in self.names]
+        for i, name in enumerate(self.names):
+            if len(name) > 1:
+                self.children[ids[name[:-1]]].append(i)
+
+        self.slots = max(1, budget // self.capacity)                    # 显存池的槽位数量，每个槽位容纳一个节点
+        self.fields = ('a_Position', 'a_Color')                         # 逐帧写入显存的attribute变量名
+        self.free = list(range(self.slots-1, -1, -1))                   # 空闲的槽位
+        self.resident = collections.OrderedDict()                       # 驻留显存的节点及其槽位，按最近使用的先后排序
+        self.requested = set()                                          # 已提交读盘请求的节点
+        self.failed = set()                                             # 读盘失败的节点，不再重复请求
+        self.tasks = queue.Queue()                                      # 读盘请求
+        self.loaded = queue.Queue()                                     # 读入的节点数据
+        self.thread = None                                              # 读盘线程
+
+    def load(self):
+        """读盘线程函数"""
+
+        while True:
+            i = self.tasks.get()
+            if i is None:
+                break
+
+            if i in self.requested: # 已不再需要的请求直接跳过
+                fn = os.path.join(self.path, '%s.npy'%self.names[i])
+                try:
+                    self.loaded.put((i, np.load(fn)))
+                except (OSError, ValueError) as e:
+                    self.loaded.put((i, '%s（%s）'%(fn, e)))
+
+    def close(self):
+        """结束读盘线程，清空显存池（显存对象随模型一起删除）"""
+
+        if self.thread:
+            self.requested.clear()
+            self.tasks.put(None)
+            self.thread.join()
+            self.thread = None
+
+        self.tasks = queue.Queue()
+        self.loaded = queue.Queue()
+        self.resident.clear()
+        self.free = list(range(self.slots-1, -1, -1))
+
+    def select(self, mmat, vmat, pmat, near, height):
+        """按屏幕空间误差选择需要绘制的节点，返回按优先级降序排列的节点序号列表
+
+        mmat        - 模型矩阵
+        vmat        - 视点矩阵
+        pmat        - 投影矩阵
+        near        - 视锥体前端面的距离
+        height      - 视口高度（像素）
+        """
+
+        mvp = np.dot(np.dot(mmat, vmat), pmat)
+        k = np.sqrt(np.square(mmat[:3,:3]).sum(axis=1).max()) # 模型矩阵的最大缩放系数
+
+        # 视锥体裁剪：包围球完全位于任一裁剪平面之外的节点不可见
+        planes = np.stack([mvp[:,3] + mvp[:,i] for i in range(3)] + [mvp[:,3] - mvp[:,i] for i in range(3)])
+        planes /= np.linalg.norm(planes[:,:3], axis=1)[:,None]
+        visible = (np.dot(self.centers, planes.T) >= -self.radius[:,None] * k).all(axis=1)
+
+        # 节点点间距在屏幕上的投影大小，包围球与前端面相交时视为无穷大
+        dist = -np.dot(np.dot(self.centers, mmat), vmat)[:,2] - self.radius * k
+        with np.errstate(divide='ignore'):
+            px = np.where(dist > near, k * pmat[1,1] * height / (2 * np.maximum(dist, near)), np.inf) * self.spacing
+
+        selected, heap = list(), [(-px[0], 0)] if visible[0] else list()
+        while heap and len(selected) < self.slots:
+            p, i = heapq.heappop(heap)
+            selected.append(i)
+
+            if -p > self.error:
+                for j in self.children[i]:
+                    if visible[j]:
+                        heapq.heappush(heap, (-px[j], j))
+
+        return selected
+
+    def update(self, mmat, vmat, pmat, near, height):
+        """更新节点选择，返回待上传的(起始顶点, {attribute变量名: 数据})列表，以及绘制时各段的起始顶点和顶点数量"""
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.load, daemon=True)
+            self.thread.start()
+
+        selected = self.select(mmat, vmat, pmat, near, height)
+        wanted = set(selected)
+
+        self.requested &= wanted
+        for i in selected:
+            if i in self.resident:
+                self.resident.move_to_end(i)
+            elif i not in self.requested and i not in self.failed:
+                self.requested.add(i)
+                self.tasks.put(i)
+
+        uploads = list()
+        while len(uploads) < self.uploads and not self.loaded.empty():
+            i, data = self.loaded.get()
+            self.requested.discard(i)
+
+            if isinstance(data, str):
+                self.failed.add(i)
+                print('节点数据读取失败：%s'%data)
+                continue
+
+            if i not in wanted or i in self.resident:
+                continue
+
+            if not self.free:
+                for j in self.resident:
+                    if j not in wanted:
+                        self.free.append(self.resident.pop(j))
+                        break
+                else:
+                    continue # 显存池已被需要绘制的节点占满
+
+            slot = self.free.pop()
+            self.resident.update({i: slot})
+            data = data[:self.capacity]
+            uploads.append((slot*self.capacity, {'a_Position': data['xyz'], 'a_Color': data['rgba']/255}))
+
+        drawn = [i for i in selected if i in self.resident and self.counts[i] > 0]
+        first = np.array([self.resident[i] * self.capacity for i in drawn], dtype=np.int32)
+        count = np.array([min(self.counts[i], self.capacity) for i in drawn], dtype=np.int32)
+
+        return uploads, (first, count)
@@ -2,31 +2,106 @@
 
 import os
 import struct
-import binascii
+import warnings
 import numpy as np
 import wxgl
 
+PLY_TYPES = {
+    'float32':  'f4',   'float':    'f4',
+    'float64':  'f8',   'double':   'f8',
+    'int8':     'i1',   'char':     'i1',
+    'int16':    'i2',   'short':    'i2',
+    'int32':    'i4',   'int':      'i4',
+    'uint8':    'u1',   'uchar':    'u1',
+    'uint16':   'u2',   'ushort':   'u2',
+    'uint32':   'u4',   'uint':     'u4'
+}
+
+LAS_FORMATS = dict()
+LAS_FORMATS[0] = [('x', '<i4'), ('y', '<i4'), ('z', '<i4'), ('intensity', '<u2'), ('flags', 'u1'), ('classification', 'u1'), ('scan_angle', 'i1'), ('user_data', 'u1'), ('point_source_id', '<u2')]
+LAS_FORMATS[1] = LAS_FORMATS[0] + [('gps_time', '<f8')]
+LAS_FORMATS[2] = LAS_FORMATS[0] + [('red', '<u2'), ('green', '<u2'), ('blue', '<u2')]
+LAS_FORMATS[3] = LAS_FORMATS[1] + [('red', '<u2'), ('green', '<u2'), ('blue', '<u2')]
+LAS_FORMATS[6] = [('x', '<i4'), ('y', '<i4'), ('z', '<i4'), ('intensity', '<u2'), ('returns', 'u1'), ('flags', 'u1'), ('classification', 'u1'), ('user_data', 'u1'), ('scan_angle', '<i2'), ('point_source_id', '<u2'), ('gps_time', '<f8')]
+LAS_FORMATS[7] = LAS_FORMATS[6] + [('red', '<u2'), ('green', '<u2'), ('blue', '<u2')]
+LAS_FORMATS[8] = LAS_FORMATS[7] + [('nir', '<u2')]
+
 lzf_is_available = True
 try:
     import lzf
 except:
     lzf_is_available = False
 
+class TextBlocks:
+    """分块读取文本数据，每块由若干整行组成，内存中只保留一两块文本"""
+
+    def __init__(self, fp, size=4194304):
+        """构造函数
+
+        fp          - 以二进制方式打开的文件对象，文件指针位于文本数据的起始位置
+        size        - 每次从文件读取的字节数
+        """
+
+        self.fp = fp
+        self.size = size
+        self.rest = b''                                                 # 已读取但尚未使用的文本
+
+    def read(self, count):
+        """逐块生成(文本块, 行数)，共count行，文件提前结束时只生成余下的行"""
+
+        while count > 0:
+            more = self.fp.read(self.size)
+            block = self.rest + more
+            if not more and block and not block.endswith(b'\n'): # 文件最后一行可能没有换行符
+                block += b'\n'
+
+            lf = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            if lf.shape[0] >= count:
+                end = lf[count-1] + 1
+            else:
+                end = lf[-1] + 1 if lf.shape[0] else 0
+
+            n = min(count, lf.shape[0])
+            self.rest = block[end:]
+            count -= n
+
+            if n:
+                yield block[:end], n
+            if not more:
+                break
+
 class PointCloudData:
     """读取点云数据文件"""
     
-    def __init__(self, pcfile):
-        """构造函数，pcfile为点云数据文件名"""
+    def __init__(self, pcfile, subset=None, rows=None):
+        """构造函数
+
+        pcfile      - 点云数据文件名
+        subset      - 只读取的字段名列表，默认None（读取全部字段）
+        rows        - 只读取的行（点）范围：(start, stop)元组，默认None（读取全部行）
+        """
 
         self.ok = True                  # 数据是否可用
         self.info = '正常：数据可用'    # 数据可用性说明
-        self.raw = dict()               # 解读出来的原始数据
+        self.raw = dict()               # 解读出来的原始数据，二进制文件的字段为内存映射文件上的视图
+        self.indices = None             # 三角面的顶点索引（仅网格文件）
+        self.cache = dict()             # 由原始数据导出的数据（如坐标、颜色）的缓存
+        self.subset = subset            # 只读取的字段名列表
+        self.rows = slice(*rows) if rows else slice(None) # 只读取的行范围
+        self.scale = None               # 坐标的缩放系数（仅las文件）
+        self.origin = None              # 坐标的偏移量，即相对坐标的原点（仅las文件）
 
         ext = os.path.splitext(pcfile)[1].lower()
         if ext == '.ply':
             self.open_ply(pcfile)
         elif ext == '.pcd':
             self.open_pcd(pcfile)
+        elif ext == '.las':
+            self.open_las(pcfile)
+        elif ext == '.obj':
+            self.open_obj(pcfile)
+        elif ext == '.stl':
+            self.open_stl(pcfile)
         else:
             self.ok = False
             self.info = '错误：不支持的点云数据文件格式：%s'%ext
@@ -41,173 +116,583 @@ class PointCloudData:
     def xyz(self):
         """坐标数据"""
 
-        if 'x' in self.raw and 'y' in self.raw and 'z' in self.raw:
-            xyz = np.stack((self.raw['x'], self.raw['y'], self.raw['z']), axis=1)
-        elif 'X' in self.raw and 'Y' in self.raw and 'Z' in self.raw:
-            xyz = np.stack((self.raw['X'], self.raw['Y'], self.raw['Z']), axis=1)
-        else:
-            xyz = None 
+        return self.get_xyz()
+
+    def get_xyz(self, relative=False):
+        """返回坐标数据，relative为True时返回相对于origin的float32坐标（origin为None时与xyz相同）"""
 
-        return xyz
+        xyz = self.stack_fields(('x', 'y', 'z'), ('X', 'Y', 'Z'))
+        if xyz is None or self.scale is None:
+            return xyz
+
+        # las文件存储的是整型坐标，按文件头的缩放系数和偏移量换算为实际坐标
+        key = ('xyz', relative)
+        if key not in self.cache:
+            if relative:
+                self.cache.update({key: np.float32(xyz * self.scale)})
+            else:
+                self.cache.update({key: xyz * self.scale + self.origin})
+
+        return self.cache[key]
 
     @property
     def rgb(self):
         """颜色数据，浮点型，值域范围[0,1]"""
 
-        if 'r' in self.raw and 'g' in self.raw and 'b' in self.raw:
-            rgb = np.stack((self.raw['r'], self.raw['g'], self.raw['b']), axis=1)
-            if rgb.dtype == np.uint8:
-                rgb = np.float64(self.rgb) / 255
-        elif 'R' in self.raw and 'G' in self.raw and 'B' in self.raw:
-            rgb = np.stack((self.raw['R'], self.raw['G'], self.raw['B']), axis=1)
-            if rgb.dtype == np.uint8:
-                rgb = np.float64(self.rgb) / 255
-        elif 'rgb' in self.raw and self.raw['rgb'].dtype == np.float32:
-            rgb = list()
-            cs = binascii.hexlify(self.raw['rgb'].tobytes()).decode()
-            for i in range(0, len(cs), 8):
-                rgb.append([int(cs[i+2:i+4], base=16)/255, int(cs[i+4:i+6], base=16)/255, int(cs[i+6:i+8], base=16)/255])
-            rgb = np.array(rgb, dtype=np.float32)
-        elif 'RGB' in self.raw and self.raw['RGB'].dtype == np.float32:
-            rgb = list()
-            cs = binascii.hexlify(self.raw['RGB'].tobytes()).decode()
-            for i in range(0, len(cs), 8):
-                rgb.append([int(cs[i+2:i+4], base=16)/255, int(cs[i+4:i+6], base=16)/255, int(cs[i+6:i+8], base=16)/255])
-            rgb = np.array(rgb, dtype=np.float32)
-        else:
+        return self.get_rgb()
+
+    def get_rgb(self, dtype=np.float32):
+        """返回颜色数据，dtype为np.float32时值域范围[0,1]，为np.uint8时值域范围[0,255]，无颜色数据时返回None"""
+
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.uint8):
+            raise ValueError('不支持的颜色数据类型：%s'%str(dtype))
+
+        if dtype not in self.cache:
             rgb = None
+            for r, g, b in (('r', 'g', 'b'), ('R', 'G', 'B'), ('red', 'green', 'blue')):
+                if r in self.raw and g in self.raw and b in self.raw:
+                    rgb = np.stack((self.raw[r], self.raw[g], self.raw[b]), axis=1)
+                    break
+            else:
+                # 打包存储的颜色：4字节中由高到低依次为alpha（或保留）、红、绿、蓝
+                for key in ('rgb', 'RGB', 'rgba', 'RGBA'):
+                    if key in self.raw and self.raw[key].dtype.itemsize == 4:
+                        packed = np.ascontiguousarray(self.raw[key], dtype=self.raw[key].dtype.newbyteorder('=')).view(np.uint32)
+                        rgb = np.stack((packed >> 16, packed >> 8, packed), axis=1).astype(np.uint8)
+                        break
+
+            if rgb is None:
+                return None
 
-        return rgb
+            if rgb.dtype == np.uint16: # 16位颜色（如las文件），部分软件只写入了0~255的值
+                rgb = np.uint8(rgb >> 8) if rgb.max() > 255 else np.uint8(rgb)
+
+            if dtype == np.uint8:
+                if rgb.dtype != np.uint8:
+                    rgb = np.uint8(np.clip(np.float32(rgb)*255 + 0.5, 0, 255))
+            elif rgb.dtype == np.uint8:
+                rgb = np.float32(rgb) / 255
+            else:
+                rgb = np.float32(rgb)
+
+            self.cache.update({dtype: rgb})
+
+        return self.cache[dtype]
+
+    @property
+    def normal(self):
+        """法向量数据"""
+
+        return self.stack_fields(('nx', 'ny', 'nz'), ('normal_x', 'normal_y', 'normal_z'))
+
+    @property
+    def texcoord(self):
+        """纹理坐标数据"""
+
+        return self.stack_fields(('u', 'v'), ('s', 't'), ('texture_u', 'texture_v'), ('texture_s', 'texture_t'))
 
     @property
     def intensity(self):
         """强度数据"""
 
-        if 'intensity' in self.raw:
-            return self.raw['intensity']
-        elif 'Intensity' in self.raw:
-            return self.raw['Intensity']
-        elif 'i' in self.raw:
-            return self.raw['i']
+        return self.stack_fields(('intensity',), ('Intensity',), ('i',))
+
+    @property
+    def classification(self):
+        """分类数据（仅las文件）"""
+
+        return self.stack_fields(('classification',))
+
+    @property
+    def return_number(self):
+        """回波次序数据（仅las文件）"""
+
+        return self.stack_fields(('return_number',))
+
+    @property
+    def count(self):
+        """点的数量"""
+
+        for key in self.raw:
+            if isinstance(self.raw[key], np.ndarray):
+                return self.raw[key].shape[0]
+
+        return 0
+
+    def take(self, rows):
+        """返回只包含指定行的PointCloudData实例，rows为切片（共享原始数据视图）或行序号数组（只读取这些行）"""
+
+        part = PointCloudData.__new__(PointCloudData)
+        part.__dict__.update(self.__dict__)
+        part.raw = {key: self.raw[key][rows] if isinstance(self.raw[key], np.ndarray) else self.raw[key] for key in self.raw}
+        part.cache = dict()
+        part.indices = None
+
+        return part
+
+    def chunks(self, size):
+        """按行分块迭代，每块为共享原始数据视图的PointCloudData实例，用于逐块处理超出内存的大文件"""
+
+        for start in range(0, self.count, size):
+            yield self.take(slice(start, start+size))
+
+    def stack_fields(self, *candidates):
+        """按候选字段名组的顺序，返回第一组全部存在的字段合并成的数组（单个字段时为一维数组），结果缓存在实例中"""
+
+        for keys in candidates:
+            if all([key in self.raw for key in keys]):
+                break
         else:
             return None
 
+        if keys not in self.cache:
+            if len(keys) == 1:
+                data = np.ascontiguousarray(self.raw[keys[0]])
+            else:
+                data = np.stack([self.raw[key] for key in keys], axis=1)
+
+            if not data.dtype.isnative:
+                data = data.astype(data.dtype.newbyteorder('='))
+
+            self.cache.update({keys: data})
+
+        return self.cache[keys]
+
+    def add_fields(self, columns, sliced=False):
+        """将(字段名, 数据)序列按subset和rows的限定存入raw，sliced为True表示数据已按rows截取"""
+
+        for key, data in columns:
+            if self.subset is None or key in self.subset:
+                self.raw.update({key: data if sliced else data[self.rows]})
+
+    def map_data(self, pcfile, fp, dtype, count):
+        """将文件当前位置开始的count个结构化数据映射为只读的内存映射数组，文件指针移到数据之后"""
+
+        offset = fp.tell()
+        if os.path.getsize(pcfile) < offset + count * dtype.itemsize:
+            raise ValueError('数据长度不足')
+
+        fp.seek(count * dtype.itemsize, 1)
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+
+        return np.memmap(pcfile, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def read_ascii(self, text, count, dtypes):
+        """分块解析count行文本数值数据，返回按rows限定的范围预先分配并逐块填充的各列数组
+
+        text        - TextBlocks实例
+        count       - 数据行数
+        dtypes      - 各列的数据类型，每行的前len(dtypes)个数值依次存入各列
+        """
+
+        start, stop, _ = self.rows.indices(count)
+        stop = max(start, stop)
+        width = len(dtypes)
+        columns = [np.empty(stop - start, dtype=dtype) for dtype in dtypes]
+
+        for block, n in text.read(start): # 跳过范围之前的行
+            pass
+
+        i = 0
+        for block, n in text.read(stop - start):
+            v = self._parse_block(block, n, width)
+            for k, column in enumerate(columns):
+                column[i:i+v.shape[0]] = v[:,k]
+            i += v.shape[0]
+
+        for block, n in text.read(count - stop):
+            pass
+
+        return [column[:i] for column in columns] # 空行不计入数据
+
+    def _parse_block(self, block, n, width):
+        """解析n行文本数值数据，返回各行前width个数值组成的数组
+
+        各行数值个数相同时整块一次性解析，否则（含空行、各行长短不一或有非数值内容）逐行解析，每行多出的数值被忽略
+        """
+
+        cols = len(block[:block.find(b'\n')].split())
+        if cols >= width:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', DeprecationWarning) # 遇到无法解析的内容时，np.fromstring只发出警告并返回已解析的部分
+                try:
+                    v = np.fromstring(block, dtype=np.float64, sep=' ')
+                except (DeprecationWarning, ValueError):
+                    v = None
+
+            if not v is None and v.size == n * cols:
+                return v.reshape(n, cols)[:,:width]
+
+        return np.loadtxt(block.splitlines(), dtype=np.float64, usecols=range(width), ndmin=2)
+
     def lzf_decompress(self, content, olen):
         """LZF解压缩算法，content为压缩内容，olen为解压后的期望长度"""
 
-        iidx, out = 0, list()
-        while iidx < len(content):
-            c = content[iidx]
+        src, out = memoryview(content), bytearray(olen)
+        iidx, oidx, ilen = 0, 0, len(content)
+
+        while iidx < ilen:
+            c = src[iidx]
             iidx += 1
 
-            if c < 32:
+            if c < 32: # 字面量：整段复制
                 c += 1
-                if len(out) + c > olen:
-                    break 
-                
-                for i in range(c):
-                    out.append(content[iidx:iidx+1])
-                    iidx += 1
-            else:
+                if oidx + c > olen or iidx + c > ilen:
+                    break
+
+                out[oidx:oidx+c] = src[iidx:iidx+c]
+                iidx += c
+                oidx += c
+            else: # 回溯引用：源区间与目标区间重叠时按周期重复
                 k = c >> 5
                 if k == 7:
-                    k += content[iidx]
+                    k += src[iidx]
                     iidx += 1
-                
-                if (len(out) + k + 2 > olen):
+
+                k += 2
+                if oidx + k > olen:
                     break
-                
-                rf = len(out) - ((c & 0x1f) << 8) - 1 - content[iidx]
+
+                rf = oidx - ((c & 0x1f) << 8) - 1 - src[iidx]
                 iidx += 1
 
                 if rf < 0:
                     break
-                
-                out.append(out[rf])
-                rf += 1
-                out.append(out[rf])
-                rf += 1
 
-                for i in range(k):
-                    out.append(out[rf])
-                    rf += 1
+                if rf + k <= oidx:
+                    out[oidx:oidx+k] = out[rf:rf+k]
+                else:
+                    d = oidx - rf
+                    out[oidx:oidx+k] = (out[rf:oidx] * (k//d + 1))[:k]
+                oidx += k
+
+        del out[oidx:]
+        return out
+
+    def read_ply_header(self, fp):
+        """解析ply文件头，返回编码方式和元素列表
+
+        元素为(元素名, 元素数量, 属性列表)组成的元组，属性为(属性名, 数据类型, 列表长度的数据类型)组成的元组，
+        数据类型为numpy类型字符串，非列表属性的列表长度数据类型为None。解析失败返回None
+        """
+
+        line = fp.readline().decode().strip()
+        if line != 'ply':
+            self.ok = False
+            self.info = '错误：不合规范的PLY文件'
+            return None
+
+        encoding, elements = None, list()
+        while True:
+            line = fp.readline()
+            if not line:
+                self.ok = False
+                self.info = '错误：文件头缺项'
+                return None
+
+            pieces = line.decode().strip().split()
+            if not pieces or pieces[0] in ('comment', 'obj_info'):
+                continue
+            elif pieces[0] == 'format':
+                encoding = pieces[1]
+            elif pieces[0] == 'element':
+                elements.append((pieces[1], int(pieces[2]), list()))
+            elif pieces[0] == 'property' and elements:
+                if pieces[1] == 'list':
+                    types, name = pieces[2:4], pieces[4]
+                else:
+                    types, name = pieces[1:2], pieces[2]
+
+                types = [PLY_TYPES.get(item.lower()) for item in types]
+                if None in types:
+                    self.ok = False
+                    self.info = '错误：未识别的数据类型或长度'
+                    return None
+
+                elements[-1][2].append((name, types[-1], types[0] if len(types) > 1 else None))
+            elif pieces[0] == 'end_header':
+                break
+            else:
+                self.ok = False
+                self.info = '错误：文件头包含未识别的信息'
+                return None
+
+        if encoding not in ('ascii', 'binary_little_endian', 'binary_big_endian'):
+            self.ok = False
+            self.info = '错误：文件头缺项'
+            return None
+
+        return encoding, elements
+
+    def read_ply_lists(self, buf, pos, count, props, byteorder):
+        """解析包含列表属性的二进制ply元素
+
+        buf         - 二进制数据
+        pos         - 元素数据在buf中的起始位置
+        count       - 元素数量
+        props       - 属性列表
+        byteorder   - 字节序：'<'或'>'
+
+        返回由列表属性名和(列表长度数组, 列表项数组)组成的字典，以及元素数据的结束位置
+        """
+
+        # 以第一个元素的列表长度构造定长的结构化数据类型，各元素列表长度均与之相同时一次读入
+        fields, offset = list(), pos
+        for key, dtype, ltype in props:
+            if ltype:
+                k = int(np.frombuffer(buf, byteorder+ltype, 1, offset)[0]) if count else 0
+                fields.extend([('n_'+key, byteorder+ltype), (key, byteorder+dtype, (k,))])
+                offset += np.dtype(ltype).itemsize + k * np.dtype(dtype).itemsize
+            else:
+                fields.append((key, byteorder+dtype))
+                offset += np.dtype(dtype).itemsize
+
+        record = np.dtype(fields)
+        if pos + count * record.itemsize <= len(buf):
+            data = np.frombuffer(buf, record, count, pos)
+            lists = dict()
+            for key, dtype, ltype in props:
+                if ltype and (data['n_'+key] == data[key].shape[1]).all():
+                    lists.update({key: (np.full(count, data[key].shape[1]), data[key].ravel())})
+
+            if len(lists) == len([item for item in props if item[2]]):
+                return lists, pos + count * record.itemsize
+
+        # 变长列表：元素的起点取决于之前全部元素的列表长度。以数据中的每个字节位置为假想的起点，按各属性推算元素的结束位置，
+        # 超出数据范围的记为end+1；再倍增跳转，以8个元素为跨度定位各段的起点，由各段起点向后推算出全部元素的起点
+        end = max(len(buf) - pos, 0)
+        itype = np.int32 if end < 2**26 else np.int64
+        b = np.zeros(end + 16, dtype=np.uint8)
+        b[:end] = np.frombuffer(buf, dtype=np.uint8)[pos:]
+
+        def walk(p, found=None):
+            """返回以p为起点的元素的结束位置，found不为None时存入各列表属性的(列表项起点, 列表长度)"""
+
+            for key, dtype, ltype in props:
+                if ltype:
+                    n = np.ndarray((end+2,), dtype=byteorder+ltype, buffer=b, strides=(1,))[p].astype(itype)
+                    n[(n < 0) | (n > end)] = end + 1
+                    if not found is None:
+                        found.update({key: (p + np.dtype(ltype).itemsize, n)})
+                    p = p + np.dtype(ltype).itemsize + n * np.dtype(dtype).itemsize
+                else:
+                    p = p + np.dtype(dtype).itemsize
+                p = np.minimum(p, end + 1)
+
+            return p
+
+        step = walk(np.arange(end+2, dtype=itype))
+        jump = step
+        for i in range(3):
+            jump = jump[jump]
+
+        heads, p = list(), 0
+        for i in range((count + 7) // 8):
+            heads.append(p)
+            p = jump[p]
+
+        starts = [np.array(heads, dtype=itype)]
+        for i in range(7):
+            starts.append(step[starts[-1]])
+        starts = np.stack(starts, axis=1).ravel()[:count]
+
+        found = dict()
+        stop = walk(starts, found)
+        stop = int(stop[-1]) if count else 0
+        if stop > end:
+            raise ValueError('数据长度不足')
+
+        # 按列表长度分组，每组的列表项一次收集
+        lists = dict()
+        for key, dtype, ltype in props:
+            if ltype:
+                first, n = found[key]
+                size, offset = np.dtype(dtype).itemsize, np.cumsum(n) - n
+                v = np.empty(int(n.sum()), dtype=byteorder+dtype)
+                for k in np.unique(n):
+                    rows = np.flatnonzero(n == k)
+                    v[offset[rows,np.newaxis] + np.arange(k)] = b[first[rows,np.newaxis] + np.arange(k*size)].view(byteorder+dtype)
+                lists.update({key: (n.astype(np.int64), v)})
+
+        return lists, pos + stop
+
+    def read_ply_lists_ascii(self, rows, props):
+        """解析包含列表属性的ascii格式ply元素，rows为元素对应的文本行，返回由列表属性名和(列表长度数组, 列表项数组)组成的字典"""
+
+        count = len(rows)
+        tokens = rows[0].split() if count else list()
+        layout, width = list(), 0 # 各属性在第一行中的位置和列表长度
+        for key, dtype, ltype in props:
+            k = (int(tokens[width]) if tokens else 0) if ltype else None
+            layout.append((key, dtype, width, k))
+            width += 1 + (k or 0)
 
-        return b''.join(out)
+        # 各行列表长度均与第一行相同时，全部数值一次转换
+        words = b' '.join(rows).split()
+        if len(words) == count * width:
+            v = np.array(words).astype(np.float64).reshape(count, width)
+            if all([(v[:,i] == k).all() for key, dtype, i, k in layout if not k is None]):
+                return dict([(key, (np.full(count, k), v[:,i+1:i+1+k].astype(dtype).ravel())) for key, dtype, i, k in layout if not k is None])
+
+        # 各行列表长度不同时：全部数值仍一次转换，由各行数值个数求出各行在数值序列中的起点，再逐个属性推算列表的位置
+        text = b'\n'.join(rows)
+        v = np.array(words).astype(np.float64)
+        c = np.frombuffer(text, dtype=np.uint8)
+        space = (c == 32) | ((c >= 9) & (c <= 13))
+        head = np.flatnonzero(~space & np.hstack((True, space[:-1]))) # 各数值的首字节位置
+        width = np.bincount(np.cumsum(c == 10)[head], minlength=count)
+        p = np.cumsum(width) - width
+        stop = p + width
+
+        lists = dict()
+        for key, dtype, ltype in props:
+            if ltype:
+                if (p >= stop).any():
+                    raise ValueError('数据长度不足')
+
+                n = v[p]
+                if (n < 0).any() or (n != np.floor(n)).any():
+                    raise ValueError('列表长度无效')
+
+                n = n.astype(np.int64)
+                item = np.repeat(p + 1, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+                p = p + 1 + n
+                if (p > stop).any():
+                    raise ValueError('数据长度不足')
+
+                lists.update({key: (n, v[item].astype(dtype))})
+            else:
+                p = p + 1
+
+        return lists
 
     def open_ply(self, pcfile):
-        """读ply格式的点云文件"""
+        """读ply格式的点云或网格文件"""
 
         with open(pcfile, 'rb') as fp:
-            line = fp.readline().decode().strip()
-            if line != 'ply':
+            header = self.read_ply_header(fp)
+            if header is None:
+                return
+
+            encoding, elements = header
+            vertex = [item for item in elements if item[0] == 'vertex']
+            if not vertex or not vertex[0][2] or any([ltype for name, dtype, ltype in vertex[0][2]]):
                 self.ok = False
-                self.info = '错误：不合规范的PLY文件'
+                self.info = '错误：文件头缺项'
                 return
 
-            bin_type = {
-                'float32':  ('f', 4, np.float32),       'float':    ('f', 4, np.float32),
-                'float64':  ('d', 8, np.float64),       'double':   ('d', 8, np.float64),
-                'int8':     ('b', 1, np.int8),          'char':     ('b', 1, np.int8),
-                'int16':    ('h', 2, np.int16),         'short':    ('h', 2, np.int16),
-                'int32':    ('i', 4, np.int32),         'int':      ('i', 4, np.int32),
-                'uint8':    ('B', 1, np.uint8),         'uchar':    ('B', 1, np.uint8),
-                'uint16':   ('H', 2, np.uint16),        'ushort':   ('H', 2, np.uint16),
-                'uint32':   ('I', 4, np.uint32),        'uint':     ('I', 4, np.uint32)
-            }
+            total = vertex[0][1]
+            byteorder = '<' if encoding == 'binary_little_endian' else '>'
+            text = TextBlocks(fp) if encoding == 'ascii' else None
+            buf, pos = None, 0
 
-            is_vertex, total, encoding, fields, otypes, nb = False, None, None, list(), list(), 0
-            while True:
-                pieces = fp.readline().decode().strip().split()
-                if pieces[0] == 'format':
-                    encoding = pieces[1]
-                    if encoding != 'ascii':
-                        sbin = '<' if encoding=='binary_little_endian' else '>'
-                elif pieces[0] == 'element':
-                    if pieces[1] == 'vertex':
-                        is_vertex = True
-                        total = int(pieces[2])
-                    else:
-                        is_vertex = False
-                elif pieces[0] == 'property':
-                    if is_vertex:
-                        fields.append(pieces[2])
-                        dtype = pieces[1].lower()
-                        if dtype in bin_type:
-                            otypes.append(bin_type[dtype][2])
-                            if encoding != 'ascii':
-                                nb +=  bin_type[dtype][1]
-                                sbin += bin_type[dtype][0]
+            try:
+                for name, count, props in elements:
+                    is_list = any([ltype for _, _, ltype in props])
+
+                    if encoding == 'ascii':
+                        if name == 'vertex':
+                            columns = self.read_ascii(text, count, [dtype for _, dtype, _ in props])
+                            self.add_fields([(key, data) for (key, _, _), data in zip(props, columns)], sliced=True)
+                        elif name == 'face' and is_list:
+                            rows = [line for block, n in text.read(count) for line in block.splitlines()]
+                            self.set_faces(self.read_ply_lists_ascii(rows, props), props, total)
                         else:
-                            self.ok = False
-                            self.info = '错误：未识别的数据类型或长度'
-                            return
-                elif pieces[0] == 'end_header':
-                    break
-                elif pieces[0] == 'comment':
-                    continue
-                else:
-                    self.ok = False
-                    self.info = '错误：文件头包含未识别的信息'
-                    return
+                            for block, n in text.read(count):
+                                pass
+                        continue
+
+                    # 二进制数据按文件头构造结构化数据类型，映射为内存映射数组，各字段为按需读盘的视图；不需要的元素按声明的长度跳过
+                    if is_list:
+                        if buf is None:
+                            buf = fp.read()
 
-            if len(fields) == 0 or len(otypes) != len(fields) or total is None or encoding is None:
+                        lists, pos = self.read_ply_lists(buf, pos, count, props, byteorder)
+                        if name == 'face':
+                            self.set_faces(lists, props, total)
+                        continue
+
+                    dtype = np.dtype([(key, byteorder+dtype) for key, dtype, _ in props])
+                    if name == 'vertex':
+                        if buf is None:
+                            data = self.map_data(pcfile, fp, dtype, count)
+                        else:
+                            data = np.frombuffer(buf, dtype, count, pos)
+                            pos += count * dtype.itemsize
+
+                        self.add_fields([(key, data[key]) for key in dtype.names])
+                    elif buf is None:
+                        fp.seek(count*dtype.itemsize, 1)
+                    else:
+                        pos += count * dtype.itemsize
+            except:
                 self.ok = False
-                self.info = '错误：文件头缺项'
-                return
+                self.info = '错误：解析二进制数据出现意外' if encoding != 'ascii' else '错误：解析文本数据出现意外'
 
-            if encoding == 'ascii':
-                v = np.array([list(map(float, line.decode().strip().split())) for line in fp.readlines()[:total]], dtype=np.float64)
-            else:
-                try:
-                    v = np.array(list(struct.iter_unpack(sbin, fp.read(total*nb))), dtype=np.float64)
-                except:
-                    self.ok = False
-                    self.info = '错误：解析二进制数据出现意外'
-                    return
- 
-        for i in range(len(fields)):
-            key, otype = fields[i], otypes[i]
-            self.raw.update({key: otype(v[:,i])})
+    def set_faces(self, lists, props, total):
+        """由face元素的顶点索引列表生成三角面的顶点索引，多边形以扇形剖分为三角形"""
+
+        keys = [key for key, dtype, ltype in props if ltype]
+        key = 'vertex_indices' if 'vertex_indices' in keys else ('vertex_index' if 'vertex_index' in keys else keys[0])
+        n, v = lists[key]
+
+        self.set_triangles(self.triangulate(n, v.astype(np.int64)), total)
+
+    def triangulate(self, n, v):
+        """多边形以扇形剖分为三角形，n为各多边形的顶点数量，v为依次排列的各多边形的顶点索引，返回shape=(m,3)的顶点索引"""
+
+        m = np.maximum(n - 2, 0) # 每个多边形剖分出的三角形数量
+        face = np.repeat(np.arange(n.shape[0]), m)
+        first = (np.cumsum(n) - n)[face]
+        j = np.arange(m.sum()) - np.repeat(np.cumsum(m) - m, m) + 1
+
+        return np.stack((v[first], v[first+j], v[first+j+1]), axis=1)
+
+    def set_triangles(self, indices, total):
+        """检查三角面的顶点索引并按rows的限定截取，存为int32的一维数组，total为文件中的顶点总数"""
+
+        if indices.size and (indices.min() < 0 or indices.max() >= total):
+            raise ValueError('顶点索引越界')
+
+        # 只读取部分行时，丢弃引用了范围外顶点的三角面，其余顶点索引平移到新的编号
+        start, stop, step = self.rows.indices(total)
+        if (start, stop, step) != (0, total, 1):
+            if step != 1:
+                raise ValueError('读取网格时行范围的步长须为1')
+
+            indices = indices[((indices >= start) & (indices < stop)).all(axis=1)] - start
+
+        self.indices = np.int32(indices.ravel())
+
+    def weld(self, keys):
+        """按非负整数键值合并重复项，返回各组代表项的序号和各项所属的组号
+
+        键值范围较小时以查找表按键值顺序编号，否则排序后按各组首次出现的先后编号
+        """
+
+        if keys.shape[0] > 0 and keys.max() < 4 * keys.shape[0]:
+            table = np.zeros(int(keys.max()) + 1, dtype=np.int64)
+            table[keys] = np.arange(keys.shape[0])
+            used = np.zeros(table.shape[0], dtype=bool)
+            used[keys] = True
+            ids = np.cumsum(used) - 1
+
+            return table[used], ids[keys]
+
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        flag = np.hstack((True, sorted_keys[1:] != sorted_keys[:-1]))
+        first = np.minimum.reduceat(order, np.flatnonzero(flag))
+
+        rank = np.argsort(first)
+        remap = np.empty_like(rank)
+        remap[rank] = np.arange(rank.shape[0])
+        inverse = np.empty(keys.shape[0], dtype=np.int64)
+        inverse[order] = remap[np.cumsum(flag) - 1]
+
+        return first[rank], inverse
 
     def open_pcd(self, pcfile):
         """读pcd格式的点云文件"""
@@ -248,30 +733,35 @@ class PointCloudData:
                 return
 
             bin_type = {
-                '4F':   ('f', np.float32),
-                '8F':   ('d', np.float64),
-                '1I':   ('b', np.int8),
-                '2I':   ('h', np.int16),
-                '4I':   ('i', np.int32),
-                '1U':   ('B', np.uint8),
-                '2U':   ('H', np.uint16),
-                '4U':   ('I', np.uint32)
+                '4F':   np.float32,
+                '8F':   np.float64,
+                '1I':   np.int8,
+                '2I':   np.int16,
+                '4I':   np.int32,
+                '1U':   np.uint8,
+                '2U':   np.uint16,
+                '4U':   np.uint32
             }
 
-            sbin, nb, otypes = '', list(), list()
+            nb, otypes = list(), list()
             for s, t in zip(sizes, types):
                 nb.append(int(s))
                 st = s + t
                 if st in bin_type:
-                    sbin += bin_type[st][0]
-                    otypes.append(bin_type[st][1])
+                    otypes.append(bin_type[st])
                 else:
                     self.ok = False
                     self.info = '错误：未识别的数据类型或长度'
                     return
 
             if encoding == 'ascii':
-                v = np.array([list(map(float, line.decode().strip().split())) for line in fp.readlines()[:total]], dtype=np.float64)
+                try:
+                    columns = self.read_ascii(TextBlocks(fp), total, otypes)
+                    self.add_fields(zip(fields, columns), sliced=True)
+                except:
+                    self.ok = False
+                    self.info = '错误：解析文本数据出现意外'
+                    return
             elif encoding == 'binary_compressed':
                 try:
                     len_0, len_1 = struct.unpack('II', fp.read(8))
@@ -280,25 +770,290 @@ class PointCloudData:
                     else:
                         content = self.lzf_decompress(fp.read()[:len_0], len_1)
                     
-                    start, v = 0, list()
-                    for s, n in zip(sbin, nb):
-                        end = start + total*n
-                        v.append(np.array(list(struct.iter_unpack(s, content[start:end])), dtype=np.float64))
-                        start = end
-                    v = np.stack(v, axis=0).transpose()[0]
+                    # 压缩数据按字段分列存储，每列直接映射为对应类型的数组
+                    start, columns = 0, list()
+                    for key, otype, n in zip(fields, otypes, nb):
+                        columns.append((key, np.frombuffer(content, dtype=otype, count=total, offset=start)))
+                        start += total*n
+
+                    self.add_fields(columns)
                 except:
                     self.ok = False
                     self.info = '错误：解析二进制数据出现意外'
                     return
             else:
+                # 按行存储的二进制数据映射为结构化的内存映射数组，重名字段（如填充字段）以最后一个为准
+                offsets, offset = dict(), 0
+                for key, otype, n in zip(fields, otypes, nb):
+                    offsets.update({key: (np.dtype(otype).newbyteorder('<'), offset)})
+                    offset += n
+
+                dtype = np.dtype({
+                    'names':    list(offsets.keys()),
+                    'formats':  [item[0] for item in offsets.values()],
+                    'offsets':  [item[1] for item in offsets.values()],
+                    'itemsize': offset
+                })
+
                 try:
-                    v = np.array(list(struct.iter_unpack(sbin, fp.read(total*sum(nb)))), dtype=np.float64)
+                    data = self.map_data(pcfile, fp, dtype, total)
+                    self.add_fields([(key, data[key]) for key in dtype.names])
                 except:
                     self.ok = False
                     self.info = '错误：解析二进制数据出现意外'
                     return
-            
-        for i in range(len(fields)):
-            key, otype = fields[i], otypes[i]
-            self.raw.update({key: otype(v[:,i])})
 
+    def open_las(self, pcfile):
+        """读las格式（非压缩）的点云文件"""
+
+        with open(pcfile, 'rb') as fp:
+            header = fp.read(375)
+            if len(header) < 227 or header[:4] != b'LASF':
+                self.ok = False
+                self.info = '错误：不合规范的LAS文件'
+                return
+
+            major, minor = struct.unpack_from('<BB', header, 24)
+            offset, = struct.unpack_from('<I', header, 96)
+            fmt, reclen, total = struct.unpack_from('<BHI', header, 104)
+            scale = struct.unpack_from('<3d', header, 131)
+            origin = struct.unpack_from('<3d', header, 155)
+            if total == 0 and (major, minor) >= (1, 4) and len(header) >= 255:
+                total, = struct.unpack_from('<Q', header, 247)
+
+            self.raw.update({'version': '%d.%d'%(major, minor)})
+            if fmt not in LAS_FORMATS:
+                self.ok = False
+                self.info = '错误：不支持的点数据格式：%d'%fmt
+                return
+
+            # 点数据记录可能带有额外字节，结构化数据类型的长度取文件头声明的记录长度
+            names, formats, offsets, pos = list(), list(), list(), 0
+            for key, dtype in LAS_FORMATS[fmt]:
+                names.append(key)
+                formats.append(dtype)
+                offsets.append(pos)
+                pos += np.dtype(dtype).itemsize
+
+            if pos > reclen:
+                self.ok = False
+                self.info = '错误：点数据记录长度不足'
+                return
+
+            dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': reclen})
+
+            try:
+                fp.seek(offset)
+                data = self.map_data(pcfile, fp, dtype, total)
+            except:
+                self.ok = False
+                self.info = '错误：解析二进制数据出现意外'
+                return
+
+        self.scale = np.array(scale, dtype=np.float64)
+        self.origin = np.array(origin, dtype=np.float64)
+
+        # 位域字节不直接存入raw，由其导出回波次序、回波数量，以及格式0~3的分类
+        self.add_fields([(key, data[key]) for key in names if key not in ('flags', 'returns', 'classification')])
+        if fmt < 6:
+            bits, mask, shift = data['flags'], 0x07, 3
+            derived = [('classification', lambda: data['classification'][self.rows] & 0x1f)]
+        else:
+            bits, mask, shift = data['returns'], 0x0f, 4
+            derived = [('classification', lambda: data['classification'][self.rows])]
+
+        derived.append(('return_number', lambda: bits[self.rows] & mask))
+        derived.append(('number_of_returns', lambda: (bits[self.rows] >> shift) & mask))
+        for key, func in derived:
+            if self.subset is None or key in self.subset:
+                self.raw.update({key: func()})
+
+    def open_stl(self, pcfile):
+        """读stl格式（二进制或ascii）的网格文件，位置相同的顶点合并为一个顶点"""
+
+        size = os.path.getsize(pcfile)
+        with open(pcfile, 'rb') as fp:
+            head = fp.read(84)
+            count = struct.unpack_from('<I', head, 80)[0] if len(head) == 84 else -1
+
+            try:
+                if size == 84 + 50 * count: # ascii文件也可能以solid开头，以文件长度区分
+                    dtype = np.dtype([('normal', '<f4', 3), ('vertex', '<f4', (3,3)), ('attr', '<u2')])
+                    vs = self.map_data(pcfile, fp, dtype, count)['vertex'].reshape(-1, 3)
+                else:
+                    fp.seek(0)
+                    words = np.array(fp.read().split())
+                    pos = np.flatnonzero(words == b'vertex')
+                    vs = words[pos[:,None] + np.arange(1, 4)].astype(np.float32)
+            except:
+                self.ok = False
+                self.info = '错误：解析stl文件出现意外'
+                return
+
+        if vs.shape[0] % 3:
+            self.ok = False
+            self.info = '错误：三角面的顶点数量不完整'
+            return
+
+        # 焊接顶点：以坐标字节内容的64位哈希值为键合并（+0.0使-0.0与0.0的字节相同），哈希冲突时改用逐字节比较
+        vs = np.ascontiguousarray(vs + np.float32(0))
+        b = vs.view(np.uint32).astype(np.uint64)
+        first, inverse = self.weld((b[:,0] * np.uint64(0x9E3779B97F4A7C15)) ^ (b[:,1] * np.uint64(0xC2B2AE3D27D4EB4F)) ^ (b[:,2] * np.uint64(0x165667B19E3779F9)))
+        if not (vs[first][inverse] == vs).all():
+            _, first, inverse = np.unique(vs.view(np.dtype((np.void, 12))).ravel(), return_index=True, return_inverse=True)
+        vs = vs[first]
+
+        try:
+            self.set_triangles(inverse.reshape(-1, 3), vs.shape[0])
+        except ValueError as e:
+            self.ok = False
+            self.info = '错误：%s'%e
+            return
+
+        self.add_fields([('x', vs[:,0]), ('y', vs[:,1]), ('z', vs[:,2])])
+
+    def open_obj(self, pcfile):
+        """读obj格式的网格文件，支持v、vt、vn和f，多边形以扇形剖分为三角形，材质、分组和线、点元素被忽略"""
+
+        with open(pcfile, 'rb') as fp:
+            buf = fp.read()
+
+        # 各行#之后的注释以字节掩码一次替换为空格，再由各行去掉行首空白后的前三个字符识别元素类型，只有v、vt、vn和f行参与解析
+        c = np.frombuffer(buf + b'\n   ', dtype=np.uint8)
+        ends = np.flatnonzero(c[:len(buf)+1] == 10) # 各行换行符的位置
+        sep = lambda a: (a == 32) | (a == 9)
+
+        hashes = np.flatnonzero(c == 35)
+        if hashes.shape[0] > 0:
+            heads = np.hstack((0, ends[:-1] + 1))
+            first = hashes[np.minimum(np.searchsorted(hashes, heads), hashes.shape[0]-1)] # 各行的第一个#
+            comment = (first >= heads) & (first < ends)
+            mask = np.zeros(c.shape[0] + 1, dtype=np.int8)
+            mask[first[comment]] = 1
+            mask[ends[comment]] = -1
+            c = c.copy()
+            c[np.cumsum(mask[:-1], dtype=np.int8).view(bool)] = 32
+
+        starts = np.hstack((0, ends[:-1] + 1))
+        lead = np.flatnonzero(sep(c[starts])) # 以空白开头的行逐字符后移至第一个非空白字符
+        while lead.shape[0] > 0:
+            starts[lead] += 1
+            lead = lead[sep(c[starts[lead]])]
+        c0, c1, c2 = c[starts], c[starts+1], c[starts+2]
+
+        kinds = (
+            ((c0 == ord('v')) & sep(c1), 2),
+            ((c0 == ord('v')) & (c1 == ord('t')) & sep(c2), 3),
+            ((c0 == ord('v')) & (c1 == ord('n')) & sep(c2), 3),
+            ((c0 == ord('f')) & sep(c1), 2)
+        )
+
+        def text(kind, skip):
+            """返回同类各行去掉行首标识后的文本（保留换行符）及行数，以字节掩码一次截取，不逐行切分"""
+
+            rows = np.flatnonzero(kind)
+            if rows.shape[0] == 0:
+                return b'', 0
+
+            a, b = starts[rows[0]], ends[rows[-1]] + 1 # 同类各行通常集中在一起，掩码只覆盖其所在的范围
+            mask = np.zeros(b - a + 1, dtype=np.int8)
+            mask[starts[rows] + skip - a] = 1
+            mask[ends[rows] + 1 - a] = -1
+
+            return c[a:b][np.cumsum(mask[:-1], dtype=np.int8).view(bool)].tobytes(), rows.shape[0]
+
+        pos = [np.flatnonzero(kind) for kind, skip in kinds]
+        (v, nv), (vt, nvt), (vn, nvn), (f, nf) = [text(kind, skip) for kind, skip in kinds]
+
+        if nv == 0 or nf == 0:
+            self.ok = False
+            self.info = '错误：文件不包含顶点或面数据'
+            return
+
+        def floats(text, rows):
+            """各行数值一次转换为shape=(行数,每行数值数量)的数组，各行数值数量不同时逐行转换并截取最短的长度"""
+
+            k = len(text[:text.index(b'\n')].split())
+            a = np.fromstring(text, dtype=np.float64, sep=' ')
+            if a.size == k * rows:
+                return a.reshape(rows, k)
+
+            lines = [line.split() for line in text.splitlines()]
+            k = min([len(words) for words in lines])
+            return np.array([words[:k] for words in lines], dtype=np.float64)
+
+        try:
+            v = floats(v, nv)
+            vt = floats(vt, nvt) if nvt else np.zeros((0, 2))
+            vn = floats(vn, nvn) if nvn else np.zeros((0, 3))
+
+            # 面的各个角点形如a、a/b、a//c或a/b/c，缺项以0占位：a//c补为a/0/c，斜杠少于其他角点的角点在末尾补/0，
+            # 统一为同样多的项后全部数值一次转换，再换算为从0开始的索引，缺项为-1
+            a = np.frombuffer(f.replace(b'//', b'/0/'), dtype=np.uint8)
+            filled = a > 32 # 面数据中只有数字、负号、斜杠和空白字符
+            head = np.flatnonzero(filled & np.hstack((True, ~filled[:-1]))) # 各角点的第一个字符
+            if head.shape[0] == 3 * nf: # 全部为三角面
+                n = np.full(nf, 3)
+            else:
+                n = np.diff(np.searchsorted(head, np.flatnonzero(a == 10)), prepend=0) # 各面的角点数量
+            slash = np.flatnonzero(a == 47)
+            k = (f.split(None, 1) or [b''])[0].replace(b'//', b'/0/').count(b'/') + 1 # 第一个角点的项数
+
+            # 每个角点至多2个斜杠：斜杠总数为0或2倍角点数，或者斜杠与角点数量相等且依次交错时，各角点格式相同，否则逐个角点统计斜杠数量
+            same = slash.shape[0] == (k - 1) * head.shape[0]
+            if same and k == 2:
+                same = (slash > head).all() and (slash[:-1] < head[1:]).all()
+
+            if not same:
+                slash = np.bincount(np.searchsorted(head, slash, side='right') - 1, minlength=head.shape[0])
+                k = int(slash.max()) + 1 if slash.shape[0] else 1
+                tail = np.flatnonzero(filled & np.hstack((~filled[1:], True))) + 1 # 各角点最后一个字符之后的位置
+                miss = k - 1 - slash
+                if miss.any():
+                    a = np.insert(a, np.repeat(tail, 2*miss), np.tile(np.frombuffer(b'/0', dtype=np.uint8), int(miss.sum())))
+
+            corners = np.fromstring(a.tobytes().replace(b'/', b' '), dtype=np.int64, sep=' ')
+
+            if corners.size != n.sum() * k:
+                raise ValueError('面的角点格式不一致')
+
+            corners = corners.reshape(-1, k)
+            if (corners < 0).any(): # 负数索引相对于此前已定义的元素数量
+                base = np.stack([np.searchsorted(p, pos[3]) for p in pos[:k]], axis=1)
+                corners = np.where(corners < 0, np.repeat(base, n, axis=0) + corners + 1, corners)
+            corners -= 1
+
+            if (corners[:,0] < 0).any() or any([(corners[:,i] >= items.shape[0]).any() for i, items in enumerate((v, vt, vn)[:k])]):
+                raise ValueError('角点索引越界')
+
+            # 顶点、纹理坐标和法向量的索引组合各不相同的角点展开为独立的顶点
+            if k > 1 and (corners[:,1:] >= 0).any():
+                corners = np.hstack((corners, np.full((corners.shape[0], 3-k), -1, dtype=np.int64)))
+                sizes = (v.shape[0], vt.shape[0] + 1, vn.shape[0] + 1)
+                if np.prod(sizes, dtype=np.float64) < 2**62:
+                    first, inverse = self.weld((corners[:,0] * sizes[1] + corners[:,1] + 1) * sizes[2] + corners[:,2] + 1)
+                else:
+                    _, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+
+                corners = corners[first]
+                v = v[corners[:,0]]
+                vt = np.vstack((vt[:,:2], np.zeros((1, 2))))[corners[:,1]] if (corners[:,1] >= 0).any() else None # 缺项取最后一行的0
+                vn = np.vstack((vn[:,:3], np.zeros((1, 3))))[corners[:,2]] if (corners[:,2] >= 0).any() else None
+            else:
+                inverse, vt, vn = corners[:,0], None, None
+
+            self.set_triangles(self.triangulate(n, inverse.ravel()), v.shape[0])
+        except:
+            self.ok = False
+            self.info = '错误：解析obj文件出现意外'
+            return
+
+        columns = [('x', v[:,0]), ('y', v[:,1]), ('z', v[:,2])]
+        if v.shape[1] >= 6: # 顶点颜色扩展：v x y z r g b
+            columns.extend([('red', v[:,3]), ('green', v[:,4]), ('blue', v[:,5])])
+        if not vt is None:
+            columns.extend([('u', vt[:,0]), ('v', vt[:,1])])
+        if not vn is None:
+            columns.extend([('nx', vn[:,0]), ('ny', vn[:,1]), ('nz', vn[:,2])])
+
+        self.add_fields([(key, np.float32(data)) for key, data in columns])
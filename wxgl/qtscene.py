@@ -154,5 +154,6 @@ class QtScene(BaseScene, QOpenGLWidget):
     def clear_buffer(self):
         """删除纹理、顶点缓冲区等对象"""
 
+        self.makeCurrent()
         self._clear_buffer()
 
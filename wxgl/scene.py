@@ -14,14 +14,19 @@ class BaseScene:
     _DIST = 6.0
     _NEAR = 3.0
     _FAR = 1000.0
+    _LOD_ERROR = 1.0                                                    # 细节层次允许的最大屏幕空间误差（像素）
+    _LOD_HYSTERESIS = 0.6                                               # 切换到低精度层次时的误差折减系数，避免反复切换
 
     def __init__(self, scheme, **kwds):
         """构造函数"""
         
         self.scheme = scheme                                            # 展示方案
         self.viewport = [None, None, None]                              # 主视区、标题区、调色板区视口
-        self.mns = [[[],[]], [[],[]], [[],[]]]                          # 主视区、标题区、调色板区不透明/透明模型名列表
+        self.mns = [[[],[],[]], [[],[],[]], [[],[],[]]]                 # 主视区、标题区、调色板区不透明/透明（深度升序）/透明（深度降序）模型名列表
         self.selected = list()                                          # 选中的模型
+        self.transforms = dict()                                        # 变换函数及其编译后的模型几何变换
+        self.lods = list()                                              # 具有多个细节层次的模型
+        self.streams = list()                                           # 流式加载顶点数据的模型
 
         self.csize = kwds.get('size', (960, 640))                       # 画布分辨率
         self.bg = util.format_color(kwds.get('bg', [0.0, 0.0, 0.0]))    # 背景色
@@ -188,6 +193,15 @@ class BaseScene:
                 self._update_cam_and_up(azim=v.get('azim'), elev=v.get('elev'), dist=v.get('dist'))
                 self._update_view_matrix()
 
+        if self.scheme.pending:
+            self._update_pending()
+
+        for m in self.lods:
+            self._update_lod(m)
+
+        for m in self.streams:
+            self._update_stream(m)
+
         for i in range(3):
             if self.scheme.models[i]:
                 glViewport(*self.viewport[i])
@@ -199,7 +213,7 @@ class BaseScene:
                     for mid, depth in self.mns[i][1]:
                         self._render(self.scheme.models[i][mid])
                 else:
-                    for mid, depth in self.mns[i][1][::-1]:
+                    for mid, depth in self.mns[i][2]:
                         self._render(self.scheme.models[i][mid])
                 glDepthMask(True) # 释放深度缓冲区
 
@@ -336,61 +350,107 @@ class BaseScene:
             if 'axes' in self.scheme.expost:
                 self.scheme._axes()
 
+        self.transforms = dict()
+        self.lods = list()
+        self.streams = list()
         for i in range(3):
             for mid in self.scheme.models[i]:
-                m = self.scheme.models[i][mid]
+                self._assemble_model(i, mid, self.scheme.models[i][mid])
 
-                if i == 1 and mid == 'caption_text':
-                    m.attribute['a_Position']['data'][:,0] /= self.viewport[i][2]/self.viewport[i][3]
+            self.mns[i][1].sort(key=lambda item:item[1])
+            self.mns[i][2] = sorted(self.mns[i][1], key=lambda item:-item[1]) # 深度相同的模型（如嵌套的等值面）保持添加顺序
 
-                if i == 2 and mid == 'cb_label':
-                    m.attribute['a_Position']['data'][:,0] /= self.viewport[i][2]/self.viewport[i][3]
+        self._fit_view()
+        self.playing = self.scheme.alive
+        self.origin = {'fovy':self.fovy, 'azim':self.azim, 'elev':self.elev, 'dist':self.dist, 'oecs':self.oecs}
 
-                for src, genre in m.shaders:
-                    m.cshaders.append(shaders.compileShader(src, genre))
- 
-                m.program = shaders.compileProgram(*m.cshaders)
-                glUseProgram(m.program)
+        self._update_cam_and_up()
+        self._update_view_matrix()
+        self._update_proj_matrix()
+        
+        self.start= 1000 * time.time()
+        self.duration = 0
+        self.tbase = 0
+        
+        self.gl_init_done = True
 
-                if m.indices:
-                    m.indices.update({'ibo':vbo.VBO(m.indices['data'], target=GL_ELEMENT_ARRAY_BUFFER)})
+    def _assemble_model(self, i, mid, m):
+        """装配单个模型：编译着色器、创建缓冲区对象和纹理，并加入绘制列表
 
-                for key in m.attribute:
-                    item = m.attribute[key]
-                    item.update({'bo': vbo.VBO(item['data'])})
- 
-                    if 'loc' not in item:
-                        item.update({'loc': glGetAttribLocation(m.program, key)})
- 
-                for key in m.uniform:
-                    item = m.uniform[key]
-                    if item['tag'] == 'texture':
-                        if item['data'].tid is None:
-                            item['data'].create_texture()
-                        item.update({'tid': item['data'].tid})
-                    elif item['tag'] == 'pmat':
-                        if 'v' not in item and 'f' not in item:
-                            item.update({'v': self.pmat})
-                    elif item['tag'] == 'vmat':
-                        if 'v' not in item and 'f' not in item:
-                            item.update({'v': self.vmat})
-                    elif item['tag'] == 'mmat':
-                        if 'v' not in item and 'f' not in item:
-                            item.update({'v': self.mmat})
-                        elif 'v' in item:
-                            item.update({'v': util.model_matrix(*item['v'])})
- 
-                    if 'loc' not in item:
-                        item.update({'loc': glGetUniformLocation(m.program, key)})
- 
-                glUseProgram(0)
+        i           - 视区序号
+        mid         - 模型id
+        m           - 模型
+        """
+
+        if i == 1 and mid == 'caption_text':
+            m.attribute['a_Position']['data'][:,0] /= self.viewport[i][2]/self.viewport[i][3]
+
+        if i == 2 and mid == 'cb_label':
+            m.attribute['a_Position']['data'][:,0] /= self.viewport[i][2]/self.viewport[i][3]
 
-                if m.opacity:
-                    self.mns[i][0].append((mid, m.depth[self.haxis]))
+        for src, genre in m.shaders:
+            m.cshaders.append(shaders.compileShader(src, genre))
+
+        m.program = shaders.compileProgram(*m.cshaders)
+        glUseProgram(m.program)
+
+        for lod in m.lods if m.lods else [{'attribute':m.attribute, 'indices':m.indices}]:
+            if lod['indices']:
+                lod['indices'].update({'ibo':vbo.VBO(lod['indices']['data'], target=GL_ELEMENT_ARRAY_BUFFER)})
+
+            for key in lod['attribute']:
+                item = lod['attribute'][key]
+                if m.stream: # 流式模型按显存池的顶点数分配显存，节点数据由_update_stream逐帧写入，其余逐顶点数据以占位数据填满
+                    n = m.stream.slots * m.stream.capacity
+                    if key in m.stream.fields:
+                        item.update({'bo': vbo.VBO(None, size=n*item['un']*item['usize'])})
+                    else:
+                        item.update({'bo': vbo.VBO(np.repeat(item['data'][:1], n, axis=0))})
                 else:
-                    self.mns[i][1].append((mid, m.depth[self.haxis]))
-            
-            self.mns[i][1].sort(key=lambda item:item[1])
+                    item.update({'bo': vbo.VBO(item['data'])})
+
+                if 'loc' not in item:
+                    item.update({'loc': glGetAttribLocation(m.program, key)})
+
+        if len(m.lods) > 1:
+            self.lods.append(m)
+
+        if m.stream:
+            self.streams.append(m)
+
+        for key in m.uniform:
+            item = m.uniform[key]
+            if item['tag'] == 'texture':
+                item['data'].create_texture()
+                item.update({'tid': item['data'].tid})
+            elif item['tag'] == 'pmat':
+                if 'v' not in item and 'f' not in item:
+                    item.update({'v': self.pmat})
+            elif item['tag'] == 'vmat':
+                if 'v' not in item and 'f' not in item:
+                    item.update({'v': self.vmat})
+            elif item['tag'] == 'mmat':
+                if 'v' not in item and 'f' not in item:
+                    item.update({'v': self.mmat})
+                elif 'v' in item:
+                    item.update({'v': util.model_matrix(*item['v'])})
+                else: # 共用同一变换函数的模型共用编译后的变换，每帧只计算一次
+                    if item['f'] not in self.transforms:
+                        self.transforms.update({item['f']: util.CompiledTransform(item['f'])})
+                    item.update({'c': self.transforms[item['f']]})
+
+            if 'loc' not in item:
+                item.update({'loc': glGetUniformLocation(m.program, key)})
+
+        glUseProgram(0)
+
+        if m.opacity:
+            self.mns[i][0].append((mid, m.depth[self.haxis]))
+        else:
+            self.mns[i][1].append((mid, m.depth[self.haxis]))
+
+    def _fit_view(self):
+        """根据模型空间的范围计算眼睛位置自适应调整系数、相机距离和视点坐标系原点"""
 
         dx = self.scheme.r_x[1]-self.scheme.r_x[0]
         dy = self.scheme.r_y[1]-self.scheme.r_y[0]
@@ -423,22 +483,94 @@ class BaseScene:
             if self.scale * dz > 4:
                 self.scale = 4/dz
 
-        self.playing = self.scheme.alive
         self.dist = self._DIST/self.scale
         self.near = self._NEAR/self.scale
         self.far = self._FAR/self.scale
         self.oecs = [sum(self.scheme.r_x)/2, sum(self.scheme.r_y)/2, sum(self.scheme.r_z)/2]
-        self.origin = {'fovy':self.fovy, 'azim':self.azim, 'elev':self.elev, 'dist':self.dist, 'oecs':self.oecs}
 
-        self._update_cam_and_up()
-        self._update_view_matrix()
-        self._update_proj_matrix()
-        
-        self.start= 1000 * time.time()
-        self.duration = 0
-        self.tbase = 0
-        
-        self.gl_init_done = True
+    def _update_pending(self):
+        """装配后台加载完成的模型，模型空间因此扩大时重新计算相机距离和视点坐标系原点"""
+
+        for future, name in [item for item in self.scheme.pending if item[0].done()]:
+            self.scheme.pending.remove((future, name))
+            if name:
+                self._set_visible(name, False)
+
+            try:
+                sch = future.result()
+            except Exception as e:
+                print('后台加载失败：%s'%e)
+                continue
+
+            r_old = (*self.scheme.r_x, *self.scheme.r_y, *self.scheme.r_z)
+            alive = self.scheme.alive
+
+            for mid in self.scheme._merge(sch):
+                self._assemble_model(0, mid, self.scheme.models[0][mid])
+
+            self.mns[0][1].sort(key=lambda item:item[1])
+            self.mns[0][2] = sorted(self.mns[0][1], key=lambda item:-item[1])
+
+            if self.scheme.alive and not alive:
+                self.playing = True
+
+            if r_old != (*self.scheme.r_x, *self.scheme.r_y, *self.scheme.r_z):
+                self._fit_view()
+                self.origin.update({'dist':self.dist, 'oecs':self.oecs})
+
+                self._update_cam_and_up()
+                self._update_view_matrix()
+                self._update_proj_matrix()
+
+    def _update_lod(self, m):
+        """按几何误差在屏幕上的投影大小选择模型的细节层次"""
+
+        mmat = self.mmat
+        for key in m.uniform:
+            item = m.uniform[key]
+            if item['tag'] == 'mmat':
+                mmat = item['v'] if 'v' in item else item['c'](self.duration)
+
+        center, r = m.bound
+        k = np.sqrt(np.square(mmat[:3,:3]).sum(axis=1).max()) # 模型矩阵的最大缩放系数
+        dist = -np.dot(np.dot(np.append(center, 1), mmat), self.vmat)[2] - r*k # 包围球最近点的深度
+
+        if dist <= self.near:
+            level = 0
+        else:
+            px = k * self.pmat[1,1] * self.viewport[0][3] / (2 * dist) # 模型空间单位长度对应的像素数
+            errors = [lod['error'] * px for lod in m.lods]
+
+            level = m.lod
+            if errors[level] > self._LOD_ERROR:
+                while level > 0 and errors[level] > self._LOD_ERROR:
+                    level -= 1
+            else:
+                while level+1 < len(errors) and errors[level+1] <= self._LOD_ERROR * self._LOD_HYSTERESIS:
+                    level += 1
+
+        if level != m.lod:
+            m.switch_lod(level)
+
+    def _update_stream(self, m):
+        """按当前相机更新流式模型驻留显存的节点，上传新读入的节点数据"""
+
+        mmat = self.mmat
+        for key in m.uniform:
+            item = m.uniform[key]
+            if item['tag'] == 'mmat':
+                mmat = item['v'] if 'v' in item else item['c'](self.duration)
+
+        uploads, m.ranges = m.stream.update(mmat, self.vmat, self.pmat, self.near, self.viewport[0][3])
+
+        # 数据写入显存中以first为起始顶点的位置，其余位置的数据保持不变
+        for first, data in uploads:
+            for key in data:
+                item = m.attribute[key]
+                value = np.ascontiguousarray(data[key], dtype=np.float32)
+                item['bo'].bind()
+                glBufferSubData(GL_ARRAY_BUFFER, first*item['un']*item['usize'], value.nbytes, value)
+                item['bo'].unbind()
 
     def _render(self, m):
         """绘制单个模型"""
@@ -472,9 +604,7 @@ class BaseScene:
                 if 'v' in m.uniform[key]:
                     glUniformMatrix4fv(loc, 1, GL_FALSE, m.uniform[key]['v'], None)
                 else:
-                    args = m.uniform[key]['f'](self.duration)
-                    mmat = util.model_matrix(*args)
-                    glUniformMatrix4fv(loc, 1, GL_FALSE, mmat, None)
+                    glUniformMatrix4fv(loc, 1, GL_FALSE, m.uniform[key]['c'](self.duration), None)
             elif tag == 'texture':
                 eval('glActiveTexture(GL_TEXTURE%d)'%tsid)
                 glBindTexture(m.uniform[key]['data'].ttype, m.uniform[key]['tid'])
@@ -514,6 +644,9 @@ class BaseScene:
             m.indices['ibo'].bind()
             glDrawElements(m.gltype, m.indices['n'], GL_UNSIGNED_INT, None)
             m.indices['ibo'].unbind()
+        elif not m.ranges is None:
+            if m.ranges[1].size:
+                glMultiDrawArrays(m.gltype, m.ranges[0], m.ranges[1], m.ranges[1].size)
         else:
             glDrawArrays(m.gltype, 0, m.vshape[0])
  
@@ -533,20 +666,22 @@ class BaseScene:
                 
                 if m.program:
                     glDeleteProgram(m.program)
+
+                if m.stream:
+                    m.stream.close()
                 
-                if m.indices and 'ibo' in m.indices:
-                    m.indices['ibo'].delete()
+                for lod in m.lods if m.lods else [{'attribute':m.attribute, 'indices':m.indices}]:
+                    if lod['indices'] and 'ibo' in lod['indices']:
+                        lod['indices']['ibo'].delete()
                 
-                for key in m.attribute:
-                    if 'bo' in m.attribute[key]:
-                        m.attribute[key]['bo'].delete()
+                    for key in lod['attribute']:
+                        if 'bo' in lod['attribute'][key]:
+                            lod['attribute'][key]['bo'].delete()
                 
-                textures = list()
-                for key in m.uniform:
-                    if 'texture' in m.uniform[key]:
-                        textures.append(m.attribute[key]['texture'])
-                if textures:
-                    glDeleteTextures(len(textures), textures)
+                for key in m.uniform: # 纹理可能被多个模型共用，最后一个引用释放时才删除
+                    if m.uniform[key]['tag'] == 'texture' and 'tid' in m.uniform[key]:
+                        m.uniform[key]['data'].delete_texture()
+                        del m.uniform[key]['tid']
 
     def _set_visible(self, name, visible):
         """设置部件或模型的可见性
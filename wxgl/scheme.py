@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import uuid
+import numbers
 import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
 from OpenGL.GL import *
 from . texture import Texture
+from . cache import GeometryCache
+from . octree import OctreeStream
+from . stream import ProgressiveStream
 from . import util
 from . light import *
 
 PLATFORM = sys.platform.lower()
+PROGRESSIVE = 2097152                                           # 散列点数量超过此值时逐帧分块上传
 
 class Scheme:
     """应用于三维场景中的展示方案类"""
@@ -25,6 +32,8 @@ class Scheme:
         self.haxis = haxis.lower()                              # 高度轴
         self.bg = util.format_color(bg)                         # 背景色
         self.fg = 1 - self.bg                                   # 前景色
+        self.executor = None                                    # 后台加载数据的线程池
+        self.gcache = None                                      # 几何数据的磁盘缓存
 
     def _reset(self):
         """清除模型数据"""
@@ -38,6 +47,7 @@ class Scheme:
         self.alive = False                                      # 是否使用了动画函数
         self.models = [dict(), dict(), dict()]                  # 主视区、标题区、调色板区模型
         self.widgets = dict()                                   # 由一个或多个模型组成的部件
+        self.pending = list()                                   # 后台加载中的任务及其占位文字的部件名
 
     def _set_range(self, r_x=None, r_y=None, r_z=None):
         """设置坐标轴范围"""
@@ -54,6 +64,31 @@ class Scheme:
             self.r_z[0] = min(r_z[0], self.r_z[0])
             self.r_z[1] = max(r_z[1], self.r_z[1])
 
+    def _merge(self, other):
+        """并入另一个展示方案主视区的模型，返回并入的模型id列表"""
+
+        self._set_range(r_x=other.r_x, r_y=other.r_y, r_z=other.r_z)
+        self.models[0].update(other.models[0])
+
+        for name in other.widgets:
+            if name in self.widgets:
+                self.widgets[name].extend(other.widgets[name])
+            else:
+                self.widgets.update({name: other.widgets[name]})
+
+        if other.alive:
+            self.alive = True
+
+        return list(other.models[0].keys())
+
+    def _cached(self, func, *args):
+        """返回func(*args)，启用了几何数据缓存时以参数内容为键读写缓存"""
+
+        if self.gcache is None:
+            return func(*args)
+
+        return self.gcache.call(func, *args)
+
     def _format_color(self, color, repeat=None):
         """将颜色参数转为浮点型的numpy数组"""
 
@@ -153,7 +188,7 @@ class Scheme:
 
         self.model(light.get_model(gltype, vs, color=color, lw=width, ls=stipple, **kwds), name)
 
-    def _surface(self, vs, gltype, color=None, texture=None, texcoord=None, **kwds):
+    def _surface(self, vs, gltype, color=None, texture=None, texcoord=None, simplify=None, **kwds):
         """三角面或四角面组成的曲面
 
         vs          - 顶点集：元组、列表或numpy数组，shape=(n,2|3)
@@ -161,7 +196,9 @@ class Scheme:
         color       - 颜色或颜色集：预定义颜色、十六进制颜色，或者浮点型元组、列表或numpy数组，值域范围[0,1]
         texture     - 纹理图片，或2D/2DArray/3D纹理对象
         texcoord    - 纹理坐标集：元组、列表或numpy数组，shape=(n,2|3)
+        simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），仅适用于GL_TRIANGLES和GL_QUADS，默认None（不简化）
         kwds        - 关键字参数
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认False
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认True（不透明）
@@ -173,7 +210,7 @@ class Scheme:
             name        - 模型或部件名
         """
 
-        keys = ['visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
+        keys = ['reorder', 'visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
         for key in kwds:
             if key not in keys:
                 raise KeyError('不支持的关键字参数：%s'%key)
@@ -182,6 +219,27 @@ class Scheme:
         name = kwds.pop('name') if 'name' in kwds else None
 
         vs = np.array(vs, dtype=np.float32)
+        if simplify and gltype in (GL_TRIANGLES, GL_QUADS):
+            textured = not texture is None and not texcoord is None
+            attr = np.array(texcoord, dtype=np.float32) if textured else self._format_color(color, vs.shape[0])
+            attr = attr.reshape(vs.shape[0], -1)
+
+            if vs.shape[-1] == 2:
+                vs = np.hstack((vs, np.zeros((vs.shape[0], 1), dtype=np.float32)))
+            if gltype == GL_QUADS:
+                idx = (np.arange(0, vs.shape[0], 4)[:,np.newaxis] + [0,1,2,0,2,3]).ravel()
+                vs, attr, gltype = vs[idx], attr[idx], GL_TRIANGLES
+
+            # 合并位置和颜色（或纹理坐标）均相同的顶点，简化后再展开为独立的三角面，保持平面着色
+            welded, inverse = np.unique(np.hstack((vs, attr)), axis=0, return_inverse=True)
+            vs, indices, (attr,) = self._cached(util.simplify, welded[:,:3], inverse.ravel(), simplify, [welded[:,3:]])
+            vs, attr = vs[indices], attr[indices]
+
+            if textured:
+                texcoord = attr
+            else:
+                color = attr
+
         normal = util.get_normal(gltype, vs)
 
         if gltype == GL_TRIANGLE_STRIP and (np.absolute(vs[0]-vs[-2])<1e-10).all() and (np.absolute(vs[1]-vs[-1])<1e-10).all():
@@ -207,7 +265,7 @@ class Scheme:
             color = self._format_color(color, vs.shape[0])
             self.model(light.get_model(gltype, vs, normal=normal, color=color, **kwds), name)
 
-    def _mesh(self, xs, ys, zs, gltype, color=None, texture=None, ccw=True, **kwds):
+    def _mesh(self, xs, ys, zs, gltype, color=None, texture=None, ccw=True, simplify=None, tessellate=False, **kwds):
         """网格面
 
         xs/ys/zs    - 顶点坐标集：元组、列表或numpy数组，shape=(m,n)，m为网格行数，n为网格列数
@@ -215,7 +273,10 @@ class Scheme:
         color       - 颜色或颜色集：预定义颜色、十六进制颜色，或者浮点型元组、列表或numpy数组，值域范围[0,1]
         texture     - 纹理图片，或2D纹理对象
         ccw         - 顶点逆时针排序的面为正面
+        simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+        tessellate  - 以网格为控制点，由GPU细分生成光滑曲面，默认False；为正数时表示每单位NDC长度的细分段数（True相当于40）
         kwds        - 关键字参数
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认False（网格简化时默认True）
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -227,61 +288,112 @@ class Scheme:
             name        - 模型或部件名
         """
 
-        keys = ['visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
-        for key in kwds:
-            if key not in keys:
-                raise KeyError('不支持的关键字参数：%s'%key)
-
-        name = kwds.pop('name') if 'name' in kwds else None
-        light = kwds.pop('light') if 'light' in kwds else SkyLight(direction=(-0.1,0.2,-1) if self.haxis=='z' else (-0.1,-1,-0.2))
-
         vs = np.dstack((xs, ys, zs))
         rows, cols = vs.shape[:2]
 
-        idx = np.arange(rows*cols).reshape(rows, cols)
-        idx_a, idx_b, idx_c, idx_d = idx[:-1,:-1], idx[1:,:-1], idx[:-1, 1:], idx[1:,1:]
-        if ccw:
-            if gltype == GL_QUADS:
-                indices = np.int32(np.dstack((idx_a, idx_b, idx_d, idx_c)).ravel())
-            else:
-                indices = np.int32(np.dstack((idx_a, idx_b, idx_c, idx_c, idx_b, idx_d)).ravel())
+        if tessellate: # 只上传控制网格，法向量由细分估值着色器计算
+            density = 40.0 if tessellate is True else float(tessellate)
+            if density <= 0:
+                raise ValueError('细分密度必须是正数')
+
+            gltype, indices, normal, simplify = GL_PATCHES, util._patch_indices(rows, cols, ccw), None, None
+            kwds.update({'density': density})
         else:
-            if gltype == GL_QUADS:
-                indices = np.int32(np.dstack((idx_a, idx_c, idx_d, idx_b)).ravel())
-            else:
-                indices = np.int32(np.dstack((idx_a, idx_c, idx_b, idx_b, idx_c, idx_d)).ravel())
-        normal = util.get_normal(gltype, vs, indices).reshape(rows, cols, -1)
+            indices, normal = self._cached(util._mesh_topology, vs, gltype, ccw)
+            normal = normal.reshape(-1, 3)
 
-        if (np.absolute(vs[0] - vs[-1]) < 1e-10).all(): # 首行尾行顶点重合
-            normal[0] += normal[-1]
-            normal[-1] = normal[0]
+        texcoord = None
+        if not texture is None:
+            u, v = np.linspace(0, 1, cols), np.linspace(0, 1, rows)
+            texcoord = np.float32(np.dstack(np.meshgrid(u, v)).reshape(-1, 2))
 
-        if (np.absolute(vs[:,0] - vs[:,-1]) < 1e-10).all(): # 首列尾列顶点重合
-            normal[:,0] += normal[:,-1]
-            normal[:,-1] = normal[:,0]
+        self._indexed(vs.reshape(-1, 3), gltype, normal, indices, color=color, texture=texture, texcoord=texcoord, simplify=simplify, **kwds)
 
-        if (np.absolute(vs[0] - vs[0,0]) < 1e-10).all(): # 首行顶点重合
-            normal[0] = normal[0,0]
+    def _indexed(self, vs, gltype, normal, indices, color=None, texture=None, texcoord=None, simplify=None, lods=None, **kwds):
+        """由顶点集、法向量和顶点索引组成的三角面或四角面
 
-        if (np.absolute(vs[-1] - vs[-1,0]) < 1e-10).all(): # 尾行顶点重合
-            normal[-1] = normal[-1,0]
+        vs          - 顶点集：numpy数组，shape=(n,3)
+        gltype      - GL_TRIANGLES、GL_QUADS或GL_PATCHES
+        normal      - 法向量集：numpy数组，shape=(n,3)，GL_PATCHES时为None
+        indices     - 顶点索引：numpy数组，None表示不使用顶点索引
+        color       - 颜色或颜色集：预定义颜色、十六进制颜色，或者浮点型元组、列表或numpy数组，值域范围[0,1]
+        texture     - 纹理图片，或2D纹理对象
+        texcoord    - 纹理坐标集：numpy数组，shape=(n,2)
+        simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+        lods        - 细节层次：由几何误差、顶点集、法向量、顶点索引和颜色集（None表示沿用单一颜色）组成的元组列表，第一项对应vs、normal和indices自身
+        kwds        - 关键字参数
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认False（网格简化时默认True）
+            density     - GL_PATCHES的细分密度：每单位NDC长度的细分段数，默认40
+            visible     - 是否可见，默认True
+            inside      - 模型顶点是否影响模型空间，默认True
+            opacity     - 模型不透明属性，默认不透明
+            cull        - 面剔除，可选项：'front', 'back', None（默认，表示使用当前设置）
+            fill        - 填充，可选项：True, False, None（默认，表示使用当前设置） 
+            slide       - 幻灯片函数，默认None
+            transform   - 由旋转、平移和缩放组成的模型几何变换序列
+            light       - 光照模型（默认户外光照模型）
+            name        - 模型或部件名
+        """
 
-        if (np.absolute(vs[:,0] - vs[0,0]) < 1e-10).all(): # 首列顶点重合
-            normal[:,0] = normal[0,0]
+        keys = ['reorder', 'density', 'visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
+        for key in kwds:
+            if key not in keys:
+                raise KeyError('不支持的关键字参数：%s'%key)
+
+        name = kwds.pop('name') if 'name' in kwds else None
+        light = kwds.pop('light') if 'light' in kwds else SkyLight(direction=(-0.1,0.2,-1) if self.haxis=='z' else (-0.1,-1,-0.2))
 
-        if (np.absolute(vs[:,-1] - vs[-1,0]) < 1e-10).all(): # 尾列顶点重合
-            normal[:,-1] = normal[0,-1]
+        n = vs.shape[0]
+        if texture is None:
+            color = self._format_color(color, n)
+
+        # 法向量、颜色和纹理坐标随顶点一起插值；首尾重合的行列在索引空间中是边界，简化时保持不动
+        if simplify:
+            if gltype == GL_QUADS:
+                indices = np.asarray(indices).reshape(-1, 4)[:,[0,1,2,0,2,3]].ravel()
+                gltype = GL_TRIANGLES
+
+            attrs = [normal, color.reshape(n, -1) if texture is None else texcoord]
+            vs, indices, (normal, attr) = self._cached(util.simplify, vs, indices, simplify, attrs)
+            kwds.update({'reorder': kwds.get('reorder', True)}) # 简化后的三角面顺序杂乱，默认重排
+            if texture is None:
+                color = attr
+            else:
+                texcoord = attr
 
         if not texture is None:
             if not isinstance(texture, Texture):
                 texture = Texture(texture)
 
-            u, v = np.linspace(0, 1, cols), np.linspace(0, 1, rows)
-            texcoord = np.float32(np.dstack(np.meshgrid(u, v)).reshape(-1, 2))
-            self.model(light.get_model(gltype, vs, normal=normal, texture=texture, texcoord=texcoord, indices=indices, **kwds), name)
+            self.model(light.get_model(gltype, vs, normal=normal, texture=texture, texcoord=texcoord, indices=indices, cache=self.gcache, **kwds), name)
         else:
-            color = self._format_color(color, rows*cols)
-            self.model(light.get_model(gltype, vs, normal=normal, color=color, indices=indices, **kwds), name)
+            m = light.get_model(gltype, vs, normal=normal, color=color, indices=indices, cache=self.gcache, **kwds)
+
+            # 低精度层次只保存顶点数据，不重排也不缓存。未给出颜色集的层次沿用单一颜色，逐顶点的颜色无法与其他层次的顶点对应
+            if lods and len(lods) > 1 and not simplify:
+                c = color.reshape(n, -1)
+                if (c == c[0]).all() or all([not item[4] is None for item in lods[1:]]):
+                    levels = [(lods[0][0], None, None)]
+                    for error, v, nv, iv, cv in lods[1:]:
+                        levels.append((error, {'vertex':v, 'normal':nv, 'color':np.tile(c[0], (v.shape[0], 1)) if cv is None else cv}, iv))
+                    m.set_lod(levels)
+
+            self.model(m, name)
+
+    def _lod(self, build, cell, r, lod=True):
+        """生成多个细节层次的网格数据，返回由几何误差、顶点集、法向量、顶点索引和颜色集（None）组成的元组列表
+
+        build       - 按圆周分片精度返回顶点集、法向量和顶点索引的函数
+        cell        - 最高精度层次的圆周分片精度：单位为度
+        r           - 决定弦高误差的半径
+        lod         - 是否生成低精度层次（分片精度依次为cell的2、4、9倍，不超过45°）
+        """
+
+        cells = [cell]
+        if lod:
+            cells.extend([c for c in (2*cell, 4*cell, 9*cell) if c <= 45])
+
+        return [(r * (1 - np.cos(np.radians(c)/2)), *self._cached(build, c), None) for c in cells]
 
     def _axes(self):
         """坐标轴"""
@@ -720,6 +832,18 @@ class Scheme:
 
         self._set_range(r_z=range_tuple)
 
+    def cache(self, path, capacity=1073741824):
+        """启用几何数据的磁盘缓存
+
+        等值面、圆管、球、网格面等模型的几何计算结果（顶点、法向量、顶点索引等）以输入数据和参数内容的哈希值为键
+        存入缓存目录，再次以相同的数据和参数绘制时直接以内存映射方式读取，不再重新计算
+
+        path        - 缓存目录，None表示停用缓存
+        capacity    - 缓存总大小的上限（字节），超过时淘汰最久未使用的条目，默认1GB
+        """
+
+        self.gcache = None if path is None else GeometryCache(path, capacity=capacity)
+
     def cruise(self, func):
         """设置相机巡航函数
         func        - 以时间t（毫秒）为参数的函数，返回包含下述key的字典
@@ -938,6 +1062,38 @@ class Scheme:
         else:
             self.widgets.update({name:[mid]})
 
+    def defer(self, loader, plot=None, text='正在加载……'):
+        """后台加载数据：窗口先行显示，数据就绪后再装配模型
+
+        loader      - 加载数据的函数（无参数，提交到线程池中执行），或concurrent.futures.Future对象
+        plot        - 绘图函数，形如plot(scheme, data)，在线程池中以临时的展示方案调用，生成的模型随后并入当前方案
+                      默认None，表示以loader返回的数据为顶点集绘制散列点
+        text        - 数据就绪前显示在模型空间中心的占位文字，None表示不显示
+        """
+
+        if not callable(loader) and not isinstance(loader, Future):
+            raise ValueError('loader参数应为可调用对象或Future对象')
+
+        if plot is None:
+            plot = lambda sch, data: sch.scatter(data)
+
+        def task():
+            sch = Scheme(haxis=self.haxis, bg=self.bg)
+            sch.gcache = self.gcache
+            plot(sch, loader.result() if isinstance(loader, Future) else loader())
+            return sch
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor()
+
+        name = None
+        if text:
+            name = uuid.uuid1().hex
+            pos = [sum(r)/2 if r[0] <= r[1] else 0.0 for r in (self.r_x, self.r_y, self.r_z)]
+            self.text(text, pos, size=24, align='center', valign='middle', inside=False, name=name)
+
+        self.pending.append((self.executor.submit(task), name))
+
     def text(self, text, pos, **kwds):
         """2D文字
 
@@ -1005,6 +1161,8 @@ class Scheme:
             data        - 数据集：元组、列表或numpy数组，shape=(n,)
             cm          - 调色板
             texture     - 纹理图片，或2D纹理对象
+            downsample  - 降采样：整型表示随机抽取的目标点数，浮点型表示体素边长（每个体素内的点及其颜色、数据和大小取均值），默认None（不降采样）
+            progressive - 逐帧分块上传：True, False, None（默认，点数超过PROGRESSIVE时启用）。启用后点的顺序随机打乱，先上传的点均匀覆盖整个点云
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             slide       - 幻灯片函数，默认None
@@ -1013,7 +1171,7 @@ class Scheme:
             name        - 模型或部件名
         """
 
-        keys = ['color', 'size', 'data', 'cm', 'texture', 'visible', 'inside', 'slide', 'transform', 'ambient', 'name']
+        keys = ['color', 'size', 'data', 'cm', 'texture', 'downsample', 'progressive', 'visible', 'inside', 'slide', 'transform', 'ambient', 'name']
         for key in kwds:
             if key not in keys:
                 raise KeyError('不支持的关键字参数：%s'%key)
@@ -1023,6 +1181,8 @@ class Scheme:
         data = kwds.get('data')
         cm = kwds.get('cm', 'viridis')
         texture = kwds.get('texture')
+        downsample = kwds.get('downsample')
+        progressive = kwds.get('progressive')
         visible = kwds.get('visible', True)
         inside = kwds.get('inside', True)
         slide = kwds.get('slide')
@@ -1030,11 +1190,33 @@ class Scheme:
         ambient = kwds.get('ambient', (1.0,1.0,1.0))
         name = kwds.get('name')
 
+        if isinstance(downsample, bool):
+            raise ValueError('downsample参数应为整型或浮点型')
+
         light = ScatterLight(ambient)
         vs = np.array(vs, dtype=np.float32)
         size = np.ones(vs.shape[0], dtype=np.float32) * size if isinstance(size, (int, float)) else np.float32(size)
 
-        if self.haxis=='z':
+        # 降采样在上传前进行，逐点的颜色、数据和大小随顶点一起抽取或平均
+        if downsample:
+            n = vs.shape[0]
+            c = np.asarray(color) if np.ndim(color) == 2 and len(color) == n else None
+            d = np.asarray(data) if np.ndim(data) == 1 and len(data) == n else None
+
+            if isinstance(downsample, numbers.Integral):
+                vs, c, d, size = util.random_downsample(vs, downsample, c, d, size)
+            else:
+                vs, c, d, size = util.voxel_downsample(vs, downsample, c, d, size)
+
+            color = color if c is None else c
+            data = data if d is None else d
+
+        if progressive is None:
+            progressive = vs.shape[0] > PROGRESSIVE
+
+        if progressive:
+            idx = np.random.default_rng(0).permutation(vs.shape[0])
+        elif self.haxis=='z':
             idx = np.argsort(-vs[...,1])
         elif vs.shape[1] == 3:
             idx = np.argsort(vs[...,2])
@@ -1054,7 +1236,7 @@ class Scheme:
         else:
             color = util.cmap(np.array(data), cm)[idx]
 
-        self.model(light.get_model(GL_POINTS, vs[idx], 
+        m = light.get_model(GL_POINTS, vs[idx], 
             color       = color, 
             psize       = size[idx],
             texture     = texture,
@@ -1062,7 +1244,12 @@ class Scheme:
             inside      = inside,
             slide       = slide,
             transform   = transform
-        ), name)
+        )
+
+        if progressive:
+            m.stream = ProgressiveStream({key: m.attribute[key]['data'] for key in m.attribute})
+
+        self.model(m, name)
 
     def line(self, vs, **kwds):
         """连点成线
@@ -1127,6 +1314,8 @@ class Scheme:
             texture     - 纹理图片，或2D/2DArray/3D纹理对象
             texcoord    - 纹理坐标集：元组、列表或numpy数组，shape=(n,2|3)
             quad        - 使用四角图元绘制：布尔型，默认False（使用三角图元绘制）
+            simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认False
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认True（不透明）
@@ -1144,14 +1333,15 @@ class Scheme:
         texture = kwds.pop('texture') if 'texture' in kwds else None
         texcoord = kwds.pop('texcoord') if 'texcoord' in kwds else None
         quad = kwds.pop('quad') if 'quad' in kwds else False
+        simplify = kwds.pop('simplify') if 'simplify' in kwds else None
         gltype = GL_QUADS if quad else GL_TRIANGLES
 
         if not texture is None and not texcoord is None:
-            self._surface(vs, gltype, texture=texture, texcoord=texcoord, **kwds)
+            self._surface(vs, gltype, texture=texture, texcoord=texcoord, simplify=simplify, **kwds)
         else:
             if not data is None:
                 color = util.cmap(np.array(data), cm)
-            self._surface(vs, gltype, color=color, **kwds)
+            self._surface(vs, gltype, color=color, simplify=simplify, **kwds)
 
     def mesh(self, xs, ys, zs, **kwds):
         """网格面
@@ -1164,6 +1354,9 @@ class Scheme:
             texture     - 纹理图片，或2D纹理对象
             quad        - 使用四角图元绘制：布尔型，默认False（使用三角图元绘制）
             ccw         - 顶点逆时针排序的面为正面，默认True
+            simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+            tessellate  - 以网格为控制点，由GPU按视距细分生成光滑曲面（需要OpenGL 4.0），默认False；为正数时表示每单位NDC长度的细分段数（True相当于40）
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认False（网格简化时默认True）
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -1181,14 +1374,16 @@ class Scheme:
         texture = kwds.pop('texture') if 'texture' in kwds else None
         ccw = kwds.pop('ccw') if 'ccw' in kwds else True
         quad = kwds.pop('quad') if 'quad' in kwds else False
+        simplify = kwds.pop('simplify') if 'simplify' in kwds else None
+        tessellate = kwds.pop('tessellate') if 'tessellate' in kwds else False
         gltype = GL_QUADS if quad else GL_TRIANGLES
 
         if not texture is None:
-            self._mesh(xs, ys, zs, gltype, texture=texture, ccw=ccw, **kwds)
+            self._mesh(xs, ys, zs, gltype, texture=texture, ccw=ccw, simplify=simplify, tessellate=tessellate, **kwds)
         else:
             if not data is None:
                 color = util.cmap(np.array(data), cm)
-            self._mesh(xs, ys, zs, gltype, color=color, ccw=ccw, **kwds)
+            self._mesh(xs, ys, zs, gltype, color=color, ccw=ccw, simplify=simplify, tessellate=tessellate, **kwds)
 
     def text3d(self, text, box, **kwds):
         """3D文字
@@ -1276,16 +1471,7 @@ class Scheme:
         center = np.array(center)
         m_rotate = util.y2v(spire - center)
 
-        arc_0, arc_1, cell = np.radians(arc[0]), np.radians(arc[1]), np.radians(cell)
-        slices = int(abs(arc_0-arc_1)/cell) + 1
-
-        theta = np.linspace(arc_0, arc_1, slices)
-        xs = r * np.cos(theta)
-        zs = -r * np.sin(theta)
-        ys = np.zeros_like(theta)
-
-        vs = np.stack((xs,ys,zs), axis=1)
-        vs = np.dot(vs, m_rotate) + center
+        vs = np.dot(r * util._unit_arc(tuple(arc), cell), m_rotate) + center
         vs_c = np.vstack((spire, vs))
         color = self._format_color(color)
 
@@ -1301,6 +1487,7 @@ class Scheme:
             color       - 颜色：浮点型元组、列表或numpy数组
             arc         - 弧度角范围：默认0°~360°
             cell        - 圆周分片精度：默认5°
+            lod         - 是否生成多个细节层次，按屏幕上的投影大小自动切换：布尔型，默认True
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -1315,38 +1502,34 @@ class Scheme:
         color = kwds.pop('color') if 'color' in kwds else None
         arc = kwds.pop('arc') if 'arc' in kwds else (0,360)
         cell = kwds.pop('cell') if 'cell' in kwds else 5
+        lod = kwds.pop('lod') if 'lod' in kwds else True
 
         c1 = np.array(c1)
         c2 = np.array(c2)
         m_rotate = util.y2v(c1 - c2)
+        h = np.linalg.norm(c1 - c2)
 
-        arc_0, arc_1, cell = np.radians(arc[0]), np.radians(arc[1]), np.radians(cell)
-        slices = int(abs(arc_0-arc_1)/cell) + 1
-
-        theta = np.linspace(arc_0, arc_1, slices)
-        xs = r * np.cos(theta)
-        zs = -r * np.sin(theta)
-        ys = np.zeros_like(theta)
-        vs = np.stack((xs,ys,zs), axis=1)
-        vs = np.dot(vs, m_rotate)
-        vs = np.stack((vs+c1, vs+c2), axis=0)
+        def build(cell):
+            vs, normal, indices, _ = util._unit_cylinder(tuple(arc), cell)
+            return np.dot(vs * (r, h, r), m_rotate) + c2, np.dot(normal, m_rotate), indices
 
-        xs = vs[..., 0]
-        ys = vs[..., 1]
-        zs = vs[..., 2]
+        lods = self._lod(build, cell, r, lod)
+        _, vs, normal, indices, _ = lods[0]
 
-        self.mesh(xs, ys, zs, color=color, **kwds)
+        self._indexed(vs, GL_TRIANGLES, normal, indices, color=color, lods=lods, **kwds)
 
     def pipe(self, vs, r, **kwds):
         """圆管
 
         vs          - 圆管中心线顶点集：元组、列表或numpy数组，shape=(n,3)
-        r           - 圆管半径：浮点型
+        r           - 圆管半径：浮点型，或与中心线顶点一一对应的元组、列表或numpy数组，shape=(n,)
         kwds        - 关键字参数
             color       - 颜色：浮点型元组、列表或numpy数组
             data        - 数据集：元组、列表或numpy数组，shape=(n,)
             cm          - 调色板
             cell        - 圆周分片精度：默认5°
+            indexed     - 是否使用顶点索引绘制：布尔型，默认True
+            lod         - 是否生成多个细节层次，按屏幕上的投影大小自动切换：布尔型，默认True
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -1362,28 +1545,47 @@ class Scheme:
         data = kwds.pop('data') if 'data' in kwds else None
         cm = kwds.pop('cm') if 'cm' in kwds else 'viridis'
         cell = kwds.pop('cell') if 'cell' in kwds else 5
+        indexed = kwds.pop('indexed') if 'indexed' in kwds else True
+        lod = kwds.pop('lod') if 'lod' in kwds else True
         gltype = GL_QUADS
 
         vs = np.array(vs, dtype=np.float32).reshape(-1,3)
-        rows, cols = vs.shape[0], int(360/cell)+1
-        circles = list()
-
-        theta = np.linspace(0, 2*np.pi, cols)
-        x = r * np.cos(theta)
-        z = -r * np.sin(theta)
-        y = np.zeros(cols, dtype=np.float64)
-        v = np.stack((x,y,z), axis=1)
-
-        for i in range(1, rows):
-            m = util.y2v(vs[i-1] - vs[i])
-            circles.append(np.dot(v, m) + vs[i-1])
-        circles.append(np.dot(v, m) + vs[rows-1])
-        vs = np.stack(circles, axis=0)
-        xs, ys, zs = vs[...,0], vs[...,1], vs[...,2]
+        r = np.float32(r) * np.ones(vs.shape[0], dtype=np.float32)
+        if not data is None:
+            data = np.array(data)
+
+        keep = np.hstack((True, np.any(np.diff(vs, axis=0) != 0, axis=1))) # 剔除相邻的重合顶点
+        vs, r = vs[keep], r[keep]
+        if not data is None:
+            data = data[keep]
+
+        rows = vs.shape[0]
+        t, n = util.transport_frames(vs)
+        b = np.cross(n, t)
+
+        # 法向量沿环向外，半径沿中心线变化时按半径的变化率向切向倾斜
+        s = np.hstack((0, np.cumsum(np.linalg.norm(np.diff(vs, axis=0), axis=1))))
+        drds = np.gradient(r, s)
 
+        def build(cell):
+            cols = int(360/cell)+1
+            theta = np.linspace(0, 2*np.pi, cols)
+            ring = np.cos(theta)[np.newaxis,:,np.newaxis] * n[:,np.newaxis] + np.sin(theta)[np.newaxis,:,np.newaxis] * b[:,np.newaxis]
+            normal = (ring - drds[:,np.newaxis,np.newaxis] * t[:,np.newaxis]).reshape(-1, 3)
+            return (vs[:,np.newaxis] + r[:,np.newaxis,np.newaxis] * ring).reshape(-1, 3), normal, util._grid_indices(rows, cols, gltype)
+
+        # 数据着色的各层次按各自的圆周分片数重新映射颜色
+        lods = self._lod(build, cell, r.max(), lod)
         if not data is None:
-            color = util.cmap(np.repeat(np.array(data), cols), cm)
-        self._mesh(xs, ys, zs, gltype, color=color, **kwds)
+            lods = [(error, v, nv, i, util.cmap(np.repeat(data, v.shape[0]//rows), cm)) for error, v, nv, i, _ in lods]
+
+        if not indexed:
+            lods = [(error, v[i], nv[i], None, None if c is None else c[i]) for error, v, nv, i, c in lods]
+
+        _, vs, normal, indices, c = lods[0]
+        color = self._format_color(color) if data is None else c
+
+        self._indexed(vs, gltype, normal, indices, color=color, lods=lods, **kwds)
 
     def sphere(self, center, r, **kwds):
         """由经纬度网格生成的球
@@ -1396,6 +1598,7 @@ class Scheme:
             uarc        - u方向范围：默认0°~360°
             varc        - v方向范围：默认-90°~90°
             cell        - 网格精度：默认5°
+            lod         - 是否生成多个细节层次，按屏幕上的投影大小自动切换：布尔型，默认True
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -1412,22 +1615,19 @@ class Scheme:
         uarc = kwds.pop('uarc') if 'uarc' in kwds else (0,360)
         varc = kwds.pop('varc') if 'varc' in kwds else (-90,90)
         cell = kwds.pop('cell') if 'cell' in kwds else 5
+        lod = kwds.pop('lod') if 'lod' in kwds else True
 
-        u0, u1 = np.radians(uarc[0]), np.radians(uarc[1])
-        v0, v1 = np.radians(varc[1]), np.radians(varc[0])
-        cell = np.radians(cell)
-        ulen, vlen = int(abs(u0-u1)/cell)+1, int(abs(v0-v1)/cell)+1
-        gv, gu = np.mgrid[v0:v1:complex(0,vlen), u0:u1:complex(0,ulen)]
+        m_rotate = util.y2v(vec)
+        center = np.array(center)
 
-        ys = r * np.sin(gv)
-        xs = r * np.cos(gv)*np.cos(gu)
-        zs = -r * np.cos(gv)*np.sin(gu)
+        def build(cell):
+            vs, normal, indices, _ = util._unit_sphere(tuple(uarc), tuple(varc), cell)
+            return np.dot(r * vs, m_rotate) + center, np.dot(normal, m_rotate), indices
 
-        m_rotate = util.y2v(vec)
-        vs = np.dstack((xs, ys, zs))
-        vs = np.dot(vs, m_rotate) + np.array(center)
+        lods = self._lod(build, cell, r, lod)
+        _, vs, normal, indices, _ = lods[0]
 
-        self._mesh(vs[...,0], vs[...,1], vs[...,2], GL_QUADS, color=color, ccw=True, **kwds)
+        self._indexed(vs, GL_QUADS, normal, indices, color=color, lods=lods, **kwds)
 
     def circle(self, center, r, **kwds):
         """圆
@@ -1457,16 +1657,7 @@ class Scheme:
         center = np.array(center)
         m_rotate = util.y2v(vec)
 
-        arc_0, arc_1, cell = np.radians(arc[0]), np.radians(arc[1]), np.radians(cell)
-        slices = int(abs(arc_0-arc_1)/cell) + 1
-
-        theta = np.linspace(arc_0, arc_1, slices)
-        xs = r * np.cos(theta)
-        zs = -r * np.sin(theta)
-        ys = np.zeros_like(theta)
-
-        vs = np.stack((xs,ys,zs), axis=1)
-        vs = np.dot(vs, m_rotate) + center
+        vs = np.dot(r * util._unit_arc(tuple(arc), cell), m_rotate) + center
         vs = np.vstack((center, vs))
 
         self._surface(vs, GL_TRIANGLE_FAN, color=color, **kwds)
@@ -1523,6 +1714,7 @@ class Scheme:
             uarc        - u方向范围：默认0°~360°
             varc        - v方向范围：默认0°~360°
             cell        - 圆周分片精度：默认5°
+            lod         - 是否生成多个细节层次，按屏幕上的投影大小自动切换：布尔型，默认True
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
             opacity     - 模型不透明属性，默认不透明
@@ -1539,36 +1731,35 @@ class Scheme:
         uarc = kwds.pop('uarc') if 'uarc' in kwds else (0,360)
         varc = kwds.pop('varc') if 'varc' in kwds else (0,360)
         cell = kwds.pop('cell') if 'cell' in kwds else 5
+        lod = kwds.pop('lod') if 'lod' in kwds else True
 
-        u_0, u_1 = np.radians(uarc[0]), np.radians(uarc[1])
-        v_0, v_1 = np.radians(varc[1]), np.radians(varc[0])
-        cell = np.radians(cell)
-        u_slices, v_slices = round(abs(u_0-u_1)/cell), round(abs(v_0-v_1)/cell)
-        gv, gu = np.mgrid[v_0:v_1:complex(0,v_slices), u_0:u_1:complex(0,u_slices)]
+        m_rotate = util.y2v(vec)
 
-        xs = (r2 + r1 * np.cos(gv)) * np.cos(gu)
-        zs = -(r2 + r1 * np.cos(gv)) * np.sin(gu)
-        ys = r1 * np.sin(gv)
+        def build(cell):
+            ring, normal, indices, _ = util._unit_torus(tuple(uarc), tuple(varc), cell)
+            return np.dot(r2 * ring + r1 * normal, m_rotate) + center, np.dot(normal, m_rotate), indices
 
-        m_rotate = util.y2v(vec)
-        vs = np.dot(np.dstack((xs, ys, zs)), m_rotate) + center
-        xs, ys, zs = vs[...,0], vs[...,1], vs[...,2]
+        # 环向弦高误差按外缘半径计算，再叠加管向弦高误差
+        lods = self._lod(build, cell, r2 + 2*r1, lod)
+        _, vs, normal, indices, _ = lods[0]
 
-        self.mesh(xs, ys, zs, color=color, **kwds)
+        self._indexed(vs, GL_TRIANGLES, normal, indices, color=color, lods=lods, **kwds)
 
     def isosurface(self, data, level, **kwds):
         """基于MarchingCube算法的三维等值面
 
         data        - 数据集：三维numpy数组
-        level       - 阈值：浮点型
+        level       - 阈值：浮点型，或由多个阈值组成的元组、列表（一次扫描生成多个嵌套的等值面，每个阈值对应一个模型）
         kwds        - 关键字参数
-            color       - 颜色：浮点型元组、列表或numpy数组
+            color       - 颜色：浮点型元组、列表或numpy数组；多个阈值时也可以是与阈值一一对应的颜色列表
             xr          - 数据集对应的点的x轴的动态范围
             yr          - 数据集对应的点的y轴的动态范围
             zr          - 数据集对应的点的z轴的动态范围
+            simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认True
             visible     - 是否可见，默认True
             inside      - 模型顶点是否影响模型空间，默认True
-            opacity     - 模型不透明属性，默认不透明
+            opacity     - 模型不透明属性，默认不透明；多个阈值时也可以是与阈值一一对应的布尔型列表
             cull        - 面剔除，可选项：'front', 'back', None（默认，表示使用当前设置）
             fill        - 填充，可选项：True, False, None（默认，表示使用当前设置） 
             slide       - 幻灯片函数，默认None
@@ -1577,34 +1768,258 @@ class Scheme:
             name        - 模型或部件名
         """
 
+        keys = ['color', 'xr', 'yr', 'zr', 'simplify', 'reorder', 'visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
+        for key in kwds:
+            if key not in keys:
+                raise KeyError('不支持的关键字参数：%s'%key)
+
         color = kwds.pop('color') if 'color' in kwds else None
         xr = kwds.pop('xr') if 'xr' in kwds else None
         yr = kwds.pop('yr') if 'yr' in kwds else None
         zr = kwds.pop('zr') if 'zr' in kwds else None
+        simplify = kwds.pop('simplify') if 'simplify' in kwds else None
+        reorder = kwds.pop('reorder') if 'reorder' in kwds else True
+        opacity = kwds.pop('opacity') if 'opacity' in kwds else True
+        light = kwds.pop('light') if 'light' in kwds else SkyLight(direction=(-0.1,0.2,-1) if self.haxis=='z' else (-0.1,-1,-0.2))
+        name = kwds.pop('name') if 'name' in kwds else None
 
-        vs, ids = util._isosurface(data, level)
-        indices = ids.ravel()
+        if isinstance(level, (tuple, list, np.ndarray)):
+            levels = list(level)
+            if name is None:
+                name = uuid.uuid1().hex
+        else:
+            levels = [level]
 
-        xs = vs[:,0] if xr is None else (xr[1] - xr[0]) * vs[:,0] / data.shape[0] + xr[0]
-        ys = vs[:,1] if yr is None else (yr[1] - yr[0]) * vs[:,1] / data.shape[1] + yr[0]
-        zs = vs[:,2] if zr is None else (zr[1] - zr[0]) * vs[:,2] / data.shape[2] + zr[0]
-        vs = np.stack((xs, ys, zs), axis=1)[indices]
+        n = len(levels)
+        if isinstance(color, (tuple, list)) and len(color) == n and all(isinstance(c, (str, tuple, list, np.ndarray)) for c in color):
+            colors = list(color)
+        else:
+            colors = [color] * n
+        opacities = list(opacity) if isinstance(opacity, (tuple, list)) else [opacity] * n
+
+        k = np.ones(3, dtype=np.float32)
+        shift = np.zeros(3, dtype=np.float32)
+        for i, r in enumerate((xr, yr, zr)):
+            if not r is None:
+                k[i] = (r[1] - r[0]) / data.shape[i]
+                shift[i] = r[0]
+
+        # 半透明等值面按阈值由高到低（由内而外）添加，并共享同一深度，确保渲染时始终先绘制内层
+        surfaces = self._cached(util._isosurfaces, data, levels)
+        translucent = list()
+        for i in np.argsort(levels)[::-1]:
+            vs, faces, normal = surfaces[i]
+            if faces.shape[0] == 0:
+                continue
+
+            if simplify:
+                vs, faces, (normal,) = self._cached(util.simplify, vs, faces, simplify, [normal])
+
+            vs = vs * k + shift
+            normal = normal / k
+            c = self._format_color(colors[i], vs.shape[0])
+            m = light.get_model(GL_TRIANGLES, vs, normal=normal, color=c, indices=faces.ravel(), opacity=opacities[i], reorder=reorder, cache=self.gcache, **kwds)
+            if not opacities[i]:
+                translucent.append(m)
+            self.model(m, name)
+
+        if translucent:
+            depth = translucent[-1].depth
+            for m in translucent:
+                m.depth = dict(depth)
+
+    def volume(self, data, **kwds):
+        """基于光线投射算法（GPU）的体绘制
 
-        self._surface(vs, GL_TRIANGLES, color=color, **kwds)
+        data        - 数据集：三维numpy数组
+        kwds        - 关键字参数
+            cm          - 调色板（传递函数），默认'viridis'
+            mode        - 绘制模式：'composite'-合成（默认），'mip'-最大密度投影，'iso'-等值面；或以时间t为参数返回模式的函数
+            level       - 等值面阈值：浮点型，或以时间t为参数返回阈值的函数，仅用于'iso'模式，默认数据的中值
+            drange      - 数据动态范围，None表示使用data的动态范围
+            steps       - 沿包围盒对角线的采样步数，默认等于数据集对角线的体素数
+            xr          - 数据集对应的点的x轴的动态范围
+            yr          - 数据集对应的点的y轴的动态范围
+            zr          - 数据集对应的点的z轴的动态范围
+            visible     - 是否可见，默认True
+            inside      - 模型顶点是否影响模型空间，默认True
+            slide       - 幻灯片函数，默认None
+            transform   - 由旋转、平移和缩放组成的模型几何变换序列
+            ambient     - 环境光，仅用于'iso'模式，默认(0.3,0.3,0.3)
+            name        - 模型或部件名
+        """
 
-    def pointcloud(self, pcfile, cm='viridis', size=1):
+        keys = ['cm', 'mode', 'level', 'drange', 'steps', 'xr', 'yr', 'zr', 'visible', 'inside', 'slide', 'transform', 'ambient', 'name']
+        for key in kwds:
+            if key not in keys:
+                raise KeyError('不支持的关键字参数：%s'%key)
+
+        cm = kwds.pop('cm') if 'cm' in kwds else 'viridis'
+        mode = kwds.pop('mode') if 'mode' in kwds else 'composite'
+        level = kwds.pop('level') if 'level' in kwds else None
+        drange = kwds.pop('drange') if 'drange' in kwds else None
+        steps = kwds.pop('steps') if 'steps' in kwds else None
+        xr = kwds.pop('xr') if 'xr' in kwds else (0, data.shape[0])
+        yr = kwds.pop('yr') if 'yr' in kwds else (0, data.shape[1])
+        zr = kwds.pop('zr') if 'zr' in kwds else (0, data.shape[2])
+        light = VolumeLight(kwds.pop('ambient') if 'ambient' in kwds else (0.3,0.3,0.3))
+        name = kwds.pop('name') if 'name' in kwds else None
+
+        modes = {'composite':0, 'mip':1, 'iso':2}
+        if hasattr(mode, '__call__'):
+            mode_func = mode
+            mode = lambda t : modes[mode_func(t)]
+        elif mode in modes:
+            mode = modes[mode]
+        else:
+            raise ValueError('不支持的绘制模式：%s'%mode)
+
+        data = np.asarray(data)
+        dmin, dmax = (float(data.min()), float(data.max())) if drange is None else drange
+        span = float(dmax - dmin) or 1.0 # 常量数据或动态范围两端相等时，归一化后均为0
+        if level is None:
+            level = (dmin + dmax) / 2
+
+        if hasattr(level, '__call__'):
+            level_func = level
+            level = lambda t : np.float32((level_func(t) - dmin) / span)
+        else:
+            level = (level - dmin) / span
+
+        if data.dtype == np.uint8 and drange is None and dmin == 0 and dmax == 255:
+            im = np.ascontiguousarray(data)
+        else:
+            im = np.uint8(255 * np.clip((np.float32(data) - dmin) / span, 0, 1))
+
+        if steps is None:
+            steps = int(np.linalg.norm(data.shape))
+
+        tf = np.uint8(255 * util.cmap(np.linspace(0, 1, 256), cm))
+        tf[:,3] = np.arange(256) # 不透明度随数值线性增加
+        volume = Texture(im, ttype=GL_TEXTURE_3D, min_filter=GL_LINEAR, s_tile=GL_CLAMP_TO_EDGE, t_tile=GL_CLAMP_TO_EDGE, r_tile=GL_CLAMP_TO_EDGE)
+        transfer = Texture(tf, ttype=GL_TEXTURE_1D, min_filter=GL_LINEAR, s_tile=GL_CLAMP_TO_EDGE)
+
+        # 包围盒的6个面，从外侧看顶点逆时针排列
+        x0, x1, y0, y1, z0, z1 = *xr, *yr, *zr
+        vs = np.array([
+            [x0,y1,z1], [x0,y0,z1], [x1,y0,z1], [x1,y1,z1], # 前
+            [x1,y1,z0], [x1,y0,z0], [x0,y0,z0], [x0,y1,z0], # 后
+            [x0,y1,z0], [x0,y1,z1], [x1,y1,z1], [x1,y1,z0], # 上
+            [x0,y0,z1], [x0,y0,z0], [x1,y0,z0], [x1,y0,z1], # 下
+            [x0,y1,z0], [x0,y0,z0], [x0,y0,z1], [x0,y1,z1], # 左
+            [x1,y1,z1], [x1,y0,z1], [x1,y0,z0], [x1,y1,z0]  # 右
+        ], dtype=np.float32)
+        box = np.array([[x0,y0,z0], [x1,y1,z1]], dtype=np.float32)
+
+        self.model(light.get_model(GL_QUADS, vs,
+            texture     = volume,
+            transfer    = transfer,
+            mode        = mode,
+            level       = level,
+            steps       = steps,
+            box         = box,
+            res         = float(max(data.shape)),
+            opacity     = False,
+            cull        = 'front',
+            **kwds
+        ), name)
+
+    def meshfile(self, meshfile, **kwds):
+        """读网格文件并绘制模型，网格以顶点索引的形式装配，不展开三角面
+
+        meshfile    - 网格文件，支持ply（须包含face元素）、obj和stl格式
+        kwds        - 关键字参数
+            color       - 颜色：浮点型元组、列表或numpy数组，文件包含顶点颜色时忽略
+            texture     - 纹理图片，或2D纹理对象，文件须包含纹理坐标
+            simplify    - 网格简化的目标三角面数量（整型）或比例（浮点型），默认None（不简化）
+            reorder     - 按顶点缓存命中率重排图元和顶点，默认True
+            visible     - 是否可见，默认True
+            inside      - 模型顶点是否影响模型空间，默认True
+            opacity     - 模型不透明属性，默认不透明
+            cull        - 面剔除，可选项：'front', 'back', None（默认，表示使用当前设置）
+            fill        - 填充，可选项：True, False, None（默认，表示使用当前设置） 
+            slide       - 幻灯片函数，默认None
+            transform   - 由旋转、平移和缩放组成的模型几何变换序列
+            light       - 光照模型（默认户外光照模型）
+            name        - 模型或部件名
+        """
+
+        keys = ['color', 'texture', 'simplify', 'reorder', 'visible', 'inside', 'opacity', 'cull', 'fill', 'slide', 'transform', 'light', 'name']
+        for key in kwds:
+            if key not in keys:
+                raise KeyError('不支持的关键字参数：%s'%key)
+
+        color = kwds.pop('color') if 'color' in kwds else None
+        texture = kwds.pop('texture') if 'texture' in kwds else None
+        simplify = kwds.pop('simplify') if 'simplify' in kwds else None
+        kwds.update({'reorder': kwds.get('reorder', True)}) # 网格文件的三角面顺序通常不利于顶点缓存
+
+        ds = util.read_pcfile(meshfile)
+        if not ds.ok:
+            raise RuntimeError(ds.info)
+        if ds.indices is None:
+            raise RuntimeError('错误：文件不包含面数据')
+
+        vs = np.float32(ds.xyz)
+        normal = ds.normal
+        if normal is None:
+            normal = util.get_normal(GL_TRIANGLES, vs, ds.indices)
+
+        if not texture is None and not ds.texcoord is None:
+            self._indexed(vs, GL_TRIANGLES, np.float32(normal), ds.indices, texture=texture, texcoord=np.float32(ds.texcoord), simplify=simplify, **kwds)
+        else:
+            if not ds.rgb is None:
+                color = ds.rgb
+            self._indexed(vs, GL_TRIANGLES, np.float32(normal), ds.indices, color=color, simplify=simplify, **kwds)
+
+    def plymesh(self, plyfile, **kwds):
+        """读ply网格文件并绘制模型，参数同meshfile"""
+
+        self.meshfile(plyfile, **kwds)
+
+    def pointcloud(self, pcfile, cm='viridis', size=1, budget=4194304, downsample=None, background=False):
         """读点云文件并绘制模型
 
-        pcfile      - 点云文件，支持ply、pcd等格式
+        pcfile      - 点云文件，支持ply、pcd、las等格式。las文件以文件头中的坐标偏移量为原点绘制
+                      也可以是wxgl.build_octree生成的八叉树目录，此时按视点流式加载节点，以八叉树的中心为原点绘制
         cm          - 调色板。若文件无颜色数据但包含强度数据，则使用调色板将强度映射为颜色
         size        - 点的大小
+        budget      - 流式加载八叉树时，显存池可容纳的点数
+        downsample  - 降采样：整型表示随机抽取的目标点数（只读取抽中的点），浮点型表示体素边长（每个体素内的点及其颜色、强度取均值），默认None（不降采样）
+        background  - 是否在后台线程中读取文件，窗口先行显示，读取完成后再装配模型，默认False
         """
 
+        if isinstance(downsample, bool):
+            raise ValueError('downsample参数应为整型或浮点型')
+
+        if background:
+            return self.defer(lambda : pcfile, lambda sch, pcfile: sch.pointcloud(pcfile, cm=cm, size=size, budget=budget, downsample=downsample))
+
+        if os.path.isdir(pcfile):
+            stream = OctreeStream(pcfile, budget=budget)
+
+            # 模型只持有一个顶点的占位数据，显存按显存池的大小分配
+            m = ScatterLight().get_model(GL_POINTS, np.zeros((1,3), dtype=np.float32),
+                color   = np.zeros((1,4), dtype=np.float32),
+                psize   = np.full(1, size, dtype=np.float32)
+            )
+
+            # 显存池初始为空，模型空间取八叉树的坐标范围
+            m.stream = stream
+            m.r_x, m.r_y, m.r_z = [tuple(item) for item in stream.bound.T]
+
+            return self.model(m)
+
         ds = util.read_pcfile(pcfile)
         if ds.ok:
+            if isinstance(downsample, numbers.Integral):
+                if downsample < ds.count:
+                    ds = ds.take(util._sample_indices(ds.count, downsample))
+                downsample = None
+
             if ds.rgb is None:
-                return self.scatter(ds.xyz, data=ds.intensity, cm=cm, size=size)
+                return self.scatter(ds.get_xyz(relative=True), data=ds.intensity, cm=cm, size=size, downsample=downsample)
             else:
-                return self.scatter(ds.xyz, color=ds.rgb, size=size)
+                return self.scatter(ds.get_xyz(relative=True), color=ds.rgb, size=size, downsample=downsample)
         else:
             raise RuntimeError(ds.info)
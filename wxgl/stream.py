@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+class ProgressiveStream:
+    """逐帧分块上传顶点数据的数据源
+
+    首帧上传前first个顶点，此后每帧上传step个顶点，已上传的顶点立即参与绘制，
+    避免一次性上传海量顶点造成界面卡顿。顶点顺序应预先打乱，以使先上传的顶点均匀覆盖整个模型。
+    """
+
+    def __init__(self, attribute, first=1048576, step=262144):
+        """构造函数
+
+        attribute   - attribute变量名及其顶点数据组成的字典，各顶点数据的第一维长度相同
+        first       - 首帧上传的顶点数量
+        step        - 此后每帧上传的顶点数量
+        """
+
+        self.attribute = attribute
+        self.total = len(next(iter(attribute.values())))
+        self.first = first
+        self.step = step
+        self.uploaded = 0                                               # 已上传的顶点数量
+
+    @property
+    def done(self):
+        """顶点数据是否已全部上传"""
+
+        return self.uploaded >= self.total
+
+    def close(self):
+        """重置上传进度（显存对象随模型一起删除）"""
+
+        self.uploaded = 0
+
+    def update(self, mmat, vmat, pmat, near, height):
+        """返回本帧待上传的(起始顶点, {attribute变量名: 数据})列表，以及绘制时各段的起始顶点和顶点数量
+
+        参数与OctreeStream.update相同，分块上传与相机无关，这里不使用
+        """
+
+        if self.done:
+            return list(), None
+
+        a = self.uploaded
+        b = min(self.total, a + (self.step if a else self.first))
+        self.uploaded = b
+
+        uploads = [(a, {key: self.attribute[key][a:b] for key in self.attribute})]
+        ranges = None if self.done else (np.array([0], dtype=np.int32), np.array([b], dtype=np.int32))
+
+        return uploads, ranges
@@ -1,17 +1,24 @@
 # -*- coding: utf-8 -*-
 
 import re
+import threading
 from io import BytesIO
+from collections import OrderedDict
 import freetype
 from PIL import Image
 import numpy as np
 import matplotlib.font_manager as mfm
 from matplotlib import mathtext
 
+GLYPH_CACHE = 8192                                                  # 字形缓存的最大字形数量
+
 class FontManager:
     """字体管理"""
  
     def __init__(self):
+        self.faces = dict()                                             # 字体文件对应的freetype.Face对象及其当前的字号
+        self.glyphs = OrderedDict()                                     # 以(字体文件, 字号, 字符)为键的字形缓存，按最近使用的先后排列
+        self.lock = threading.Lock()                                    # 后台线程也可能生成文本，Face对象不能同时使用
         self.fonts = dict()
         for item in mfm.fontManager.ttflist:
             if item.name in self.fonts:
@@ -66,60 +73,58 @@ class FontManager:
  
         return self.fonts[family][0].fname
  
+    def get_glyph(self, ch, size, font_file):
+        """返回字形的位图、水平方向的起始偏移、基线以上的高度和步进宽度，字形光栅化的结果被缓存"""
+
+        key = (font_file, size, ch)
+        with self.lock:
+            if key in self.glyphs:
+                self.glyphs.move_to_end(key)
+                return self.glyphs[key]
+
+            if font_file not in self.faces:
+                self.faces.update({font_file: [freetype.Face(font_file), None]})
+
+            face = self.faces[font_file]
+            if face[1] != size:
+                face[0].set_char_size(size*size)
+                face[1] = size
+
+            face[0].load_char(ch)
+            btm_obj = face[0].glyph.bitmap
+            metrics = face[0].glyph.metrics
+            data = np.array(btm_obj.buffer, dtype=np.uint8).reshape(btm_obj.rows, btm_obj.width)
+            glyph = (data, int(metrics.horiBearingX/64), int(metrics.horiBearingY/64), int(metrics.horiAdvance/64))
+
+            self.glyphs.update({key: glyph})
+            if len(self.glyphs) > GLYPH_CACHE:
+                self.glyphs.popitem(last=False)
+
+        return glyph
+
     def get_text_pixels(self, text, size, font_file):
         """生成文本像素数据"""
  
-        face = freetype.Face(font_file)
-        face.set_char_size(size*size)
- 
-        over, under = -1, -1
-        pixels = None
- 
+        if not text:
+            return None
+
+        # 每个字形占据一个单元格：左侧留出起始偏移，右侧留出步进宽度的余量，基线以下至少包含位图的下沿
+        cells, left = list(), 0
         for ch in text:
-            face.load_char(ch)
-            btm_obj = face.glyph.bitmap
-            w, h = btm_obj.width, btm_obj.rows
-            data = np.array(btm_obj.buffer, dtype=np.uint8).reshape(h,w)
- 
-            bx, by = int(face.glyph.metrics.horiBearingX/64), int(face.glyph.metrics.horiBearingY/64)
-            ha = int(face.glyph.metrics.horiAdvance/64)
-            sapre = ha - bx - w
-            bottom = h-by
- 
-            if bottom < 0:
-                patch = np.zeros((-bottom, data.shape[1]), dtype=np.uint8)
-                data = np.vstack((data, patch))
-                bottom = 0
- 
-            if bx > 0:
-                patch = np.zeros((data.shape[0], bx), dtype=np.uint8)
-                data = np.hstack((patch, data))
-            if sapre > 0:
-                patch = np.zeros((data.shape[0], sapre), dtype=np.uint8)
-                data = np.hstack((data, patch))
- 
-            if not isinstance(pixels, np.ndarray):
-                pixels = data
-                over, under = by, bottom
-            else:
-                if over > by:
-                    patch = np.zeros((over-by, data.shape[1]), dtype=np.uint8)
-                    data = np.vstack((patch, data))
-                elif over < by:
-                    patch = np.zeros((by-over, pixels.shape[1]), dtype=np.uint8)
-                    pixels = np.vstack((patch, pixels))
- 
-                if under > bottom:
-                    patch = np.zeros((under-bottom, data.shape[1]), dtype=np.uint8)
-                    data = np.vstack((data, patch))
-                elif under < bottom:
-                    patch = np.zeros((bottom-under, pixels.shape[1]), dtype=np.uint8)
-                    pixels = np.vstack((pixels, patch ))
- 
-                pixels = np.hstack((pixels, data))
-                over = max(over, by)
-                under = max(under, bottom)
- 
+            data, bx, by, ha = self.get_glyph(ch, size, font_file)
+            h, w = data.shape
+            cells.append((data, left + max(bx, 0), by))
+            left += max(bx, 0) + w + max(ha - bx - w, 0)
+
+        over = max([by for data, x, by in cells])
+        under = max([max(data.shape[0] - by, 0) for data, x, by in cells])
+
+        # 各字形按基线对齐写入预先分配的像素缓冲区
+        pixels = np.zeros((over + under, left), dtype=np.uint8)
+        for data, x, by in cells:
+            h, w = data.shape
+            pixels[over-by:over-by+h, x:x+w] = data
+
         return pixels
  
     def text2alpha(self, text, size, family=None, weight='normal'):
@@ -184,12 +189,11 @@ class FontManager:
             rows, cols = pixels.shape
  
             if rows == 0:
-                pixels = np.zeros((1, cols))
+                pixels = np.zeros((1, cols), dtype=np.uint8)
  
-            r = np.ones(pixels.shape)*color[0]*255
-            g = np.ones(pixels.shape)*color[1]*255
-            b = np.ones(pixels.shape)*color[2]*255
-            im = np.dstack((r,g,b,pixels)).astype(np.uint8)
+            im = np.empty((*pixels.shape, 4), dtype=np.uint8)
+            im[..., :3] = (np.array(color[:3], dtype=np.float64)*255).astype(np.uint8)
+            im[..., 3] = pixels
 
         if bg is None:
             bg = np.array([0, 0, 0, 0], dtype=np.uint8)
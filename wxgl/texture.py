@@ -1,9 +1,32 @@
 #!/usr/bin/env python3
 
 import os
+import hashlib
 import numpy as np
 from PIL import Image
 from OpenGL.GL import *
+from OpenGL import contextdata
+
+FORMATS = {                                                         # 各通道数对应的内部格式、像素格式和通道重排
+    1:  (GL_R8,     GL_RED,     (GL_RED, GL_RED, GL_RED, GL_ONE)),      # 灰度图像在着色器中仍表现为(L,L,L,1)
+    2:  (GL_RG8,    GL_RG,      (GL_RED, GL_RED, GL_RED, GL_GREEN)),    # 灰度+透明度图像表现为(L,L,L,A)
+    3:  (GL_RGB8,   GL_RGB,     None),
+    4:  (GL_RGBA8,  GL_RGBA,    None)
+}
+
+MIPMAP_FILTERS = (GL_NEAREST_MIPMAP_NEAREST, GL_LINEAR_MIPMAP_NEAREST, GL_NEAREST_MIPMAP_LINEAR, GL_LINEAR_MIPMAP_LINEAR)
+
+TEXTURES = dict()                                                   # 同一OpenGL上下文内共用的显存纹理对象：键为(上下文, 纹理资源及参数的摘要)，值为纹理对象id、引用计数、显存字节数和资源说明
+
+def texture_report():
+    """返回显存纹理对象的使用情况：(资源说明, 显存字节数, 引用计数)组成的列表，按显存字节数降序排列"""
+
+    return sorted([(item['name'], item['nbytes'], item['refs']) for item in TEXTURES.values()], key=lambda item: -item[1])
+
+def _current_context():
+    """返回当前OpenGL上下文的标识。各场景的上下文互不共享纹理对象，纹理对象id只在创建它的上下文内有效"""
+
+    return contextdata.getContext()
 
 class Texture:
     """WxGL纹理对象"""
@@ -18,7 +41,8 @@ class Texture:
             - wxgl.TEXTURE_2D_ARRAY
             - wxgl.TEXTURE_3D
         kwds            - 关键字参数
-            level           - 纹理分级数，默认1
+            level           - 纹理分级数，默认None（缩小滤波器使用mipmap时生成完整的分级，否则只有1级）
+            mipmaps         - 预先生成的第1级及以下各级纹理图像列表，默认None（由第0级自动生成）
             min_filter      - 纹理缩小滤波器
                 - GL_NEAREST
                 - GL_LINEAR
@@ -42,8 +66,12 @@ class Texture:
         self.ttype = ttype
         self.tsrc = tsrc
         self.tid = None
+        self.key = None                                                 # 纹理资源及参数的摘要
+        self.users = dict()                                             # 本实例在各上下文中持有的引用数
+        self.nbytes = 0                                                 # 显存字节数
  
-        self.level = kwds.get('level', 1)
+        self.level = kwds.get('level', None)
+        self.mipmaps = kwds.get('mipmaps', None)
         self.min_filter = kwds.get('min_filter', GL_LINEAR_MIPMAP_NEAREST)
         self.mag_filter = kwds.get('mag_filter', GL_LINEAR)
         self.s_tile = kwds.get('s_tile', GL_REPEAT)
@@ -64,48 +92,158 @@ class Texture:
         elif self.ttype == GL_TEXTURE_2D_ARRAY or self.ttype == GL_TEXTURE_3D:
             if isinstance(self.tsrc, list):
                 for fn in self.tsrc:
-                    if not os.path.isfile(path):
+                    if not os.path.isfile(fn):
                         raise ValueError('纹理资源文件不存在：%s'%fn)
             elif not isinstance(self.tsrc, np.ndarray) or self.tsrc.dtype != np.uint8 or self.tsrc.ndim not in (3, 4):
                 raise ValueError('不支持的纹理资源类型') 
  
+    def _digest(self):
+        """返回纹理资源及参数的摘要：图像文件以文件名、修改时间和长度计，数组以其内容计"""
+
+        h = hashlib.blake2b(digest_size=20)
+        for item in self.tsrc if isinstance(self.tsrc, list) else [self.tsrc]:
+            if isinstance(item, str):
+                st = os.stat(item)
+                h.update(('f%s|%d|%d'%(os.path.abspath(item), st.st_mtime_ns, st.st_size)).encode())
+
+        for item in [self.tsrc] + list(self.mipmaps or list()):
+            if isinstance(item, np.ndarray):
+                item = np.ascontiguousarray(item)
+                h.update(('a%s%s'%(item.dtype.str, item.shape)).encode())
+                h.update(item.reshape(-1).view(np.uint8))
+
+        h.update(repr((self.ttype, self.level, self.min_filter, self.mag_filter, self.s_tile, self.t_tile, self.r_tile, self.xflip, self.yflip)).encode())
+
+        return h.hexdigest()
+
     def create_texture(self):
-        """创建纹理对象"""
+        """创建纹理对象。资源和参数相同的纹理共用同一个显存纹理对象，每次调用增加一次引用"""
  
-        if self.ttype == GL_TEXTURE_1D:
-            self.tid = self._create_texture_1d()
-        elif self.ttype == GL_TEXTURE_2D:
-            self.tid = self._create_texture_2d()
-        elif self.ttype == GL_TEXTURE_2D_ARRAY:
-            self.tid = self._create_texture_2d_array()
-        elif self.ttype == GL_TEXTURE_3D:
-            self.tid = self._create_texture_3d()
- 
-    def _create_texture_1d(self):
-        """创建1D纹理对象"""
- 
-        im_w = self.tsrc.shape[0]
-        im_mode = GL_LUMINANCE if self.tsrc.ndim == 1 else (GL_RGB, GL_RGBA)[self.tsrc.shape[-1]-3]
+        if not self.users:
+            self.key = self._digest()
+
+        ctx = _current_context()
+        key = (ctx, self.key)
+        if key in TEXTURES:
+            self.tid = TEXTURES[key]['tid']
+        else:
+            if self.ttype == GL_TEXTURE_1D:
+                self.tid = self._create_texture_1d()
+            elif self.ttype == GL_TEXTURE_2D:
+                self.tid = self._create_texture_2d()
+            elif self.ttype == GL_TEXTURE_2D_ARRAY:
+                self.tid = self._create_texture_2d_array()
+            elif self.ttype == GL_TEXTURE_3D:
+                self.tid = self._create_texture_3d()
+
+            if isinstance(self.tsrc, np.ndarray):
+                name = 'array%s'%str(self.tsrc.shape)
+            elif isinstance(self.tsrc, list):
+                name = ', '.join(self.tsrc)
+            else:
+                name = self.tsrc
+
+            TEXTURES.update({key: {'tid': self.tid, 'refs': 0, 'nbytes': self.nbytes, 'name': name}})
+
+        TEXTURES[key]['refs'] += 1
+        self.users.update({ctx: self.users.get(ctx, 0) + 1})
+
+    def delete_texture(self):
+        """在当前上下文中释放一次引用，显存纹理对象的最后一个引用释放时将其删除"""
+
+        ctx = _current_context()
+        key = (ctx, self.key)
+        if self.users.get(ctx, 0) <= 0 or key not in TEXTURES:
+            return
+
+        entry = TEXTURES[key]
+        entry['refs'] -= 1
+        self.users[ctx] -= 1
+
+        if entry['refs'] <= 0:
+            glDeleteTextures(1, [entry['tid']])
+            TEXTURES.pop(key)
+        if self.users[ctx] <= 0:
+            self.users.pop(ctx)
+        if not self.users:
+            self.tid = None
  
+    def _level_size(self, size, i):
+        """返回第i级纹理的尺寸，2D纹理数组的层数不随分级缩小"""
+
+        if self.ttype == GL_TEXTURE_2D_ARRAY:
+            return tuple([max(1, n >> i) for n in size[:2]]) + size[2:]
+
+        return tuple([max(1, n >> i) for n in size])
+
+    def _create(self, im, size):
+        """以不可变存储分配纹理的全部分级，上传第0级图像（和预先生成的各级图像），再一次性生成其余各级
+
+        im          - 第0级图像，uint8类型
+        size        - 纹理尺寸：(宽,)、(宽,高)或(宽,高,层数)
+        """
+
+        channels = 1 if im.ndim == len(size) else im.shape[-1]
+        if channels not in FORMATS:
+            raise ValueError('不支持的纹理通道数：%d'%channels)
+
+        internal, fmt, swizzle = FORMATS[channels]
+        mipmaps = list(self.mipmaps or list())
+
+        if self.min_filter in MIPMAP_FILTERS:
+            levels = max(self._level_size(size, 0)[:2 if self.ttype == GL_TEXTURE_2D_ARRAY else 3]).bit_length()
+            if self.level:
+                levels = min(levels, self.level)
+            if mipmaps:
+                levels = min(levels, 1 + len(mipmaps))
+        else:
+            levels = 1
+
         tid = glGenTextures(1)
         glBindTexture(self.ttype, tid)
- 
-        if im_w%4 == 0:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
-        else:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
- 
-        for i in range(self.level):
-            glTexImage1D(self.ttype, i, GL_RGBA, im_w, 0, im_mode, GL_UNSIGNED_BYTE, self.tsrc)
- 
+
+        storage = (glTexStorage1D, glTexStorage2D, glTexStorage3D)[len(size)-1]
+        if bool(storage):
+            storage(self.ttype, levels, internal, *size)
+        else: # 不支持不可变存储（OpenGL 4.2以下）时逐级分配
+            image = (glTexImage1D, glTexImage2D, glTexImage3D)[len(size)-1]
+            for i in range(levels):
+                image(self.ttype, i, internal, *self._level_size(size, i), 0, fmt, GL_UNSIGNED_BYTE, None)
+            glTexParameteri(self.ttype, GL_TEXTURE_MAX_LEVEL, levels-1)
+
+        self.nbytes = sum([int(np.prod(self._level_size(size, i))) * channels for i in range(levels)])
+        subimage = (glTexSubImage1D, glTexSubImage2D, glTexSubImage3D)[len(size)-1]
+        for i, item in enumerate([im] + mipmaps[:levels-1]):
+            item = np.ascontiguousarray(item, dtype=np.uint8)
+            level_size = self._level_size(size, i)
+            if item.shape[:len(size)][::-1] != level_size:
+                raise ValueError('第%d级纹理图像的尺寸错误'%i)
+
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 4 if (level_size[0]*channels)%4 == 0 else 1)
+            subimage(self.ttype, i, *[0]*len(size), *level_size, fmt, GL_UNSIGNED_BYTE, item)
+
+        if swizzle:
+            glTexParameteriv(self.ttype, GL_TEXTURE_SWIZZLE_RGBA, np.array(swizzle, dtype=np.int32))
+
         glTexParameterf(self.ttype, GL_TEXTURE_MIN_FILTER, self.min_filter)
         glTexParameterf(self.ttype, GL_TEXTURE_MAG_FILTER, self.mag_filter)
         glTexParameterf(self.ttype, GL_TEXTURE_WRAP_S, self.s_tile)
- 
-        glGenerateMipmap(self.ttype)
+        if len(size) > 1:
+            glTexParameterf(self.ttype, GL_TEXTURE_WRAP_T, self.t_tile)
+        if len(size) > 2:
+            glTexParameterf(self.ttype, GL_TEXTURE_WRAP_R, self.r_tile)
+
+        if levels > 1 + len(mipmaps):
+            glGenerateMipmap(self.ttype)
+
         glBindTexture(self.ttype, 0)
- 
+
         return tid
+
+    def _create_texture_1d(self):
+        """创建1D纹理对象"""
+ 
+        return self._create(self.tsrc, self.tsrc.shape[:1])
  
     def _create_texture_2d(self):
         """创建2D纹理对象"""
@@ -115,34 +253,12 @@ class Texture:
         else:
             im = self.tsrc
         
-        im_h, im_w = im.shape[:2]
-        im_mode = GL_LUMINANCE if im.ndim == 2 else (GL_RGB, GL_RGBA)[im.shape[-1]-3]
-        
         if self.xflip:
             im = np.fliplr(im)
         if self.yflip:
             im = np.flipud(im)
         
-        tid = glGenTextures(1)
-        glBindTexture(self.ttype, tid)
-        
-        if (im.size/im_h)%4 == 0:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
-        else:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-        
-        for i in range(self.level):
-            glTexImage2D(self.ttype, i, GL_RGBA, im_w, im_h, 0, im_mode, GL_UNSIGNED_BYTE, im)
-        
-        glTexParameterf(self.ttype, GL_TEXTURE_MIN_FILTER, self.min_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_S, self.s_tile)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_T, self.t_tile)
-        
-        glGenerateMipmap(self.ttype)
-        glBindTexture(self.ttype, 0)
-        
-        return tid
+        return self._create(im, im.shape[:2][::-1])
     
     def _create_texture_2d_array(self):
         """创建2D纹理数组对象"""
@@ -152,30 +268,7 @@ class Texture:
         else:
             im = self.tsrc
  
-        im_layer, im_h, im_w = im.shape[:-1]
-        im_mode = GL_LUMINANCE if im.ndim == 3 else (GL_RGB, GL_RGBA)[im.shape[-1]-3]
- 
-        tid = glGenTextures(1)
-        glBindTexture(self.ttype, tid)
- 
-        if (im.size/(im_layer*im_h))%4 == 0:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
-        else:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
- 
-        for i in range(self.level):
-            glTexImage3D(self.ttype, i, GL_RGBA, im_w, im_h, im_layer, 0, im_mode, GL_UNSIGNED_BYTE, im)
-
-        glTexParameterf(self.ttype, GL_TEXTURE_MIN_FILTER, self.min_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_S, self.s_tile)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_T, self.t_tile)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_R, self.r_tile)
- 
-        glGenerateMipmap(self.ttype)
-        glBindTexture(self.ttype, 0)
- 
-        return tid
+        return self._create(im, im.shape[:3][::-1])
  
     def _create_texture_3d(self):
         """创建3D纹理对象"""
@@ -185,29 +278,4 @@ class Texture:
         else:
             im = self.tsrc
  
-        im_layer, im_h, im_w = im.shape[:-1]
-        im_mode = GL_LUMINANCE if im.ndim == 3 else (GL_RGB, GL_RGBA)[im.shape[-1]-3]
- 
-        tid = glGenTextures(1)
-        glBindTexture(self.ttype, tid)
- 
-        if (im.size/(im_layer*im_h))%4 == 0:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
-        else:
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
- 
-        for i in range(self.level):
-            glTexImage3D(self.ttype, i, GL_RGBA, im_w, im_h, im_layer, 0, im_mode, GL_UNSIGNED_BYTE, im)
-
-        glTexParameterf(self.ttype, GL_TEXTURE_MIN_FILTER, self.min_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_MAG_FILTER, self.mag_filter)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_S, self.s_tile)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_T, self.t_tile)
-        glTexParameterf(self.ttype, GL_TEXTURE_WRAP_R, self.r_tile)
- 
-        glGenerateMipmap(self.ttype)
-        glBindTexture(self.ttype, 0)
- 
-        return tid
-
-    
+        return self._create(im, im.shape[:3][::-1])
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import math
+from functools import lru_cache
 import numpy as np
 np.seterr(invalid='ignore')
 
@@ -7,6 +9,7 @@ from OpenGL.GL import *
 from . color import ColorManager
 from . text import FontManager
 from . pointcloud import PointCloudData
+from . octree import OctreeBuilder
 
 CM = ColorManager()
 FM = FontManager()
@@ -54,10 +57,95 @@ def get_cm_colors(cm):
 
     return CM.get_cm_colors(cm)
 
-def read_pcfile(pcfile):
-    """读点云文件，支持.ply和.pcd格式"""
+def read_pcfile(pcfile, subset=None, rows=None):
+    """读点云文件，支持.ply、.pcd和.las格式，以及.obj和.stl格式的网格文件
 
-    return PointCloudData(pcfile)
+    pcfile      - 点云数据文件名
+    subset      - 只读取的字段名列表，默认None（读取全部字段）
+    rows        - 只读取的行（点）范围：(start, stop)元组，默认None（读取全部行）
+    """
+
+    return PointCloudData(pcfile, subset=subset, rows=rows)
+
+def build_octree(pcfile, outdir, capacity=32768, cm='viridis'):
+    """点云文件预处理为磁盘上分层分块存储的八叉树，返回索引文件名
+
+    pcfile      - 点云文件，支持.ply、.pcd和.las格式
+    outdir      - 输出目录，Scheme.pointcloud可直接绘制该目录
+    capacity    - 每个节点的最大点数
+    cm          - 调色板。若文件无颜色数据但包含强度数据，则使用调色板将强度映射为颜色
+    """
+
+    return OctreeBuilder(capacity=capacity).build(pcfile, outdir, lambda data, drange: cmap(data, cm, drange=drange))
+
+def voxel_downsample(vs, voxel, *attrs, mode='mean'):
+    """体素网格降采样，返回降采样后的顶点集和逐点数据组成的元组
+
+    vs          - 顶点集：numpy数组，shape=(n,2|3)
+    voxel       - 体素边长
+    attrs       - 逐点数据（如颜色、强度），第一维长度为n的numpy数组，None表示无此数据
+    mode        - 'mean'：每个体素内的点及其数据取均值（默认），'first'：每个体素保留第一个点
+    """
+
+    vs = np.asarray(vs)
+    n = vs.shape[0]
+    if n == 0:
+        return (vs, *attrs)
+
+    # 体素的整数坐标按行优先合并为一个整数键，再压缩为连续的体素序号
+    q = np.int64((vs - vs.min(axis=0)) / voxel)
+    dims = q.max(axis=0) + 1
+    if np.prod(np.float64(dims)) <= max(4*n, 1<<20): # 体素网格不太稀疏时以计数代替排序
+        key = np.ravel_multi_index(q.T, dims)
+        inv = (np.cumsum(np.bincount(key, minlength=np.prod(dims)) > 0) - 1)[key]
+    else:
+        inv = np.unique(q, axis=0, return_inverse=True)[1].ravel()
+
+    m = inv.max() + 1
+    if mode == 'first':
+        pick = np.full(m, n)
+        np.minimum.at(pick, inv, np.arange(n))
+        pick.sort()
+        return (vs[pick], *[None if a is None else np.asarray(a)[pick] for a in attrs])
+    elif mode != 'mean':
+        raise ValueError('不支持的降采样方式：%s'%mode)
+
+    counts = np.bincount(inv, minlength=m)
+
+    def mean(a):
+        if a is None:
+            return None
+
+        a = np.asarray(a)
+        cols = a.reshape(n, -1)
+        r = np.stack([np.bincount(inv, weights=cols[:,j], minlength=m) for j in range(cols.shape[1])], axis=1) / counts[:,None]
+        r = r.reshape(m, *a.shape[1:])
+        return np.round(r).astype(a.dtype) if np.issubdtype(a.dtype, np.integer) else r.astype(a.dtype)
+
+    return (mean(vs), *[mean(a) for a in attrs])
+
+def random_downsample(vs, k, *attrs, stride=False):
+    """随机或等间隔降采样，返回保持原有顺序的顶点集和逐点数据组成的元组
+
+    vs          - 顶点集：numpy数组，shape=(n,2|3)
+    k           - 目标点数，不小于n时不降采样
+    attrs       - 逐点数据（如颜色、强度），第一维长度为n的numpy数组，None表示无此数据
+    stride      - 等间隔抽取，默认False（随机抽取）
+    """
+
+    if k >= len(vs):
+        return (vs, *attrs)
+
+    pick = _sample_indices(len(vs), k, stride)
+    return (vs[pick], *[None if a is None else a[pick] for a in attrs])
+
+def _sample_indices(n, k, stride=False):
+    """从n个点中随机或等间隔抽取k个点，返回升序排列的序号（顺序访问对内存映射文件友好）"""
+
+    if stride:
+        return np.int64(np.arange(k) * (n / k))
+
+    return np.sort(np.random.default_rng().choice(n, k, replace=False, shuffle=False))
 
 def text2img(text, size, color, bg=None, padding=0, family=None, weight='normal'):
     """文本转图像，返回图像数据和size元组
@@ -76,29 +164,40 @@ def text2img(text, size, color, bg=None, padding=0, family=None, weight='normal'
 def y2v(v):
     """返回y轴正方向到向量v的旋转矩阵"""
  
+    return y2v_batch(np.reshape(v, (1,3)))[0]
+
+def y2v_batch(vs):
+    """返回y轴正方向到各向量的旋转矩阵集，shape=(n,3,3)
+
+    vs          - 向量集：元组、列表或numpy数组，shape=(n,3)
+    """
+ 
     # *** 右手坐标系旋转矩阵 ***
     # r_x = np.array([[1, 0, 0], [0, np.cos(), np.sin()], [0, -np.sin(), np.cos()]])
     # r_y = np.array([[np.cos(), 0, -np.sin()], [0, 1, 0], [np.sin(), 0, np.cos()]])
     # r_z = np.array([[np.cos(), np.sin(), 0], [-np.sin(), np.cos, 0], [0, 0, 1]])
+    # 结果矩阵为r_y(-a_y)·r_z(a_z)·r_y(a_y)
  
-    h =  np.linalg.norm(v)
-    a_z = -np.arccos(v[1]/h)
- 
-    if v[0] == 0:
-        if v[2] == 0:
-            a_y = 0
-        elif v[2] > 0:
-            a_y = -np.pi/2
-        else:
-            a_y = np.pi/2
-    else:
-        a_y = np.arctan(-v[2]/v[0]) + (np.pi if v[0] < 0 else 0)
- 
-    r_y_0 = np.array([[np.cos(-a_y), 0, -np.sin(-a_y)], [0, 1, 0], [np.sin(-a_y), 0, np.cos(-a_y)]])
-    r_z = np.array([[np.cos(a_z), np.sin(a_z), 0], [-np.sin(a_z), np.cos(a_z), 0], [0, 0, 1]])
-    r_y = np.array([[np.cos(a_y), 0, -np.sin(a_y)], [0, 1, 0], [np.sin(a_y), 0, np.cos(a_y)]])
+    vs = np.array(vs, dtype=np.float64).reshape(-1, 3)
+    h = np.linalg.norm(vs, axis=1)
+    a_z = -np.arccos(np.clip(vs[:,1]/h, -1, 1))
+    a_y = np.arctan2(-vs[:,2], vs[:,0])
+
+    cz, sz = np.cos(a_z), np.sin(a_z)
+    cy, sy = np.cos(a_y), np.sin(a_y)
+
+    m = np.empty((vs.shape[0], 3, 3))
+    m[:,0,0] = cy*cz*cy + sy*sy
+    m[:,0,1] = cy*sz
+    m[:,0,2] = -cy*cz*sy + sy*cy
+    m[:,1,0] = -sz*cy
+    m[:,1,1] = cz
+    m[:,1,2] = sz*sy
+    m[:,2,0] = -sy*cz*cy + cy*sy
+    m[:,2,1] = -sy*sz
+    m[:,2,2] = sy*cz*sy + cy*cy
  
-    return np.dot(r_y_0, np.dot(r_z, r_y))
+    return m
 
 def rotate(axis_angle):
     """返回旋转矩阵
@@ -106,19 +205,27 @@ def rotate(axis_angle):
     axis_angle  - 轴角，由旋转向量和旋转角度组成的元组、列表或numpy数组。旋转方向使用右手定则
     """
  
-    v, a = np.array(axis_angle[:3]), np.radians(-axis_angle[3]), 
-    v = v/np.linalg.norm(v)
-    x, y, z = v
+    return rotate_batch(np.reshape(np.array(axis_angle, dtype=np.float64)[:4], (1,4)))[0]
+
+def rotate_batch(axis_angles):
+    """返回旋转矩阵集，shape=(n,4,4)
  
-    # 轴角转旋转矩阵
-    m = np.array([
-		[np.cos(a)+x*x*(1-np.cos(a)), -z*np.sin(a)+x*y*(1-np.cos(a)), y*np.sin(a)+x*z*(1-np.cos(a))],
-		[z*np.sin(a)+x*y*(1-np.cos(a)), np.cos(a)+y*y*(1-np.cos(a)), -x*np.sin(a)+y*z*(1-np.cos(a))],
-		[-y*np.sin(a)+x*z*(1-np.cos(a)), x*np.sin(a)+y*z*(1-np.cos(a)), np.cos(a)+z*z*(1-np.cos(a))]
-    ])
+    axis_angles - 轴角集：由旋转向量和旋转角度组成的numpy数组，shape=(n,4)。旋转方向使用右手定则
+    """
+ 
+    axis_angles = np.array(axis_angles, dtype=np.float64).reshape(-1, 4)
+    v = axis_angles[:,:3] / np.linalg.norm(axis_angles[:,:3], axis=1, keepdims=True)
+    x, y, z = v[:,0], v[:,1], v[:,2]
+    a = np.radians(-axis_angles[:,3])
+    c, s = np.cos(a), np.sin(a)
+    t = 1 - c
  
-    m = np.hstack((m, np.array([[0.0], [0.0], [0.0]])))
-    m = np.vstack((m, np.array([0.0, 0.0, 0.0, 1.0])))
+    # 轴角转旋转矩阵
+    m = np.zeros((axis_angles.shape[0], 4, 4))
+    m[:,0,0], m[:,0,1], m[:,0,2] = c+x*x*t, -z*s+x*y*t, y*s+x*z*t
+    m[:,1,0], m[:,1,1], m[:,1,2] = z*s+x*y*t, c+y*y*t, -x*s+y*z*t
+    m[:,2,0], m[:,2,1], m[:,2,2] = -y*s+x*z*t, x*s+y*z*t, c+z*z*t
+    m[:,3,3] = 1
  
     return np.float32(m)
  
@@ -128,9 +235,17 @@ def translate(shift):
     shift       - 由xyz轴偏移量组成的元组、列表或numpy数组
     """
  
-    v = np.array(shift).reshape(3,1)
-    m = np.eye(4)
-    m[3] += np.sum((m[:3] * v), axis=0)
+    return translate_batch(np.reshape(shift, (1,3)))[0]
+
+def translate_batch(shifts):
+    """返回平移矩阵集，shape=(n,4,4)
+ 
+    shifts      - 偏移量集：numpy数组，shape=(n,3)
+    """
+ 
+    shifts = np.array(shifts, dtype=np.float64).reshape(-1, 3)
+    m = np.tile(np.eye(4), (shifts.shape[0], 1, 1))
+    m[:,3,:3] = shifts
  
     return np.float32(m)
  
@@ -140,9 +255,17 @@ def scale(k):
     k           - 缩放系数
     """
  
-    v = np.array([k, k, k]).reshape(3,1)
-    m = np.eye(4)
-    m[:3] *= v
+    return scale_batch(np.reshape(k, (1,)))[0]
+
+def scale_batch(ks):
+    """返回缩放矩阵集，shape=(n,4,4)
+ 
+    ks          - 缩放系数集：numpy数组，shape=(n,)
+    """
+ 
+    ks = np.array(ks, dtype=np.float64).ravel()
+    m = np.tile(np.eye(4), (ks.shape[0], 1, 1))
+    m[:,0,0] = m[:,1,1] = m[:,2,2] = ks
  
     return np.float32(m)
 
@@ -152,17 +275,109 @@ def model_matrix(*args):
     args        - 旋转（4元组）、平移（3元组）、缩放（数值型）参数
     """
  
-    m = np.eye(4)
+    return model_matrix_batch(*[np.array(item, dtype=np.float64)[np.newaxis] for item in args])[0]
+
+def model_matrix_batch(*args):
+    """返回模型矩阵集，shape=(n,4,4)
+    
+    args        - 旋转（shape=(n,4)）、平移（shape=(n,3)）、缩放（shape=(n,)或(n,1)）参数集，
+                  也可以是单个旋转（4元组）、平移（3元组）、缩放（数值型）参数，对所有模型矩阵生效。
+                  n为3或4时，缩放参数集须使用shape=(n,1)，以免与单个平移或旋转参数混淆
+    """
+ 
+    mats = list()
     for item in args:
-        if isinstance(item, (int, float)):
-            m = np.dot(m, scale(item))
-        elif len(item) == 3:
-            m = np.dot(m, translate(item))
+        item = np.array(item, dtype=np.float64)
+        if item.ndim == 0 or item.ndim == 1 and item.shape[0] not in (3,4) or item.ndim == 2 and item.shape[1] == 1:
+            mats.append(scale_batch(item))
+        elif item.shape[-1] == 3:
+            mats.append(translate_batch(item))
         else:
-            m = np.dot(m, rotate(item))
+            mats.append(rotate_batch(item))
  
-    return np.float32(m)
+    n = max([item.shape[0] for item in mats] + [1])
+    m = np.tile(np.eye(4, dtype=np.float32), (n, 1, 1))
+    for item in mats:
+        m = np.matmul(m, item)
  
+    return m
+ 
+class CompiledTransform:
+    """编译后的模型几何变换
+
+    同一时间戳或相同变换参数直接返回上次的结果，否则按model_matrix的规则逐项识别旋转、平移、缩放，
+    模型矩阵以纯数值运算合成后写入预分配的float32矩阵。
+    """
+
+    def __init__(self, func):
+        """构造函数
+
+        func        - 以累计渲染时长（毫秒）为参数、返回由旋转（4元组）、平移（3元组）、缩放（数值型）组成的变换序列的函数
+        """
+
+        self.func = func
+        self.matrix = np.eye(4, dtype=np.float32)       # 模型矩阵（原地更新）
+        self.kinds = None                               # 变换序列结构：1-缩放，3-平移，4-旋转
+        self.t = None                                   # 上次计算的时间戳
+        self.args = None                                # 上次计算的变换参数
+
+    def _parse(self, args):
+        """解析变换序列，返回各项展平后的参数（缩放为浮点数，平移和旋转为浮点数元组），并更新变换序列结构
+
+        与model_matrix的规则一致：只含一个数值的项（包括0维数组和单元素列表）为缩放，3个数值为平移，4个数值为旋转
+        """
+
+        values, kinds = list(), list()
+        for item in args:
+            v = np.array(item, dtype=np.float64).ravel().tolist()
+            if len(v) not in (1, 3, 4):
+                raise ValueError('不支持的变换参数：%r'%(item,))
+
+            values.append(v[0] if len(v) == 1 else tuple(v))
+            kinds.append(len(v))
+
+        self.kinds = tuple(kinds) # 同一函数各时刻返回的序列结构可以不同，每次调用都按实际参数识别
+        return tuple(values)
+
+    def __call__(self, t):
+        """返回t时刻的模型矩阵"""
+
+        if t == self.t:
+            return self.matrix
+
+        self.t = t
+        args = self._parse(self.func(t))
+
+        if args == self.args:
+            return self.matrix
+        self.args = args
+
+        # 行向量约定：M = M_1·M_2·…·M_n，线性部分l为3x3，平移部分s为末行
+        l = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0]
+        s = [0.0, 0.0, 0.0]
+        for item, kind in zip(args, self.kinds):
+            if kind == 1:
+                l = [v * item for v in l]
+                s = [v * item for v in s]
+            elif kind == 3:
+                s = [s[0] + item[0], s[1] + item[1], s[2] + item[2]]
+            else:
+                h = math.sqrt(item[0]*item[0] + item[1]*item[1] + item[2]*item[2])
+                x, y, z = item[0]/h, item[1]/h, item[2]/h
+                a = math.radians(-item[3])
+                c, sn = math.cos(a), math.sin(a)
+                k = 1 - c
+                r = [c+x*x*k, -z*sn+x*y*k, y*sn+x*z*k,
+                    z*sn+x*y*k, c+y*y*k, -x*sn+y*z*k,
+                    -y*sn+x*z*k, x*sn+y*z*k, c+z*z*k]
+                l = [l[i]*r[j] + l[i+1]*r[j+3] + l[i+2]*r[j+6] for i in (0, 3, 6) for j in (0, 1, 2)]
+                s = [s[0]*r[j] + s[1]*r[j+3] + s[2]*r[j+6] for j in (0, 1, 2)]
+
+        self.matrix[:3,:3] = (l[0:3], l[3:6], l[6:9])
+        self.matrix[3,:3] = s
+
+        return self.matrix
+
 def view_matrix(cam, up, oecs):
     """返回视点矩阵
  
@@ -267,15 +482,470 @@ def get_normal(gltype, vs, indices=None):
     if indices is None and (gltype == GL_TRIANGLES or gltype == GL_QUADS):
         return normal
  
-    result = np.zeros((n,3), dtype=np.float32)
-    idx_arg = np.argsort(idx)
-    rise = np.where(np.diff(idx[idx_arg])==1)[0]+1
-    rise = np.hstack((0,rise,len(idx)))
+    result = np.empty((n,3), dtype=np.float32)
+    for i in range(3):
+        result[:,i] = np.bincount(idx, weights=normal[:,i], minlength=n)[:n]
  
-    for i in range(n):
-        result[i] = np.sum(normal[idx_arg[rise[i]:rise[i+1]]], axis=0)
     return result
 
+@lru_cache(maxsize=64)
+def _grid_indices(rows, cols, gltype, ccw=True):
+    """返回网格面的顶点索引（只读）
+
+    rows/cols   - 网格行数和列数
+    gltype      - GL_TRIANGLES或GL_QUADS
+    ccw         - 顶点逆时针排序的面为正面
+    """
+
+    idx = np.arange(rows*cols).reshape(rows, cols)
+    idx_a, idx_b, idx_c, idx_d = idx[:-1,:-1], idx[1:,:-1], idx[:-1, 1:], idx[1:,1:]
+    if ccw:
+        if gltype == GL_QUADS:
+            indices = np.int32(np.dstack((idx_a, idx_b, idx_d, idx_c)).ravel())
+        else:
+            indices = np.int32(np.dstack((idx_a, idx_b, idx_c, idx_c, idx_b, idx_d)).ravel())
+    else:
+        if gltype == GL_QUADS:
+            indices = np.int32(np.dstack((idx_a, idx_c, idx_d, idx_b)).ravel())
+        else:
+            indices = np.int32(np.dstack((idx_a, idx_c, idx_b, idx_b, idx_c, idx_d)).ravel())
+
+    return _readonly(indices)[0]
+
+@lru_cache(maxsize=32)
+def _patch_indices(rows, cols, ccw=True):
+    """返回网格面的双三次曲面片顶点索引（只读），每个网格单元16个控制点，边界外的控制点取边界顶点
+
+    rows/cols   - 网格行数和列数
+    ccw         - 顶点逆时针排序的面为正面
+    """
+
+    idx = np.arange(rows*cols).reshape(rows, cols)
+    r = np.clip(np.arange(-1, rows+1), 0, rows-1)
+    c = np.clip(np.arange(-1, cols+1), 0, cols-1)
+    patches = np.lib.stride_tricks.sliding_window_view(idx[r][:,c], (4,4)) # shape=(rows-1,cols-1,4,4)
+
+    # 控制点按v、u两个方向排列，ccw时u沿网格的行序、v沿网格的列序，(u,v)域内逆时针的三角形恰为网格面的正面
+    if ccw:
+        patches = patches.swapaxes(2, 3)
+
+    return _readonly(np.int32(patches.ravel()))[0]
+
+def _mesh_topology(vs, gltype, ccw=True):
+    """返回网格面的顶点索引和法向量，首尾重合的行列以及退化为一点的行列共享法向量
+
+    vs          - 网格顶点集：numpy数组，shape=(m,n,3)，m为网格行数，n为网格列数
+    gltype      - GL_TRIANGLES或GL_QUADS
+    ccw         - 顶点逆时针排序的面为正面
+    """
+
+    rows, cols = vs.shape[:2]
+    indices = _grid_indices(rows, cols, gltype, ccw)
+    normal = get_normal(gltype, vs, indices).reshape(rows, cols, -1)
+
+    if (np.absolute(vs[0] - vs[-1]) < 1e-10).all(): # 首行尾行顶点重合
+        normal[0] += normal[-1]
+        normal[-1] = normal[0]
+
+    if (np.absolute(vs[:,0] - vs[:,-1]) < 1e-10).all(): # 首列尾列顶点重合
+        normal[:,0] += normal[:,-1]
+        normal[:,-1] = normal[:,0]
+
+    if (np.absolute(vs[0] - vs[0,0]) < 1e-10).all(): # 首行顶点重合
+        normal[0] = normal[0,0]
+
+    if (np.absolute(vs[-1] - vs[-1,0]) < 1e-10).all(): # 尾行顶点重合
+        normal[-1] = normal[-1,0]
+
+    if (np.absolute(vs[:,0] - vs[0,0]) < 1e-10).all(): # 首列顶点重合
+        normal[:,0] = normal[0,0]
+
+    if (np.absolute(vs[:,-1] - vs[-1,0]) < 1e-10).all(): # 尾列顶点重合
+        normal[:,-1] = normal[0,-1]
+
+    return indices, normal
+
+def _readonly(*arrays):
+    """将缓存的数组设为只读，防止调用者意外修改模板"""
+
+    for item in arrays:
+        item.flags.writeable = False
+
+    return arrays
+
+@lru_cache(maxsize=64)
+def _unit_arc(arc, cell):
+    """返回单位圆弧模板：xz平面上逆时针排列的顶点集，shape=(n,3)
+
+    arc         - 弧度角范围：元组，单位为度
+    cell        - 圆周分片精度：单位为度
+    """
+
+    arc_0, arc_1, cell = np.radians(arc[0]), np.radians(arc[1]), np.radians(cell)
+    slices = int(abs(arc_0-arc_1)/cell) + 1
+
+    theta = np.linspace(arc_0, arc_1, slices)
+    vs = np.stack((np.cos(theta), np.zeros_like(theta), -np.sin(theta)), axis=1)
+
+    return _readonly(vs)[0]
+
+@lru_cache(maxsize=64)
+def _unit_cylinder(arc, cell):
+    """返回单位圆柱模板：顶点集、法向量、顶点索引（GL_TRIANGLES）和纹理坐标，顶点集shape=(2*n,3)
+
+    单位圆柱的半径和高均为1，首行端面位于y=1，尾行端面位于y=0。
+
+    arc         - 弧度角范围：元组，单位为度
+    cell        - 圆周分片精度：单位为度
+    """
+
+    ring = _unit_arc(arc, cell)
+    vs = np.stack((ring + (0,1,0), ring), axis=0)
+    indices, normal = _mesh_topology(vs, GL_TRIANGLES, ccw=True)
+
+    u, v = np.linspace(0, 1, ring.shape[0]), np.linspace(0, 1, 2)
+    texcoord = np.float32(np.dstack(np.meshgrid(u, v)).reshape(-1, 2))
+
+    return _readonly(vs.reshape(-1, 3), normal.reshape(-1, 3), indices, texcoord)
+
+@lru_cache(maxsize=64)
+def _unit_sphere(uarc, varc, cell):
+    """返回单位球模板：顶点集、法向量、顶点索引（GL_QUADS）和纹理坐标，顶点集shape=(m*n,3)
+
+    uarc        - u方向范围：元组，单位为度
+    varc        - v方向范围：元组，单位为度
+    cell        - 网格精度：单位为度
+    """
+
+    u0, u1 = np.radians(uarc[0]), np.radians(uarc[1])
+    v0, v1 = np.radians(varc[1]), np.radians(varc[0])
+    cell = np.radians(cell)
+    ulen, vlen = int(abs(u0-u1)/cell)+1, int(abs(v0-v1)/cell)+1
+    gv, gu = np.mgrid[v0:v1:complex(0,vlen), u0:u1:complex(0,ulen)]
+
+    vs = np.dstack((np.cos(gv)*np.cos(gu), np.sin(gv), -np.cos(gv)*np.sin(gu)))
+    indices, normal = _mesh_topology(vs, GL_QUADS, ccw=True)
+
+    u, v = np.linspace(0, 1, ulen), np.linspace(0, 1, vlen)
+    texcoord = np.float32(np.dstack(np.meshgrid(u, v)).reshape(-1, 2))
+
+    return _readonly(vs.reshape(-1, 3), normal.reshape(-1, 3), indices, texcoord)
+
+@lru_cache(maxsize=64)
+def _unit_torus(uarc, varc, cell):
+    """返回球环模板：环方向单位向量、法向量、顶点索引（GL_TRIANGLES）和纹理坐标，顶点集shape=(m*n,3)
+
+    球环顶点为r2*环方向单位向量+r1*法向量，法向量与半径无关。
+
+    uarc        - u方向范围：元组，单位为度
+    varc        - v方向范围：元组，单位为度
+    cell        - 圆周分片精度：单位为度
+    """
+
+    u_0, u_1 = np.radians(uarc[0]), np.radians(uarc[1])
+    v_0, v_1 = np.radians(varc[1]), np.radians(varc[0])
+    cell = np.radians(cell)
+    u_slices, v_slices = round(abs(u_0-u_1)/cell), round(abs(v_0-v_1)/cell)
+    gv, gu = np.mgrid[v_0:v_1:complex(0,v_slices), u_0:u_1:complex(0,u_slices)]
+
+    ring = np.dstack((np.cos(gu), np.zeros_like(gu), -np.sin(gu))).reshape(-1, 3)
+    normal = np.dstack((np.cos(gv)*np.cos(gu), np.sin(gv), -np.cos(gv)*np.sin(gu))).reshape(-1, 3)
+    indices = _grid_indices(v_slices, u_slices, GL_TRIANGLES, True)
+
+    u, v = np.linspace(0, 1, u_slices), np.linspace(0, 1, v_slices)
+    texcoord = np.float32(np.dstack(np.meshgrid(u, v)).reshape(-1, 2))
+
+    return _readonly(ring, normal, indices, texcoord)
+
+def transport_frames(vs):
+    """返回中心线各顶点处的单位切向量和旋转最小化（平行移动）标架的单位法向量
+
+    vs          - 中心线顶点集：numpy数组，shape=(n,3)，相邻顶点不可重合
+
+    先为每个顶点构造任意的参考标架，再将前一参考法向量沿最小旋转转到当前切向量，
+    求出与当前参考标架的夹角，累加后即得平行移动的扭转角。首尾重合的闭合曲线，剩余扭转角按弧长均匀分摊。
+    """
+
+    def normalize(v):
+        return v / np.maximum(np.linalg.norm(v, axis=-1, keepdims=True), 1e-30)
+
+    vs = np.array(vs, dtype=np.float64)
+    seg = np.diff(vs, axis=0)
+    length = np.linalg.norm(seg, axis=1)
+    seg = normalize(seg)
+    closed = vs.shape[0] > 2 and np.allclose(vs[0], vs[-1])
+
+    t = np.empty_like(vs)
+    t[0], t[-1] = seg[0], seg[-1]
+    t[1:-1] = seg[:-1] + seg[1:]
+    if closed:
+        t[0] = t[-1] = seg[0] + seg[-1]
+    reverse = np.linalg.norm(t, axis=1) < 1e-10 # 折返点
+    t[1:-1][reverse[1:-1]] = seg[1:][reverse[1:-1]]
+    t = normalize(t)
+
+    ref = np.eye(3)[np.argmin(np.absolute(t), axis=1)]
+    u = normalize(np.cross(t, ref))
+    v = np.cross(t, u)
+
+    t0, t1, x = t[:-1], t[1:], u[:-1]
+    k = np.cross(t0, t1)
+    c = np.sum(t0 * t1, axis=1, keepdims=True)
+    rx = x * c + np.cross(k, x) + k * np.sum(k * x, axis=1, keepdims=True) / np.maximum(1 + c, 1e-10)
+    phi = np.hstack((0, np.cumsum(np.arctan2(np.sum(rx * v[1:], axis=1), np.sum(rx * u[1:], axis=1)))))
+
+    if closed:
+        residual = (phi[-1] + np.pi) % (2 * np.pi) - np.pi
+        phi -= residual * np.hstack((0, np.cumsum(length))) / np.sum(length)
+
+    return np.float32(t), np.float32(np.cos(phi)[:,np.newaxis] * u + np.sin(phi)[:,np.newaxis] * v)
+
+def _face_quadrics(vs, faces):
+    """返回每个三角面的面积加权二次误差矩阵（对称4x4矩阵的10个独立元素），shape=(10,m)"""
+
+    normal = np.cross(vs[faces[:,1]]-vs[faces[:,0]], vs[faces[:,2]]-vs[faces[:,0]])
+    area = np.linalg.norm(normal, axis=1)
+    normal = normal / np.maximum(area, 1e-30)[:,np.newaxis]
+    d = -np.sum(normal * vs[faces[:,0]], axis=1)
+    a, b, c = normal[:,0], normal[:,1], normal[:,2]
+    w = 0.5 * area
+
+    return w * np.stack((a*a, a*b, a*c, a*d, b*b, b*c, b*d, c*c, c*d, d*d), axis=0)
+
+def _edge_cost(q, p, d):
+    """返回折叠点在线段p→p+d上移动时，二次误差矩阵q（shape=(10,n)）下的最小误差及其位置参数t（0~1）
+
+    误差是t的二次函数f+2gt+ht²，取其在[0,1]上的最小值
+    """
+
+    x, y, z = p[:,0], p[:,1], p[:,2]
+    dx, dy, dz = d[:,0], d[:,1], d[:,2]
+    ux = q[0]*x + q[1]*y + q[2]*z + q[3]
+    uy = q[1]*x + q[4]*y + q[5]*z + q[6]
+    uz = q[2]*x + q[5]*y + q[7]*z + q[8]
+    f = x*ux + y*uy + z*uz + q[3]*x + q[6]*y + q[8]*z + q[9]
+    g = ux*dx + uy*dy + uz*dz
+    h = (q[0]*dx + 2*(q[1]*dy + q[2]*dz))*dx + (q[4]*dy + 2*q[5]*dz)*dy + q[7]*dz*dz
+    t = np.clip(-g / np.maximum(h, 1e-300), 0, 1)
+
+    return f + t*(2*g + t*h), t
+
+def simplify(vs, indices, target=0.5, attrs=None):
+    """基于二次误差度量（QEM）的三角网格简化，返回简化后的顶点集、顶点索引和逐顶点数据列表
+
+    vs          - 顶点集：numpy数组，shape=(n,3)
+    indices     - 三角面顶点索引：numpy数组，shape=(m*3,)或(m,3)
+    target      - 目标三角面数量（整型），或者目标三角面数量与原三角面数量之比（0~1之间的浮点型）
+    attrs       - 随顶点一起插值的逐顶点数据（如颜色、纹理坐标、法向量等）组成的列表，默认None
+
+    每一轮迭代中，按误差由低到高选出互不共享顶点的边（匹配）同时折叠，每轮最多可减少约一半的三角面，
+    简化至十分之一通常只需5轮左右。折叠点取边上误差最小的位置。边界和非流形边上的顶点保持不动。
+    同时折叠的边可能共用三角面，三角面翻转或不满足连接条件（折叠后出现非流形边或重叠面）时拒绝相关的折叠，
+    并重新检验受其影响的折叠，直至全部通过。纯numpy实现，单核每秒约简化18~22万个三角面（百万三角面简化至十万约需4.5秒，
+    五百万至五十万约需28秒）。
+    """
+
+    vs = np.array(vs, dtype=np.float64).reshape(-1, 3)
+    faces = np.array(indices, dtype=np.int32).reshape(-1, 3)
+    attrs = [np.array(item, dtype=np.float64).reshape(vs.shape[0], -1) for item in (attrs or [])]
+    n = vs.shape[0]
+
+    if isinstance(target, float):
+        target = int(faces.shape[0] * target)
+    faces = faces[(faces[:,0]!=faces[:,1]) & (faces[:,1]!=faces[:,2]) & (faces[:,2]!=faces[:,0])]
+
+    q = _face_quadrics(vs, faces)
+    Q = np.zeros((10, n))
+    for j in range(3):
+        for i in range(10):
+            Q[i] += np.bincount(faces[:,j], weights=q[i], minlength=n)
+
+    def edge_keys(e):
+        return np.minimum(e[:,0], e[:,1]).astype(np.int64) * n + np.maximum(e[:,0], e[:,1])
+
+    e = faces[:,[0,1,1,2,2,0]].reshape(-1, 2)
+    keys, counts = np.unique(edge_keys(e), return_counts=True)
+    locked = np.zeros(n, dtype=bool)
+    locked[keys[counts!=2] // n] = True
+    locked[keys[counts!=2] % n] = True
+    rs = np.random.RandomState(0)
+
+    while faces.shape[0] > target:
+        # 流形上的内部边恰好对应一条起点序号小于终点序号的半边，边界边的顶点已锁定，无需去重
+        e = faces[:,[0,1,1,2,2,0]].reshape(-1, 2)
+        e = e[(e[:,0] < e[:,1]) & ~locked[e[:,0]] & ~locked[e[:,1]]]
+        a, b = e[:,0], e[:,1]
+        if a.size == 0:
+            break
+
+        qe = np.take(Q, a, axis=1)
+        qe += np.take(Q, b, axis=1)
+        pa = np.take(vs, a, axis=0)
+        cost, t = _edge_cost(qe, pa, np.take(vs, b, axis=0) - pa)
+
+        # 按误差分为16档，档内随机排序：误差相近的边首尾相连时，严格按误差排序会使每轮匹配只能选出少量边
+        tier = np.searchsorted(np.quantile(cost, np.linspace(0, 1, 17)[1:-1]), cost).astype(np.uint8)
+        order = rs.permutation(a.size)
+        order = order[np.argsort(tier[order], kind='stable')]
+        a, b, t = a[order], b[order], t[order]
+
+        # 分轮握手匹配：一条边若是其两个端点上序号最小的可用边即被选中，选中边的端点不再参与后续各轮
+        rank = np.arange(a.size, dtype=np.int32)
+        fa = np.empty(n, dtype=np.int32)
+        fb = np.empty(n, dtype=np.int32)
+        used = np.zeros(n, dtype=bool)
+        chosen, total = list(), 0
+        while rank.size:
+            fa[:], fb[:] = a.size, a.size
+            ra, rb = a[rank], b[rank]
+            fa[ra[::-1]] = rank[::-1]
+            fb[rb[::-1]] = rank[::-1]
+            first = np.minimum(fa, fb)
+            win = rank[(first[ra] == rank) & (first[rb] == rank)]
+            chosen.append(win)
+            total += win.size
+            used[a[win]] = True
+            used[b[win]] = True
+            rank = rank[~used[ra] & ~used[rb]]
+            if win.size * 50 < total:
+                break
+
+        # 每次折叠减少两个三角面。多选一些候选，检验通过后再截取所需的数量
+        needed = (faces.shape[0] - target + 1) // 2
+        chosen = np.sort(np.concatenate(chosen))[:needed + needed//8 + 16]
+        ca, cb = a[chosen], b[chosen]
+        k = chosen.size
+        moved = vs[ca] + t[chosen,np.newaxis] * (vs[cb] - vs[ca])
+
+        # 受折叠影响的三角面及其各顶点所属的折叠（k表示不属于任何折叠）
+        owner = np.full(n, k, dtype=np.int32)
+        owner[ca] = np.arange(k)
+        owner[cb] = np.arange(k)
+        fo = np.take(owner, faces)
+        touched = np.flatnonzero((fo < k).any(axis=1))
+        tf, to = faces[touched], fo[touched]
+        n_old = np.cross(vs[tf[:,1]]-vs[tf[:,0]], vs[tf[:,2]]-vs[tf[:,0]])
+
+        keep = np.ones(k+1, dtype=bool)
+        check = keep.copy()
+        check[k] = False
+        sub = np.arange(tf.shape[0])
+        while True:
+            act = keep[:k]
+            remap = np.arange(n, dtype=np.int32)
+            remap[cb[act]] = ca[act]
+            pos = vs.copy()
+            pos[ca[act]] = moved[act]
+            nf = np.take(remap, tf[sub])
+
+            # 拒绝导致三角面翻转或法向偏转超过60°的折叠
+            alive = (nf[:,0]!=nf[:,1]) & (nf[:,1]!=nf[:,2]) & (nf[:,2]!=nf[:,0])
+            no = n_old[sub]
+            nn = np.cross(pos[nf[:,1]]-pos[nf[:,0]], pos[nf[:,2]]-pos[nf[:,0]])
+            dot = np.einsum('ij,ij->i', no, nn)
+            bad = alive & ((dot <= 0) | (4*dot*dot < np.einsum('ij,ij->i', no, no) * np.einsum('ij,ij->i', nn, nn)))
+
+            # 连接条件：与折叠后顶点相连的边须恰好属于两个三角面，否则为非流形边或重叠面。这些边的三角面都在受影响的三角面之中
+            merged = np.zeros(n, dtype=bool)
+            merged[ca[check[:k] & act]] = True
+            e = nf[alive][:,[0,1,1,2,2,0]].reshape(-1, 2)
+            fidx = np.repeat(np.flatnonzero(alive), 3)
+            e, fidx = e[merged[e[:,0]] | merged[e[:,1]]], fidx[merged[e[:,0]] | merged[e[:,1]]]
+            _, inverse, counts = np.unique(edge_keys(e), return_inverse=True, return_counts=True)
+            bad[fidx[counts[inverse] != 2]] = True
+
+            rejected = to[sub[bad]].ravel()
+            rejected = rejected[check[rejected] & keep[rejected]]
+            if rejected.size == 0:
+                kept = np.flatnonzero(act)
+                if kept.size <= needed:
+                    break
+                rejected = kept[needed:] # 全部通过后舍弃多选的候选
+
+            # 被拒绝的折叠改变了与之共用三角面的折叠的结果，只需重新检验这些折叠
+            keep[rejected] = False
+            hit = np.zeros(k+1, dtype=bool)
+            hit[rejected] = True
+            check[:] = False
+            check[to[hit[to].any(axis=1)].ravel()] = True
+            check[k] = False
+            check &= keep
+            sub = np.flatnonzero(check[to].any(axis=1))
+
+        act = keep[:k]
+        ca, cb, ct = ca[act], cb[act], t[chosen[act],np.newaxis]
+        if ca.size == 0:
+            break
+
+        vs[ca] = moved[act]
+        for item in attrs:
+            item[ca] += ct * (item[cb] - item[ca])
+        Q[:,ca] += Q[:,cb]
+
+        remap = np.arange(n, dtype=np.int32)
+        remap[cb] = ca
+        faces = np.take(remap, faces)
+        faces = faces[(faces[:,0]!=faces[:,1]) & (faces[:,1]!=faces[:,2]) & (faces[:,2]!=faces[:,0])]
+
+        # 折叠后新出现的边界边和非流形边，其顶点同样锁定（这些边必然与折叠后的顶点相连）
+        merged = np.zeros(n, dtype=bool)
+        merged[ca] = True
+        e = faces[merged[faces].any(axis=1)][:,[0,1,1,2,2,0]].reshape(-1, 2)
+        e = e[merged[e[:,0]] | merged[e[:,1]]]
+        keys, counts = np.unique(edge_keys(e), return_counts=True)
+        locked[keys[counts!=2] // n] = True
+        locked[keys[counts!=2] % n] = True
+
+    used = np.unique(faces)
+    newidx = np.zeros(n, dtype=np.int32)
+    newidx[used] = np.arange(used.size, dtype=np.int32)
+
+    return np.float32(vs[used]), newidx[faces].ravel(), [np.float32(item[used]) for item in attrs]
+
+def _morton3(q):
+    """返回10位整数坐标的三维Morton码"""
+
+    x = q.astype(np.uint64) & np.uint64(0x3ff)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x30000ff)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x300f00f)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x30c30c3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x9249249)
+
+    return x[:,0] | (x[:,1] << np.uint64(1)) | (x[:,2] << np.uint64(2))
+
+def optimize_indices(vs, indices, gltype=GL_TRIANGLES):
+    """面向GPU顶点缓存的图元和顶点重排序，返回新的顶点索引和顶点排列（新顶点i为原顶点order[i]）
+
+    vs          - 顶点集：numpy数组，shape=(n,3)
+    indices     - 顶点索引：numpy数组
+    gltype      - GL_TRIANGLES或GL_QUADS
+
+    图元按中心点的Morton码（Z序曲线）排序，使空间上相邻的图元在索引中也相邻，提高变换后顶点缓存的命中率；
+    顶点再按首次被引用的顺序重新编号，提高顶点读取的局部性。
+    """
+
+    k = 4 if gltype == GL_QUADS else 3
+    vs = np.asarray(vs).reshape(-1, 3)
+    faces = np.asarray(indices).reshape(-1, k)
+
+    center = np.mean(vs[faces], axis=1)
+    lo, hi = center.min(axis=0), center.max(axis=0)
+    q = np.clip((center - lo) / np.maximum(hi - lo, 1e-30) * 1023, 0, 1023)
+    faces = faces[np.argsort(_morton3(q), kind='stable')].ravel()
+
+    used, first = np.unique(faces, return_index=True)
+    order = used[np.argsort(first)]
+    if order.size < vs.shape[0]:
+        unused = np.ones(vs.shape[0], dtype=bool)
+        unused[order] = False
+        order = np.hstack((order, np.nonzero(unused)[0]))
+
+    remap = np.empty(vs.shape[0], dtype=np.int32)
+    remap[order] = np.arange(vs.shape[0], dtype=np.int32)
+
+    return remap[faces], order
+
+@lru_cache(maxsize=1)
 def _get_data_cache():
     edge_table = np.array([
         0x0,   0x109, 0x203, 0x30a, 0x406, 0x50f, 0x605, 0x70c,
@@ -617,7 +1287,7 @@ def _isosurface(data, level):
     cut_edges = np.zeros([x+1 for x in index.shape]+[3], dtype=np.uint32)
     edges = edge_table[index]
     for i, shift in enumerate(edge_shifts[:12]):        
-        slices = [slice(shift[j], cut_edges.shape[j]+(shift[j]-1)) 
+        slices = [slice(int(shift[j]), cut_edges.shape[j]+(int(shift[j])-1)) 
                   for j in range(3)]
         cut_edges[slices[0], slices[1], slices[2], shift[3]] += edges & 2**i
  
@@ -635,8 +1305,8 @@ def _isosurface(data, level):
         vim = vertex_inds[:, 3] == i
         vi = vertex_inds[vim, :3]
         vi_flat = (vi * (np.array(data.strides[:3]) // data.itemsize)[np.newaxis, :]).sum(axis=1)
-        v1 = dataFlat[vi_flat]
-        v2 = dataFlat[vi_flat + data.strides[i]//data.itemsize]
+        v1 = np.float32(dataFlat[vi_flat])
+        v2 = np.float32(dataFlat[vi_flat + data.strides[i]//data.itemsize])
         vertexes[vim, i] += (level-v1) / (v2-v1)
  
     n_faces = n_table_faces[index]
@@ -665,3 +1335,85 @@ def _isosurface(data, level):
  
     return vertexes, faces
 
+
+
+def _isosurfaces(data, levels):
+    """一次扫描返回多个阈值的等值面，每个等值面由顶点、三角面索引和法向量组成
+
+    data        - 数据集：三维numpy数组
+    levels      - 阈值列表
+
+    各阈值共享同一次单元分类：先求出每个数据点的值不小于几个阈值（秩），单元8个角点的最小秩和最大秩即确定了穿过该单元的全部阈值，
+    每个阈值只在穿过它的单元上执行MarchingCube算法。法向量取自各等值面共用的中心差分梯度，每个数据点的梯度只计算一次
+    """
+
+    data = np.ascontiguousarray(data)
+    face_shift_tables, edge_shifts, edge_table, n_table_faces = _get_data_cache()
+    shape = np.array(data.shape)
+    strides = np.array([shape[1]*shape[2], shape[2], 1])
+    flat = data.ravel()
+
+    order = np.argsort(levels, kind='stable')
+    rank = np.zeros(data.shape, dtype=np.uint8 if len(levels) < 255 else np.uint16)
+    for k in order:
+        rank += ~(data < levels[k])
+
+    # 单元以其起始角点在数据中的序号表示，rank<=j即数据点的值低于第j个（升序）阈值
+    corners = [(i, j, k) for k in (0, 1) for j in (0, 1) for i in (0, 1)]
+    nx, ny, nz = shape - 1
+    lo = hi = rank[:nx,:ny,:nz]
+    for i, j, k in corners[1:]:
+        lo = np.minimum(lo, rank[i:nx+i, j:ny+j, k:nz+k])
+        hi = np.maximum(hi, rank[i:nx+i, j:ny+j, k:nz+k])
+
+    cells = np.flatnonzero(lo != hi)
+    clo, chi = lo.ravel()[cells], hi.ravel()[cells]
+    cells = np.stack(np.unravel_index(cells, (nx, ny, nz)), axis=1).dot(strides)
+    rank = rank.ravel()
+
+    surfaces = dict()
+    for j, k in enumerate(order):
+        base = cells[(clo <= j) & (chi > j)]
+        index = np.zeros(base.shape[0], dtype=np.ubyte)
+        for a, b, c in corners:
+            index |= ((rank[base + np.dot((a, b, c), strides)] <= j) << (a - 2*b*a + 3*b + 4*c)).astype(np.ubyte)
+
+        # 三角面各顶点所在的棱，以棱起点的序号*3+棱的方向表示；按单元的三角面数量分组，与逐个单元扫描的次序一致
+        n_faces = n_table_faces[index]
+        keys = list()
+        for n in range(1, 6):
+            grp = np.flatnonzero(n_faces == n)
+            verts = np.int64(face_shift_tables[n][index[grp]]).reshape(-1, 4)
+            keys.append((np.repeat(base[grp], 3*n) + verts[:,:3].dot(strides)) * 3 + verts[:,3])
+
+        keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        start, axis = keys // 3, keys % 3
+        v1 = np.float32(flat[start])
+        v2 = np.float32(flat[start + strides[axis]])
+        t = (levels[k] - v1) / (v2 - v1)
+
+        vs = np.float32(np.stack(np.unravel_index(start, data.shape), axis=1))
+        vs[np.arange(vs.shape[0]), axis] += t
+        surfaces.update({k: (vs, np.uint32(inverse.reshape(-1, 3)), start, start + strides[axis], t[:,np.newaxis])})
+
+    # 各等值面的顶点所在棱的两个端点汇总去重后，一次算出中心差分梯度
+    used = np.zeros(flat.shape[0], dtype=bool)
+    for item in surfaces.values():
+        used[item[2]] = True
+        used[item[3]] = True
+    points = np.flatnonzero(used)
+    p = np.stack(np.unravel_index(points, data.shape), axis=1)
+    grad = np.empty(p.shape, dtype=np.float32)
+    for axis in range(3):
+        back = np.minimum(p[:,axis], 1)
+        ahead = np.minimum(shape[axis] - 1 - p[:,axis], 1)
+        dv = np.float32(flat[points + ahead*strides[axis]]) - np.float32(flat[points - back*strides[axis]])
+        grad[:,axis] = dv / np.maximum(back + ahead, 1)
+
+    result = list()
+    for k in range(len(levels)):
+        vs, faces, p0, p1, t = surfaces[k]
+        normal = -((1 - t) * grad[np.searchsorted(points, p0)] + t * grad[np.searchsorted(points, p1)])
+        result.append((vs, faces, normal))
+
+    return result